@@ -0,0 +1,85 @@
+"""
+bench_compute_metrics.py
+-------------------
+Compares build_all_metrics with build_all_metrics_fused on the real
+team-season summary and on scaled-up copies of it.
+
+Reports wall time (best of N) and peak traced memory (tracemalloc) for
+each implementation, plus the max absolute difference in TDI / TDI_alt.
+
+Usage:
+    python benchmarks/bench_compute_metrics.py [--scales 1 10 100] [--repeat 3]
+"""
+
+import argparse
+import os
+import sys
+import time
+import tracemalloc
+
+import numpy as np
+import pandas as pd
+
+sys.path.insert(0, os.path.join(os.path.dirname(os.path.abspath(__file__)), "..", "src"))
+
+import raw_loader  # noqa: E402
+from compute_metrics import build_all_metrics, build_all_metrics_fused  # noqa: E402
+from team_aggregation import build_team_year_summary  # noqa: E402
+
+
+def metric_input():
+    summary = build_team_year_summary(
+        raw_loader.load_table("race_results"),
+        raw_loader.load_table("races"),
+        raw_loader.load_table("constructors"),
+    )
+    return summary.rename(columns={"races": "total_races", "total_points": "points"})
+
+
+def scale_up(df, factor):
+    """Stacks `factor` copies, each shifted to its own block of seasons."""
+    if factor == 1:
+        return df
+    span = int(df["year"].max() - df["year"].min() + 1)
+    copies = [df.assign(year=df["year"] + i * span) for i in range(factor)]
+    return pd.concat(copies, ignore_index=True)
+
+
+def measure(func, df, repeat):
+    best = float("inf")
+    for _ in range(repeat):
+        start = time.perf_counter()
+        func(df)
+        best = min(best, time.perf_counter() - start)
+
+    tracemalloc.start()
+    result = func(df)
+    _, peak = tracemalloc.get_traced_memory()
+    tracemalloc.stop()
+    return best, peak, result
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__.split("\n")[3])
+    parser.add_argument("--scales", type=int, nargs="+", default=[1, 10, 100])
+    parser.add_argument("--repeat", type=int, default=3)
+    args = parser.parse_args()
+
+    base = metric_input()
+    print(f"{'rows':>9} | {'pandas ms':>10} {'fused ms':>9} {'speedup':>8} | "
+          f"{'pandas MB':>10} {'fused MB':>9} | {'max |ΔTDI|':>10}")
+
+    for factor in args.scales:
+        df = scale_up(base, factor)
+        t_ref, m_ref, ref = measure(build_all_metrics, df, args.repeat)
+        t_new, m_new, new = measure(build_all_metrics_fused, df, args.repeat)
+        diff = max(
+            np.abs(ref["TDI"].to_numpy() - new["TDI"].to_numpy()).max(),
+            np.abs(ref["TDI_alt"].to_numpy() - new["TDI_alt"].to_numpy()).max(),
+        )
+        print(f"{len(df):>9} | {t_ref * 1e3:>10.1f} {t_new * 1e3:>9.1f} {t_ref / t_new:>7.1f}x | "
+              f"{m_ref / 1e6:>10.2f} {m_new / 1e6:>9.2f} | {diff:>10.1e}")
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,318 @@
+"""
+bench_pipeline.py
+-------------------
+Stage-by-stage benchmark of the TDI pipeline on synthetic f1db data at
+1x, 10x, 100x (and optionally 1000x) the real size.
+
+For every scale and stage it records:
+- wall_s         best wall time of --repeat runs
+- rss_peak_mb    peak resident set size while the stage ran
+- rss_delta_mb   that peak minus the RSS when the stage started
+- alloc_peak_mb  peak traced allocations (tracemalloc, one extra run)
+
+Results are written as JSON and compared against a stored baseline; a
+stage whose wall time or allocation peak grows by more than --tolerance
+is reported as a regression and the script exits with status 1. So is a
+stage missing from the baseline: re-record it (--save-baseline) in the
+change that adds or changes a benchmarked stage.
+
+Usage:
+    python benchmarks/bench_pipeline.py [--scales 1 10 100] [--repeat 3]
+    python benchmarks/bench_pipeline.py --save-baseline
+    python benchmarks/bench_pipeline.py --baseline benchmarks/baseline.json --tolerance 0.5
+"""
+
+import argparse
+import datetime
+import json
+import os
+import platform
+import shutil
+import sys
+import tempfile
+import threading
+import time
+import tracemalloc
+
+try:
+    import resource
+except ImportError:     # Windows
+    resource = None
+
+import matplotlib
+matplotlib.use("Agg")
+
+import numpy as np  # noqa: E402
+import pandas as pd  # noqa: E402
+
+BENCH_DIR = os.path.dirname(os.path.abspath(__file__))
+sys.path.insert(0, os.path.join(BENCH_DIR, "..", "src"))
+
+import raw_loader  # noqa: E402
+import visualize_utils  # noqa: E402
+from compute_metrics import build_all_metrics, build_all_metrics_fused, rank_TDI  # noqa: E402
+from data_preprocessing import clean_dataframe, load_processed_data  # noqa: E402
+from dataset_registry import registry_for  # noqa: E402
+from head_to_head import build_head_to_head  # noqa: E402
+from synthetic_f1db import generate  # noqa: E402
+from team_aggregation import build_team_year_summary, stream_team_year_summary  # noqa: E402
+
+BASELINE_PATH = os.path.join(BENCH_DIR, "baseline.json")
+RESULTS_PATH = os.path.join(BENCH_DIR, "results", "latest.json")
+
+LOADED_TABLES = ["race_results", "races", "constructors", "constructor_standings", "qualifying"]
+
+# Stage differences below this are noise, whatever the ratio
+MIN_WALL_DELTA_S = 0.02
+MIN_ALLOC_DELTA_MB = 1.0
+
+# -----------------------------------------------------------
+# 1. Measurement
+# -----------------------------------------------------------
+
+def _rss_bytes():
+    try:
+        with open("/proc/self/statm") as f:
+            return int(f.read().split()[1]) * os.sysconf("SC_PAGE_SIZE")
+    except OSError:
+        if resource is None:
+            return 0
+        # No procfs (macOS): lifetime peak is the best available number
+        peak = resource.getrusage(resource.RUSAGE_SELF).ru_maxrss
+        return peak if sys.platform == "darwin" else peak * 1024
+
+
+class RssSampler:
+    """Polls the process RSS on a background thread while a stage runs."""
+
+    def __init__(self, interval=0.002):
+        self.interval = interval
+        self.start_rss = self.peak = 0
+        self._stop = threading.Event()
+
+    def _run(self):
+        while not self._stop.is_set():
+            self.peak = max(self.peak, _rss_bytes())
+            self._stop.wait(self.interval)
+
+    def __enter__(self):
+        self.start_rss = self.peak = _rss_bytes()
+        self._thread = threading.Thread(target=self._run, daemon=True)
+        self._thread.start()
+        return self
+
+    def __exit__(self, *exc):
+        self._stop.set()
+        self._thread.join()
+        self.peak = max(self.peak, _rss_bytes())
+
+
+def measure(func, setup=lambda: (), repeat=3, warmup=0):
+    """
+    Runs func(*setup()) `warmup` untimed times, then `repeat` timed times
+    plus one traced run. setup() is called outside the timed region (e.g.
+    to copy inputs func mutates). Returns (stats dict, result of the last run).
+    """
+    for _ in range(warmup):
+        func(*setup())
+    best, rss_peak, rss_delta = float("inf"), 0, 0
+    for _ in range(repeat):
+        args = setup()
+        with RssSampler() as rss:
+            start = time.perf_counter()
+            result = func(*args)
+            best = min(best, time.perf_counter() - start)
+        rss_peak = max(rss_peak, rss.peak)
+        rss_delta = max(rss_delta, rss.peak - rss.start_rss)
+
+    args = setup()
+    tracemalloc.start()
+    func(*args)
+    _, alloc_peak = tracemalloc.get_traced_memory()
+    tracemalloc.stop()
+
+    stats = {
+        "wall_s": best,
+        "rss_peak_mb": rss_peak / 1e6,
+        "rss_delta_mb": rss_delta / 1e6,
+        "alloc_peak_mb": alloc_peak / 1e6,
+    }
+    return stats, result
+
+
+# -----------------------------------------------------------
+# 2. Stages
+# -----------------------------------------------------------
+
+def _plots(work_dir):
+    # plot_last_10_years_dominance is left out: it draws one legend entry
+    # per team, which measures matplotlib's legend layout, not our code
+    out = os.path.join(work_dir, "plots")
+    os.makedirs(out, exist_ok=True)
+    return {
+        "plot_top_teams_by_year": lambda idx: visualize_utils.plot_top_teams_by_year(
+            idx, idx.years[-1], save_path=os.path.join(out, "top.png")),
+        "plot_dominance_pie": lambda idx: visualize_utils.plot_dominance_pie(
+            idx, idx.years[-1], save_path=os.path.join(out, "pie.png")),
+        "plot_tdi_heatmap": lambda idx: visualize_utils.plot_tdi_heatmap(
+            idx, save_path=os.path.join(out, "heatmap.png")),
+        "plot_team_trends": lambda idx: visualize_utils.plot_team_trends(
+            idx, ["Ferrari", "McLaren", "Mercedes", "Red Bull", "Williams"],
+            save_path=os.path.join(out, "trends.png")),
+        "plot_tdi_vs_normalized": lambda idx: visualize_utils.plot_tdi_vs_normalized(
+            idx, save_path=os.path.join(out, "scatter.png")),
+    }
+
+
+def run_scale(scale, repeat, seed, work_dir, verbose=True):
+    """Benchmarks every stage on the synthetic data for one scale."""
+    from tdi_index import TDIIndex
+
+    raw_dir = generate(scale, seed=seed, verbose=verbose)
+    cache_dir = os.path.join(work_dir, "cache")
+    processed_dir = os.path.join(work_dir, "processed")
+    os.makedirs(processed_dir, exist_ok=True)
+    stages = {}
+
+    def run(name, func, setup=lambda: (), warmup=0):
+        stats, result = measure(func, setup, repeat, warmup)
+        stages[name] = stats
+        if verbose:
+            print(f"   {name:<26} {stats['wall_s'] * 1e3:>10.1f} ms "
+                  f"{stats['rss_delta_mb']:>9.1f} MB rss+ {stats['alloc_peak_mb']:>9.1f} MB alloc")
+        return result
+
+    tables = run("parse_csv", lambda: {
+        name: raw_loader.load_table(name, raw_dir=raw_dir, use_cache=False) for name in LOADED_TABLES
+    })
+    raw_loader.load_raw_tables(LOADED_TABLES, raw_dir=raw_dir, cache_dir=cache_dir)
+    run("load_cached", lambda: raw_loader.load_raw_tables(LOADED_TABLES, raw_dir=raw_dir,
+                                                           cache_dir=cache_dir))
+
+    summary = run("build_team_year_summary", build_team_year_summary,
+                  lambda: (tables["race_results"], tables["races"], tables["constructors"]))
+    results_csv = os.path.join(raw_dir, raw_loader.SCHEMAS["race_results"]["file"])
+    run("stream_team_year_summary", stream_team_year_summary,
+        lambda: (tables["races"], tables["constructors"], results_csv))
+    metrics_input = summary.rename(columns={"races": "total_races", "total_points": "points"})
+
+    run("build_all_metrics", build_all_metrics, lambda: (metrics_input,))
+    metrics = run("build_all_metrics_fused", build_all_metrics_fused, lambda: (metrics_input,))
+    final = run("rank_TDI", rank_TDI, lambda: (metrics,))
+
+    run("head_to_head", build_head_to_head,
+        lambda: (tables["race_results"], tables["races"], tables["constructors"]))
+    run("head_to_head_drivers", lambda: build_head_to_head(
+        tables["race_results"], tables["races"], entity="driver"))
+
+    summary.to_csv(os.path.join(processed_dir, "team_year_summary.csv"), index=False)
+    final.to_csv(os.path.join(processed_dir, "team_dominance_index_with_alt.csv"), index=False)
+    # Cold reads: drop the registry's memoized frames before every run
+    datasets = run("load_processed_data", lambda: load_processed_data(
+        processed_dir, verbose=False, names=["team_year_summary", "team_dominance_index_with_alt"]),
+                   lambda: registry_for(processed_dir).invalidate() or ())
+    run("clean_dataframe", lambda df: clean_dataframe(df, "team_dominance_index_with_alt", verbose=False),
+        lambda: (datasets["team_dominance_index_with_alt"].copy(),))
+
+    index = run("TDIIndex", TDIIndex, lambda: (final,))
+    # The first figure of a process pays matplotlib's one-off setup (fonts,
+    # backend); warm it up so it is not charged to whichever plot runs first
+    for i, (name, plot) in enumerate(_plots(work_dir).items()):
+        run(name, plot, lambda: (index,), warmup=int(i == 0))
+
+    rows = {name: len(df) for name, df in tables.items()}
+    rows["team_seasons"] = len(summary)
+    return {"rows": rows, "stages": stages}
+
+
+# -----------------------------------------------------------
+# 3. Baseline comparison
+# -----------------------------------------------------------
+
+def compare(current, baseline, tolerance):
+    """
+    Returns (regressions, missing):
+    - regressions: (scale, stage, metric, baseline value, current value)
+      for every stage that got slower / allocates more than `tolerance`
+      (relative) and more than the noise floor (absolute)
+    - missing: (scale, stage) pairs measured now but absent from the
+      baseline, which therefore cannot be checked
+    """
+    regressions, missing = [], []
+    for scale, result in current["scales"].items():
+        base_stages = baseline.get("scales", {}).get(scale, {}).get("stages", {})
+        for stage, stats in result["stages"].items():
+            base = base_stages.get(stage)
+            if base is None:
+                missing.append((scale, stage))
+                continue
+            for metric, floor in (("wall_s", MIN_WALL_DELTA_S), ("alloc_peak_mb", MIN_ALLOC_DELTA_MB)):
+                old, new = base[metric], stats[metric]
+                if new > old * (1 + tolerance) and new - old > floor:
+                    regressions.append((scale, stage, metric, old, new))
+    return regressions, missing
+
+
+def _meta():
+    return {
+        "date": datetime.datetime.now().isoformat(timespec="seconds"),
+        "python": platform.python_version(),
+        "platform": platform.platform(),
+        "cpu_count": os.cpu_count(),
+        "numpy": np.__version__,
+        "pandas": pd.__version__,
+    }
+
+
+def main(argv=None):
+    parser = argparse.ArgumentParser(description="Stage-by-stage TDI pipeline benchmark.")
+    parser.add_argument("--scales", type=int, nargs="+", default=[1, 10, 100])
+    parser.add_argument("--repeat", type=int, default=3)
+    parser.add_argument("--seed", type=int, default=0)
+    parser.add_argument("--out", default=RESULTS_PATH, help="where to write the results JSON")
+    parser.add_argument("--baseline", default=BASELINE_PATH, help="baseline JSON to compare against")
+    parser.add_argument("--tolerance", type=float, default=0.5, help="allowed relative slowdown")
+    parser.add_argument("--save-baseline", action="store_true", help="write the results as the new baseline")
+    args = parser.parse_args(argv)
+
+    current = {"meta": _meta(), "scales": {}}
+    work_dir = tempfile.mkdtemp(prefix="tdi_bench_")
+    try:
+        for scale in args.scales:
+            print(f"\n📏 Scale {scale}x")
+            current["scales"][str(scale)] = run_scale(scale, args.repeat, args.seed,
+                                                      os.path.join(work_dir, f"{scale}x"))
+    finally:
+        shutil.rmtree(work_dir, ignore_errors=True)
+
+    out = BASELINE_PATH if args.save_baseline else args.out
+    os.makedirs(os.path.dirname(os.path.abspath(out)), exist_ok=True)
+    with open(out, "w") as f:
+        json.dump(current, f, indent=2)
+    print(f"\n💾 Results saved → {os.path.abspath(out)}")
+
+    if args.save_baseline or not os.path.exists(args.baseline):
+        return 0
+
+    with open(args.baseline) as f:
+        baseline = json.load(f)
+    regressions, missing = compare(current, baseline, args.tolerance)
+    if missing:
+        print(f"⚠️  {len(missing)} stage(s) not in {os.path.basename(args.baseline)}, not checked "
+              f"(re-record with --save-baseline):")
+        for scale, stage in missing:
+            print(f"   {scale:>5}x {stage}")
+    if not regressions and not missing:
+        print(f"✅ No regressions against {os.path.basename(args.baseline)} "
+              f"(tolerance {args.tolerance:.0%})")
+        return 0
+
+    if regressions:
+        print(f"❌ {len(regressions)} regression(s) against {os.path.basename(args.baseline)}:")
+    for scale, stage, metric, old, new in regressions:
+        print(f"   {scale:>5}x {stage:<26} {metric:<14} {old:>10.4f} → {new:>10.4f} ({new / old:.2f}x)")
+    return 1
+
+
+if __name__ == "__main__":
+    sys.exit(main())
@@ -0,0 +1,164 @@
+"""
+synthetic_f1db.py
+-------------------
+Deterministic generator of f1db-shaped tables at k times the real size.
+
+Copy 0 is the real export, unchanged, so scale 1 is the real data. Each
+further copy i is a parallel championship over the same seasons:
+- race ids are offset so every race is new (year and round are kept,
+  which keeps int16 years / int8 rounds valid at any scale)
+- constructor and driver ids get an "-s<i>" suffix, constructor names a
+  " S<i>" suffix, so copies never merge
+- within every season the constructors' results are shuffled between
+  the season's teams (seeded per copy), so copies are not identical
+  team histories
+
+Tables written (same file names and columns as data/raw, readable with
+raw_loader.load_table(name, raw_dir=...)):
+    races, race_results, constructor_standings, qualifying, constructors
+
+Usage:
+    python benchmarks/synthetic_f1db.py --scale 10 [--out data/synthetic/10x] [--seed 0]
+"""
+
+import argparse
+import csv
+import json
+import os
+import sys
+import time
+
+import numpy as np
+import pandas as pd
+
+sys.path.insert(0, os.path.join(os.path.dirname(os.path.abspath(__file__)), "..", "src"))
+
+from raw_loader import RAW_DIR, SCHEMAS  # noqa: E402
+
+BASE_DIR = os.path.dirname(os.path.abspath(__file__))
+SYNTHETIC_DIR = os.path.join(BASE_DIR, "../data/synthetic")
+MARKER = "synthetic.json"
+GENERATOR_VERSION = 1
+
+TABLES = ["races", "race_results", "constructor_standings", "qualifying", "constructors"]
+
+# Tables whose rows belong to a (race, constructor)
+RACE_TABLES = ["race_results", "constructor_standings", "qualifying"]
+
+# -----------------------------------------------------------
+# 1. Per-copy transforms
+# -----------------------------------------------------------
+
+def _read_raw(name, raw_dir):
+    # Everything as text: rows are written back exactly as read apart
+    # from the rewritten id columns
+    path = os.path.join(raw_dir, SCHEMAS[name]["file"])
+    return pd.read_csv(path, dtype=str, keep_default_na=False)
+
+
+def _season_teams(tables):
+    """Sorted unique (year, constructorId) pairs over all race tables."""
+    pairs = pd.concat([tables[n][["year", "constructorId"]] for n in RACE_TABLES])
+    return pairs.drop_duplicates().sort_values(["year", "constructorId"]).reset_index(drop=True)
+
+
+def _shuffle_map(pairs, rng, suffix):
+    """
+    Maps "year|constructorId" to a shuffled constructor of the same season.
+    Pairs are sorted by year, so lexsort(random, year) is a random
+    permutation inside every year block.
+    """
+    years = pairs["year"].to_numpy()
+    ids = pairs["constructorId"].to_numpy()
+    order = np.lexsort((rng.random(len(pairs)), years))
+    keys = pairs["year"] + "|" + pairs["constructorId"]
+    return pd.Series(ids[order] + suffix, index=keys.to_numpy())
+
+
+def _copy(tables, pairs, i, race_offset, seed):
+    """Returns the tables of synthetic copy i (copy 0 is the real data)."""
+    if i == 0:
+        return tables
+
+    rng = np.random.default_rng([seed, i])
+    suffix = f"-s{i}"
+    team_map = _shuffle_map(pairs, rng, suffix)
+    out = {}
+
+    races = tables["races"].copy()
+    races["id"] = (races["id"].astype(np.int64) + i * race_offset).astype(str)
+    out["races"] = races
+
+    for name in RACE_TABLES:
+        df = tables[name].copy()
+        df["raceId"] = (df["raceId"].astype(np.int64) + i * race_offset).astype(str)
+        df["constructorId"] = (df["year"] + "|" + df["constructorId"]).map(team_map).to_numpy()
+        if "driverId" in df.columns:
+            df["driverId"] = df["driverId"] + suffix
+        out[name] = df
+
+    constructors = tables["constructors"].copy()
+    constructors["id"] = constructors["id"] + suffix
+    constructors["name"] = constructors["name"] + f" S{i}"
+    out["constructors"] = constructors
+    return out
+
+
+# -----------------------------------------------------------
+# 2. Generator
+# -----------------------------------------------------------
+
+def generate(scale, out_dir=None, seed=0, raw_dir=RAW_DIR, force=False, verbose=True):
+    """
+    Writes the synthetic tables for `scale` into out_dir (default
+    data/synthetic/<scale>x) and returns out_dir. Copies are appended one
+    at a time, so memory stays at roughly one copy of the real data.
+    An existing output with the same scale, seed and generator version is
+    reused unless force=True.
+    """
+    out_dir = out_dir or os.path.join(SYNTHETIC_DIR, f"{scale}x")
+    marker_path = os.path.join(out_dir, MARKER)
+    marker = {"scale": scale, "seed": seed, "version": GENERATOR_VERSION}
+
+    if not force and os.path.exists(marker_path):
+        with open(marker_path) as f:
+            if json.load(f) == marker:
+                return out_dir
+
+    os.makedirs(out_dir, exist_ok=True)
+    if os.path.exists(marker_path):
+        os.remove(marker_path)
+
+    start = time.perf_counter()
+    tables = {name: _read_raw(name, raw_dir) for name in TABLES}
+    pairs = _season_teams(tables)
+    race_offset = int(tables["races"]["id"].astype(np.int64).max())
+
+    for i in range(scale):
+        copy = _copy(tables, pairs, i, race_offset, seed)
+        for name in TABLES:
+            copy[name].to_csv(
+                os.path.join(out_dir, SCHEMAS[name]["file"]),
+                mode="w" if i == 0 else "a", header=i == 0, index=False,
+                quoting=csv.QUOTE_MINIMAL,
+            )
+
+    with open(marker_path, "w") as f:
+        json.dump(marker, f)
+
+    if verbose:
+        rows = len(tables["race_results"]) * scale
+        print(f"🧪 Synthetic f1db {scale}x ({rows:,} race results) written in "
+              f"{time.perf_counter() - start:.1f}s → {os.path.abspath(out_dir)}")
+    return out_dir
+
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser(description="Generate synthetic f1db-shaped tables.")
+    parser.add_argument("--scale", type=int, required=True)
+    parser.add_argument("--out", default=None)
+    parser.add_argument("--seed", type=int, default=0)
+    parser.add_argument("--force", action="store_true")
+    args = parser.parse_args()
+
+    generate(args.scale, args.out, seed=args.seed, force=args.force)
@@ -0,0 +1,183 @@
+"""
+batch_render.py
+-------------------
+Headless batch rendering of every dominance chart to files.
+
+This file:
+- Forces the non-interactive Agg backend (no plt.show() blocking)
+- Plans one job per chart: top-N bars and pies for every season, plus the
+  heatmap, team trends, last-10-years and TDI-vs-normalized charts
+- Renders jobs on a process pool; each worker indexes the TDI table once
+- Skips a chart when the digest of its data slice, parameters and the
+  plotting code matches the last render and its files still exist
+
+Usage:
+    python src/batch_render.py [--formats png svg] [--workers 4] [--force]
+"""
+
+import argparse
+import hashlib
+import json
+import os
+from concurrent.futures import ProcessPoolExecutor
+
+import matplotlib
+matplotlib.use("Agg")
+
+import pandas as pd  # noqa: E402
+
+from instrumentation import instrumented  # noqa: E402
+from tdi_index import TDIIndex  # noqa: E402
+
+BASE_DIR = os.path.dirname(os.path.abspath(__file__))
+TDI_CSV = os.path.join(BASE_DIR, "../output/results/final_team_tdi.csv")
+RENDER_DIR = os.path.join(BASE_DIR, "../output/visuals")
+MANIFEST_NAME = ".render_manifest.json"
+
+TREND_TEAMS = ["Ferrari", "McLaren", "Mercedes", "Red Bull", "Williams"]
+
+# -----------------------------------------------------------
+# 1. Job planning
+# -----------------------------------------------------------
+
+def _digest(*parts):
+    h = hashlib.sha1()
+    for part in parts:
+        if isinstance(part, pd.DataFrame):
+            h.update(pd.util.hash_pandas_object(part, index=False).values.tobytes())
+        else:
+            h.update(repr(part).encode())
+    return h.hexdigest()
+
+
+# Everything a chart's pixels depend on besides its data. Keep in sync
+# with the depends_on of the render stage in main_pipeline
+CODE_FILES = ["visualize_utils.py", "tdi_index.py", "batch_render.py"]
+
+
+def _code_digest():
+    h = hashlib.sha1()
+    for name in CODE_FILES:
+        with open(os.path.join(BASE_DIR, name), "rb") as f:
+            h.update(f.read())
+    return h.hexdigest()
+
+
+def plan_jobs(index, top_n=10, pie_top_n=5, heatmap_top_n=12, teams=TREND_TEAMS):
+    """
+    Returns a list of jobs: (stem, plot function name, kwargs, data digest).
+    The digest covers exactly the rows each chart draws.
+    """
+    jobs = []
+    for year in index.years:
+        jobs.append((f"top_teams_{year}", "plot_top_teams_by_year",
+                     {"year": year, "top_n": top_n},
+                     _digest(index.top(year, top_n), top_n)))
+        jobs.append((f"dominance_pie_{year}", "plot_dominance_pie",
+                     {"year": year, "top_n": pie_top_n},
+                     _digest(index.top(year, pie_top_n), pie_top_n)))
+
+    last_year = index.years[-1]
+    jobs += [
+        ("tdi_heatmap", "plot_tdi_heatmap", {"top_n": heatmap_top_n},
+         _digest(index.frame, heatmap_top_n)),
+        ("team_trends", "plot_team_trends", {"teams": list(teams)},
+         _digest(index.teams(teams), list(teams))),
+        ("last_10_years", "plot_last_10_years_dominance", {},
+         _digest(index.window(last_year - 9, last_year))),
+        ("tdi_vs_normalized", "plot_tdi_vs_normalized", {},
+         _digest(index.frame[["TDI", "TDI_normalized"]])),
+    ]
+    return jobs
+
+
+# -----------------------------------------------------------
+# 2. Workers
+# -----------------------------------------------------------
+
+_INDEX = None
+
+
+def _init_worker(df):
+    """Runs once per process: index the table and load the plotting stack."""
+    global _INDEX
+    import visualize_utils  # noqa: F401
+    _INDEX = TDIIndex(df)
+
+
+def _render_job(func_name, kwargs, paths):
+    import visualize_utils
+    getattr(visualize_utils, func_name)(_INDEX, save_path=paths, **kwargs)
+    return paths
+
+
+# -----------------------------------------------------------
+# 3. Public API
+# -----------------------------------------------------------
+
+@instrumented()
+def render_all(df, out_dir=RENDER_DIR, formats=("png",), workers=None, force=False, **plan_kwargs):
+    """
+    Renders the full chart set for a final TDI table into out_dir.
+
+    df:      final TDI DataFrame (year, name, TDI, TDI_normalized, ...)
+    formats: file extensions to write for every chart, e.g. ("png", "svg")
+    workers: process count; None uses os.cpu_count(), 1 renders in-process
+    force:   ignore the manifest and re-render everything
+
+    Returns {"rendered": [paths...], "skipped": [paths...]}.
+    """
+    df = df.frame if isinstance(df, TDIIndex) else df
+    index = TDIIndex(df)
+    code = _code_digest()
+    os.makedirs(out_dir, exist_ok=True)
+
+    manifest_path = os.path.join(out_dir, MANIFEST_NAME)
+    manifest = {}
+    if os.path.exists(manifest_path) and not force:
+        with open(manifest_path) as f:
+            manifest = json.load(f)
+
+    todo, skipped, new_manifest = [], [], {}
+    for stem, func_name, kwargs, data_digest in plan_jobs(index, **plan_kwargs):
+        paths = [os.path.join(out_dir, f"{stem}.{ext}") for ext in formats]
+        digest = _digest(data_digest, code, func_name, kwargs)
+        new_manifest[stem] = {"digest": digest, "formats": list(formats)}
+
+        fresh = manifest.get(stem, {}).get("digest") == digest
+        if fresh and all(os.path.exists(p) for p in paths):
+            skipped.extend(paths)
+        else:
+            todo.append((func_name, kwargs, paths))
+
+    workers = os.cpu_count() if workers is None else workers
+    rendered = []
+    if todo and workers > 1:
+        with ProcessPoolExecutor(max_workers=min(workers, len(todo)),
+                                 initializer=_init_worker, initargs=(df,)) as pool:
+            for paths in pool.map(_render_job, *zip(*todo), chunksize=4):
+                rendered.extend(paths)
+    elif todo:
+        _init_worker(df)
+        for job in todo:
+            rendered.extend(_render_job(*job))
+
+    with open(manifest_path, "w") as f:
+        json.dump(new_manifest, f, indent=2)
+
+    return {"rendered": rendered, "skipped": skipped}
+
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser(description="Render every TDI chart to files.")
+    parser.add_argument("--csv", default=TDI_CSV, help="final TDI table")
+    parser.add_argument("--out", default=RENDER_DIR, help="output directory")
+    parser.add_argument("--formats", nargs="+", default=["png"])
+    parser.add_argument("--workers", type=int, default=None)
+    parser.add_argument("--force", action="store_true")
+    args = parser.parse_args()
+
+    result = render_all(pd.read_csv(args.csv), out_dir=args.out, formats=args.formats,
+                        workers=args.workers, force=args.force)
+    print(f"🖼  Rendered {len(result['rendered'])} files, "
+          f"skipped {len(result['skipped'])} unchanged → {os.path.abspath(args.out)}")
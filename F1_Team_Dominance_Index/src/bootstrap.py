@@ -0,0 +1,182 @@
+"""
+bootstrap.py
+-------------------
+Bootstrap confidence intervals for every team-season TDI.
+
+This file:
+- Builds one dense (team x race) count matrix per season from race results
+- Resamples the season's races with replacement, B times at once:
+  race multiplicities come from one np.bincount over an index matrix
+- Recomputes win / podium / points-share / 1-2 rates, per-season Min-Max
+  normalization and TDI for all replicates with one tensor contraction
+- Reports percentile intervals next to the point estimate
+
+Seasons are independent, so each season is one task on the process pool.
+Every season draws from its own SeedSequence child of `seed`, which makes
+the intervals reproducible whatever the number of workers.
+"""
+
+from concurrent.futures import ProcessPoolExecutor
+
+import numpy as np
+import pandas as pd
+
+from compute_metrics import TDI_WEIGHTS
+from race_store import as_frame
+from team_aggregation import RESULT_COLUMNS
+
+# Order of the count planes in a season tensor
+PLANES = ['entered', 'wins', 'podiums', 'points', 'one_two']
+
+# -----------------------------------------------------------
+# 1. Per-season (team x race) tensors
+# -----------------------------------------------------------
+
+def season_tensors(results, races, constructors):
+    """
+    Aggregates race results to one cell per (season, team, race) and returns
+    a list of (keys, tensor) per season, where tensor has shape
+    (len(PLANES), teams, races) and keys holds year / constructorId / name.
+    Wins, podiums and 1-2 finishes follow build_team_year_summary.
+    """
+    results = as_frame(results, RESULT_COLUMNS)
+    race_year = pd.Series(races['year'].to_numpy(), index=races['id'].to_numpy())
+    names = pd.Series(constructors['name'].to_numpy(), index=constructors['id'].astype(str))
+
+    rows = pd.DataFrame({
+        'year': race_year.reindex(results['raceId'].to_numpy()).to_numpy(),
+        'constructorId': results['constructorId'].astype(str).to_numpy(),
+        'raceId': results['raceId'].to_numpy(),
+        'wins': results['positionDisplayOrder'].to_numpy() == 1,
+        'podiums': results['positionDisplayOrder'].to_numpy() <= 3,
+        'p1': results['positionNumber'].to_numpy(dtype=np.float64, na_value=np.nan) == 1,
+        'p2': results['positionNumber'].to_numpy(dtype=np.float64, na_value=np.nan) == 2,
+        'points': results['points'].to_numpy(dtype=np.float64, na_value=np.nan),
+    })
+    rows = rows[rows['year'].notna() & rows['constructorId'].isin(names.index)]
+    rows['points'] = rows['points'].fillna(0)
+    rows['year'] = rows['year'].astype(np.int64)
+
+    cells = (
+        rows.groupby(['year', 'constructorId', 'raceId'], sort=True)
+        .agg(wins=('wins', 'sum'), podiums=('podiums', 'sum'),
+             p1=('p1', 'any'), p2=('p2', 'any'), points=('points', 'sum'))
+        .reset_index()
+    )
+    cells['entered'] = 1.0
+    cells['one_two'] = (cells['p1'] & cells['p2']).astype(np.float64)
+
+    seasons = []
+    for year, season in cells.groupby('year', sort=True):
+        team_codes, teams = pd.factorize(season['constructorId'], sort=True)
+        race_codes, race_ids = pd.factorize(season['raceId'], sort=True)
+
+        tensor = np.zeros((len(PLANES), len(teams), len(race_ids)))
+        for k, plane in enumerate(PLANES):
+            tensor[k, team_codes, race_codes] = season[plane].to_numpy(dtype=np.float64)
+
+        keys = pd.DataFrame({
+            'year': year,
+            'constructorId': np.asarray(teams, dtype=object),
+            'name': names.reindex(teams).to_numpy(),
+        })
+        seasons.append((keys, tensor))
+
+    return seasons
+
+
+# -----------------------------------------------------------
+# 2. Vectorized TDI for many race-weight vectors
+# -----------------------------------------------------------
+
+def tdi_from_counts(tensor, counts, weights=TDI_WEIGHTS[:, 0]):
+    """
+    TDI for every team under each column of `counts` (races x B race
+    multiplicities). Mirrors build_all_metrics: rates are 0 when a team
+    entered none of the drawn races, constant metrics normalize to 1.
+    Returns a (teams, B) matrix.
+    """
+    totals = np.einsum('ktr,rb->ktb', tensor, counts)
+    entered, wins, podiums, points, one_two = totals
+
+    rates = np.zeros((4,) + entered.shape)
+    for j, num in enumerate((wins, podiums, None, one_two)):
+        if num is not None:
+            np.divide(num, entered, out=rates[j], where=entered != 0)
+    season_points = points.sum(axis=0, keepdims=True)
+    np.divide(points, season_points, out=rates[2], where=season_points != 0)
+
+    lo = rates.min(axis=1, keepdims=True)
+    span = rates.max(axis=1, keepdims=True) - lo
+    norm = np.ones_like(rates)
+    np.divide(rates - lo, span, out=norm, where=span != 0)
+
+    return np.tensordot(np.asarray(weights), norm, axes=1)
+
+
+def resample_counts(n_races, n_boot, rng):
+    """
+    Race multiplicities for n_boot bootstrap draws of n_races races:
+    one index matrix, counted with a single offset np.bincount.
+    Returns a (n_races, n_boot) float matrix.
+    """
+    idx = rng.integers(0, n_races, size=(n_boot, n_races))
+    idx += np.arange(n_boot)[:, None] * n_races
+    counts = np.bincount(idx.ravel(), minlength=n_boot * n_races)
+    return counts.reshape(n_boot, n_races).T.astype(np.float64)
+
+
+def _bootstrap_season(tensor, n_boot, seed, alpha, chunk_size):
+    rng = np.random.default_rng(seed)
+    n_races = tensor.shape[2]
+    point = tdi_from_counts(tensor, np.ones((n_races, 1)))[:, 0]
+
+    reps = []
+    for start in range(0, n_boot, chunk_size):
+        counts = resample_counts(n_races, min(chunk_size, n_boot - start), rng)
+        reps.append(tdi_from_counts(tensor, counts))
+    reps = np.concatenate(reps, axis=1)
+
+    lo, hi = np.percentile(reps, [100 * alpha / 2, 100 * (1 - alpha / 2)], axis=1)
+    top = reps >= reps.max(axis=0, keepdims=True)
+    return {
+        'TDI': point,
+        'TDI_boot_mean': reps.mean(axis=1),
+        'TDI_boot_std': reps.std(axis=1),
+        'TDI_lo': lo,
+        'TDI_hi': hi,
+        'p_top': top.mean(axis=1),
+    }
+
+
+# -----------------------------------------------------------
+# 3. Public API
+# -----------------------------------------------------------
+
+def bootstrap_tdi(results, races, constructors, n_boot=10_000, alpha=0.05,
+                  workers=None, seed=0, chunk_size=2_000):
+    """
+    Percentile bootstrap intervals for TDI, resampling races within seasons.
+
+    n_boot:     replicates per season
+    alpha:      two-sided level; (alpha/2, 1 - alpha/2) percentiles
+    workers:    process count; None or 1 runs in-process
+    seed:       base seed (results do not depend on `workers`)
+    chunk_size: replicates evaluated per batch inside a season (bounds memory)
+
+    Returns one row per team-season with TDI (full-sample estimate),
+    TDI_boot_mean, TDI_boot_std, TDI_lo, TDI_hi and p_top (share of
+    replicates in which the team has the season's highest TDI).
+    """
+    seasons = season_tensors(results, races, constructors)
+    seeds = np.random.SeedSequence(seed).spawn(len(seasons))
+    args = [(tensor, n_boot, sq, alpha, chunk_size) for (_, tensor), sq in zip(seasons, seeds)]
+
+    if workers is None or workers <= 1:
+        stats = [_bootstrap_season(*a) for a in args]
+    else:
+        with ProcessPoolExecutor(max_workers=workers) as pool:
+            stats = list(pool.map(_bootstrap_season, *zip(*args)))
+
+    frames = [keys.assign(**s) for (keys, _), s in zip(seasons, stats)]
+    return pd.concat(frames, ignore_index=True)
@@ -0,0 +1,375 @@
+"""
+championship_sim.py
+-------------------
+Monte Carlo constructors' championship simulator.
+
+This file:
+- Estimates a strength for every team-season from its race results: a
+  Plackett-Luce model of the classified finishing orders (fitted for
+  all seasons at once with vectorized MM updates) and a per-car
+  classification rate
+- Re-runs each season many times. Every race keeps its real entry
+  list (teams and car counts) and draws a new finishing order
+- Scores the simulated races with that season's points system
+  (points_systems): position points, fastest lap, half / double points,
+  and sprint points on the rounds race_context flags as sprint weekends
+- Accumulates title probability, expected points and expected
+  championship position per team-season
+
+Simulated seasons are NumPy batches of shape (sims, races, cars). A
+finishing order is the argsort of exponential race times E / strength,
+which samples Plackett-Luce orders exactly. Unclassified cars get an
+infinite time.
+
+Seasons are independent tasks for the process pool. Every season draws
+from its own SeedSequence child of `seed`, so the results do not depend
+on the number of workers, like bootstrap.py.
+
+Constructors' points:
+- until BEST_CAR_ONLY_UNTIL only a team's best-placed car scores in each
+  race; afterwards every car scores
+- a sprint round runs a second race from the same strengths and
+  classification rates, scored with the season's sprint points (no
+  multiplier, no fastest lap)
+- the f1db races table only dates sprints from 2024, so the 2021-2023
+  sprints are not simulated; neither are dropped-score rules and
+  countback, and tied teams share the title draw
+
+Usage:
+    python src/championship_sim.py [--sims 100000] [--workers 4] [--years 1988 2021]
+"""
+
+import argparse
+import os
+import sys
+import time
+from concurrent.futures import ProcessPoolExecutor
+
+import numpy as np
+import pandas as pd
+
+import points_systems
+import raw_loader
+from helper_functions import save_csv
+from race_store import as_frame
+from team_aggregation import encode_keys, group_ids
+
+BASE_DIR = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+SIM_RESULTS_PATH = os.path.join(BASE_DIR, "output", "results", "championship_probabilities.csv")
+
+BEST_CAR_ONLY_UNTIL = 1978   # constructors scored with their best car only up to this season
+MM_ITERATIONS = 200
+
+RESULT_COLUMNS = ["raceId", "constructorId", "driverNumber", "positionNumber"]
+
+# -----------------------------------------------------------
+# 1. Team strength
+# -----------------------------------------------------------
+
+def fit_strengths(race, team, position, n_teams, iterations=MM_ITERATIONS):
+    """
+    Plackett-Luce strengths from classified finishing orders.
+
+    race, team, position: one row per classified car
+    n_teams:              number of team codes
+
+    Uses Hunter's MM update for all races at once, with a prior of one
+    win and one loss against a team of strength 1, so teams that never
+    beat anyone keep a finite strength. Returns strengths (n_teams,).
+    """
+    order = np.lexsort((position, race))
+    race, team = race[order], team[order]
+    starts = np.flatnonzero(np.r_[True, race[1:] != race[:-1]])
+    ends = np.r_[starts[1:], len(race)]
+    race_end = np.repeat(ends, ends - starts)
+    race_start = np.repeat(starts, ends - starts)
+
+    # A car "wins" the choice stage at its position unless it is last
+    chooses = np.ones(len(race), dtype=bool)
+    chooses[ends - 1] = False
+    wins = np.bincount(team, weights=chooses, minlength=n_teams)
+
+    w = np.ones(n_teams)
+    for _ in range(iterations):
+        w_row = w[team]
+        tail = np.r_[np.cumsum(w_row[::-1])[::-1], 0.0]
+        remaining = tail[:-1] - tail[race_end]          # strength of cars still racing at each stage
+        inv = np.where(chooses, 1.0 / remaining, 0.0)
+        cum = np.r_[0.0, np.cumsum(inv)]
+        exposure = cum[1:] - cum[race_start]            # stages each car took part in
+        denom = np.bincount(team, weights=exposure, minlength=n_teams)
+        w = (wins + 1.0) / (denom + 2.0 / (w + 1.0))
+    return w
+
+
+def season_inputs(results, races, constructors, table=None):
+    """
+    Everything the simulator needs, per season. Returns a list of dicts
+    with year, keys (constructorId / name per team), strength and
+    classified rate per team, and per race: the multiplier, the sprint
+    flag and the entry list as a padded (races, cars) team-index matrix (-1 = empty).
+    """
+    table = points_systems.points_table() if table is None else table
+    rules = points_systems.compile_rules(table)
+    results = as_frame(results, RESULT_COLUMNS)
+    race_season, race_mult, race_sprint = points_systems.race_context(races, rules)
+    race_year = rules["years"][race_season]
+
+    race_pos = pd.Index(races["id"].to_numpy()).get_indexer(results["raceId"].to_numpy())
+    codes, ids = encode_keys(results["constructorId"])
+    name_pos = pd.Index(constructors["id"].astype(str)).get_indexer(ids)
+    keep = (race_pos >= 0) & (codes >= 0)
+    keep &= name_pos[np.where(codes >= 0, codes, 0)] >= 0
+    race_pos, codes = race_pos[keep], codes[keep]
+    position = results["positionNumber"].to_numpy(dtype=np.float64, na_value=np.nan)[keep]
+    number = results["driverNumber"].to_numpy(dtype=np.float64, na_value=0)[keep]
+
+    # One row per car: shared drives of a classified car collapse to one
+    classified = ~np.isnan(position)
+    car = np.where(classified, position, np.nanmax(position, initial=0) + 1 + np.maximum(number, 0))
+    _, _, first = group_ids(race_pos, codes, car.astype(np.int64))
+    race_pos, codes, classified, position = race_pos[first], codes[first], classified[first], position[first]
+
+    # Team-season entities
+    year = race_year[race_pos]
+    entity, n_entities, entity_first = group_ids(year - year.min(), codes)
+    strength = fit_strengths(race_pos[classified], entity[classified],
+                             position[classified], n_entities)
+    cars = np.bincount(entity, minlength=n_entities)
+    finish_rate = (np.bincount(entity, weights=classified, minlength=n_entities) + 1.0) / (cars + 2.0)
+
+    names = constructors["name"].to_numpy(dtype=object)
+    seasons = []
+    for y in np.unique(year):
+        in_season = year == y
+        ents = np.unique(entity[in_season])
+        local = np.full(n_entities, -1)
+        local[ents] = np.arange(len(ents))
+
+        race_ids, race_idx = np.unique(race_pos[in_season], return_inverse=True)
+        slot = np.zeros(len(race_idx), dtype=np.int64)
+        order = np.argsort(race_idx, kind="stable")
+        counts = np.bincount(race_idx)
+        slot[order] = np.arange(len(order)) - np.repeat(np.cumsum(counts) - counts, counts)
+        entries = np.full((len(race_ids), counts.max()), -1)
+        entries[race_idx, slot] = local[entity[in_season]]
+
+        code = codes[entity_first[ents]]
+        seasons.append({
+            "year": int(y),
+            "constructorId": ids[code],
+            "name": names[name_pos[code]],
+            "strength": strength[ents],
+            "finish_rate": finish_rate[ents],
+            "cars": cars[ents],
+            "entries": entries,
+            "multiplier": race_mult[race_ids],
+            "sprint": race_sprint[race_ids],
+            "rules": int(race_season[race_ids[0]]),
+        })
+    return seasons, rules
+
+
+# -----------------------------------------------------------
+# 2. Simulation (one season, batched)
+# -----------------------------------------------------------
+
+def _race_totals(team, w, finish, points, multiplier, n_sims, n_teams, best_car_only, rng):
+    """
+    Draws n_sims finishing orders of the races in `team` (races, cars)
+    and scores them with `points` by position. Returns the race times
+    (sims, races, cars) and the (sims, teams + 1) totals.
+    """
+    shape = (n_sims,) + team.shape
+    times = rng.standard_exponential(shape, dtype=np.float32) / w.astype(np.float32)
+    times[rng.random(shape, dtype=np.float32) >= finish.astype(np.float32)] = np.inf
+
+    points = points[:np.count_nonzero(points)][:team.shape[1]]
+    n_scoring = len(points)
+    order = np.argsort(times, axis=-1)[..., :n_scoring]
+    scored = np.isfinite(np.take_along_axis(times, order, axis=-1))
+    scorer = np.take_along_axis(np.broadcast_to(team, shape), order, axis=-1)
+    slot_points = scored * points * multiplier[:, None]
+
+    if best_car_only:
+        for k in range(1, n_scoring):
+            repeat = (scorer[..., :k] == scorer[..., k:k + 1]).any(axis=-1)
+            slot_points[..., k] *= ~repeat
+
+    sim = np.arange(n_sims)[:, None, None]
+    totals = np.bincount((sim * (n_teams + 1) + scorer).ravel(), weights=slot_points.ravel(),
+                         minlength=n_sims * (n_teams + 1)).reshape(n_sims, n_teams + 1)
+    return times, totals
+
+
+def simulate_batch(season, rules, n_sims, rng):
+    """
+    Championship totals of n_sims simulated seasons: (n_sims, teams)
+    constructors' points.
+    """
+    entries = season["entries"]
+    n_races, n_cars = entries.shape
+    n_teams = len(season["strength"])
+    r = season["rules"]
+    present = entries >= 0
+    team = np.where(present, entries, n_teams)                 # empty slots score for a dummy team
+    w = np.r_[season["strength"], 1.0][team]
+    finish = np.r_[season["finish_rate"], 0.0][team]
+    best_car_only = season["year"] <= BEST_CAR_ONLY_UNTIL
+
+    shape = (n_sims, n_races, n_cars)
+    times, totals = _race_totals(team, w, finish, rules["position"][r, 1:], season["multiplier"],
+                                 n_sims, n_teams, best_car_only, rng)
+
+    fastest_lap = rules["fastest_lap"][r]
+    if fastest_lap > 0:
+        lap = rng.standard_exponential(shape, dtype=np.float32) / w.astype(np.float32)
+        lap[~np.isfinite(times)] = np.inf
+        top = rules["fastest_lap_top"][r]
+        if top:
+            ranked = np.zeros(shape, dtype=bool)
+            np.put_along_axis(ranked, np.argsort(times, axis=-1)[..., :top], True, axis=-1)
+            lap[~ranked] = np.inf
+        best = np.argmin(lap, axis=-1)
+        has_lap = np.isfinite(np.take_along_axis(lap, best[..., None], axis=-1))[..., 0]
+        fl_team = team[np.arange(n_races), best]
+        totals += fastest_lap * np.bincount(
+            (np.arange(n_sims)[:, None] * (n_teams + 1) + fl_team).ravel(), weights=has_lap.ravel(),
+            minlength=n_sims * (n_teams + 1)).reshape(n_sims, n_teams + 1)
+
+    sprint = np.flatnonzero(season["sprint"])
+    if len(sprint) and rules["sprint"][r].any():
+        _, sprint_totals = _race_totals(team[sprint], w[sprint], finish[sprint], rules["sprint"][r, 1:],
+                                        np.ones(len(sprint)), n_sims, n_teams, best_car_only, rng)
+        totals += sprint_totals
+
+    return totals[:, :n_teams]
+
+
+def _simulate_season(season, rules, n_sims, seed, chunk_size):
+    rng = np.random.default_rng(seed)
+    n_teams = len(season["strength"])
+    acc = {k: np.zeros(n_teams) for k in ("title", "points", "points_sq", "position")}
+    for start in range(0, n_sims, chunk_size):
+        totals = simulate_batch(season, rules, min(chunk_size, n_sims - start), rng)
+        leaders = totals >= totals.max(axis=1, keepdims=True)
+        acc["title"] += (leaders / leaders.sum(axis=1, keepdims=True)).sum(axis=0)
+        acc["points"] += totals.sum(axis=0)
+        acc["points_sq"] += (totals ** 2).sum(axis=0)
+        acc["position"] += (1 + (totals[:, None, :] > totals[:, :, None]).sum(axis=2)).sum(axis=0)
+    return acc
+
+
+# -----------------------------------------------------------
+# 3. Public API
+# -----------------------------------------------------------
+
+def simulate_championships(results, races, constructors, n_sims=100_000, years=None,
+                           workers=None, seed=0, chunk_size=5_000, table=None):
+    """
+    Simulates every season n_sims times.
+
+    years:      seasons to simulate (default: all)
+    workers:    process count; None or 1 runs in-process
+    seed:       base seed (results do not depend on `workers`)
+    chunk_size: simulated seasons per batch (bounds memory)
+    table:      points_systems table (default: the historical systems)
+
+    Returns one row per team-season with strength (Plackett-Luce, 1 =
+    prior team), finish_rate, cars (car starts), title_prob, exp_points,
+    points_std and exp_position.
+    """
+    seasons, rules = season_inputs(results, races, constructors, table)
+    # Seeds are spawned before filtering, so a season's draws do not depend on `years`
+    seeds = np.random.SeedSequence(seed).spawn(len(seasons))
+    args = [(s, rules, n_sims, sq, chunk_size) for s, sq in zip(seasons, seeds)
+            if years is None or s["year"] in set(int(y) for y in years)]
+    seasons = [a[0] for a in args]
+
+    if workers is None or workers <= 1:
+        accs = [_simulate_season(*a) for a in args]
+    else:
+        with ProcessPoolExecutor(max_workers=workers) as pool:
+            accs = list(pool.map(_simulate_season, *zip(*args)))
+
+    frames = []
+    for s, acc in zip(seasons, accs):
+        mean = acc["points"] / n_sims
+        frames.append(pd.DataFrame({
+            "year": s["year"],
+            "constructorId": s["constructorId"],
+            "name": s["name"],
+            "strength": s["strength"],
+            "finish_rate": s["finish_rate"],
+            "cars": s["cars"],
+            "title_prob": acc["title"] / n_sims,
+            "exp_points": mean,
+            "points_std": np.sqrt(np.maximum(acc["points_sq"] / n_sims - mean ** 2, 0)),
+            "exp_position": acc["position"] / n_sims,
+        }))
+    return pd.concat(frames, ignore_index=True)
+
+
+def with_final_standings(simulated, standings):
+    """
+    Adds the real final constructors' standings (actual_position,
+    actual_points, champion) from f1db-races-constructor-standings.csv.
+    Seasons before the constructors' championship (1958) get NaN.
+    """
+    last = standings["round"] == standings.groupby("year")["round"].transform("max")
+    final = standings.loc[last, ["year", "constructorId", "positionNumber", "points"]].rename(
+        columns={"positionNumber": "actual_position", "points": "actual_points"})
+    final = final.astype({"year": np.int64, "constructorId": str, "actual_position": "float64"})
+    out = simulated.merge(final, on=["year", "constructorId"], how="left")
+    out["champion"] = out["actual_position"] == 1
+    return out
+
+
+def season_summary(simulated):
+    """
+    One row per season: the simulated favourite and its title_prob, and the
+    real champion's title_prob (needs with_final_standings).
+    """
+    fav = simulated.loc[simulated.groupby("year")["title_prob"].idxmax(), ["year", "name", "title_prob"]]
+    fav = fav.rename(columns={"name": "favourite", "title_prob": "favourite_prob"})
+    champ = simulated.loc[simulated["champion"], ["year", "name", "title_prob"]]
+    champ = champ.rename(columns={"name": "champion", "title_prob": "champion_prob"})
+    return fav.merge(champ, on="year", how="left").reset_index(drop=True)
+
+
+# -----------------------------------------------------------
+# 4. Script mode
+# -----------------------------------------------------------
+
+def main(argv=None):
+    parser = argparse.ArgumentParser(description="Monte Carlo constructors' championship simulator.")
+    parser.add_argument("--sims", type=int, default=100_000, help="simulated seasons per year")
+    parser.add_argument("--years", type=int, nargs="*", help="seasons to simulate (default: all)")
+    parser.add_argument("--workers", type=int, default=os.cpu_count())
+    parser.add_argument("--seed", type=int, default=0)
+    parser.add_argument("--chunk-size", type=int, default=5_000)
+    parser.add_argument("--out", default=SIM_RESULTS_PATH)
+    args = parser.parse_args(argv)
+
+    start = time.perf_counter()
+    simulated = simulate_championships(
+        raw_loader.load_table("race_results"), raw_loader.load_table("races"),
+        raw_loader.load_table("constructors"), n_sims=args.sims, years=args.years,
+        workers=args.workers, seed=args.seed, chunk_size=args.chunk_size)
+    simulated = with_final_standings(simulated, raw_loader.load_table("constructor_standings"))
+    elapsed = time.perf_counter() - start
+    save_csv(simulated, args.out)
+
+    summary = season_summary(simulated).dropna(subset=["champion"])
+    upsets = summary[summary["favourite"] != summary["champion"]]
+    print(f"🎲 {simulated['year'].nunique()} seasons x {args.sims:,} simulations in {elapsed:.1f}s "
+          f"→ {args.out}")
+    print(f"   favourite won the title in {len(summary) - len(upsets)} of {len(summary)} seasons")
+    for row in upsets.sort_values("champion_prob").head(5).itertuples():
+        print(f"   {row.year}: {row.champion} won at {row.champion_prob:.1%} "
+              f"({row.favourite} {row.favourite_prob:.1%})")
+    return 0
+
+
+if __name__ == "__main__":
+    sys.exit(main())
@@ -7,16 +7,23 @@ This file:
 - Computes win %, podium %, points share
 - Computes normalized values
 - Computes TDI and Alternate TDI
+- Offers a fused single-pass version of the whole metric stage
 - Adds extra season-level metrics
+- Ranks teams by TDI within each season
+- Scores driver / engine / tyre season tables the same way
+- Optionally blends qualifying pace (gap to pole) into the TDI
 """
 
 import pandas as pd
 import numpy as np
 
+from instrumentation import instrumented
+
 # -----------------------------------------------------------
 # 1. Compute additional raw metrics (win %, podium %, points share)
 # -----------------------------------------------------------
 
+@instrumented()
 def compute_additional_metrics(df):
     """
     Adds core percentage-based metrics for dominance:
@@ -47,6 +54,7 @@ def compute_additional_metrics(df):
 # 2. Normalize metrics (Min–Max Scaling)
 # -----------------------------------------------------------
 
+@instrumented()
 def normalize_metrics(df, metric_columns):
     """
     Applies Min-Max scaling to selected metrics within each season.
@@ -64,6 +72,7 @@ def normalize_metrics(df, metric_columns):
 # 3. Compute the Team Dominance Index (TDI)
 # -----------------------------------------------------------
 
+@instrumented()
 def compute_TDI(df):
     """
     Combines normalized metrics into one score: TDI
@@ -85,6 +94,7 @@ def compute_TDI(df):
 # 4. Compute Alternate TDI (TDI_alt)
 # -----------------------------------------------------------
 
+@instrumented()
 def compute_TDI_alt(df):
     """
     Alternate version (more weight to points share).
@@ -105,6 +115,7 @@ def compute_TDI_alt(df):
 # 5. Master function to compute all metrics
 # -----------------------------------------------------------
 
+@instrumented()
 def build_all_metrics(df):
     """
     Combines all functions:
@@ -123,7 +134,172 @@ def build_all_metrics(df):
     return df
 
 # -----------------------------------------------------------
-# 6. Script mode (if someone runs this file alone)
+# 6. Fused path: metrics, normalization and scoring in one pass
+# -----------------------------------------------------------
+
+NORMALIZE_COLS = ['win_rate', 'podium_rate', 'points_share', 'one_two_rate']
+
+# Rows follow NORMALIZE_COLS, columns are (TDI, TDI_alt)
+TDI_WEIGHTS = np.array([
+    [0.35, 0.25],
+    [0.25, 0.15],
+    [0.25, 0.45],
+    [0.15, 0.15],
+])
+
+
+def year_segments(years):
+    """
+    Stable sort order by year plus segment bookkeeping.
+    Returns (order, starts, seg) where order sorts rows by year, starts are
+    the first sorted index of each year and seg[i] is the year segment of
+    sorted row i.
+    """
+    order = np.argsort(years, kind='stable')
+    sorted_years = years[order]
+    starts = np.flatnonzero(np.r_[True, sorted_years[1:] != sorted_years[:-1]])
+    seg = np.repeat(np.arange(len(starts)), np.diff(np.r_[starts, len(years)]))
+    return order, starts, seg
+
+
+def segment_minmax_normalize(values, starts, seg):
+    """
+    Min-Max scales every column of a year-sorted matrix within its year
+    segment. Segments where a column is constant get 1, like
+    normalize_metrics.
+    """
+    lo = np.minimum.reduceat(values, starts, axis=0)
+    hi = np.maximum.reduceat(values, starts, axis=0)
+    span = (hi - lo)[seg]
+    out = np.ones_like(values)
+    np.divide(values - lo[seg], span, out=out, where=span != 0)
+    return out
+
+
+@instrumented()
+def build_all_metrics_fused(df):
+    """
+    Same output as build_all_metrics, computed on a numeric matrix:
+    - raw rates for all rows at once
+    - per-year sums / min / max with sorted-segment reductions
+    - TDI and TDI_alt as one matrix product with TDI_WEIGHTS
+    The input is copied once (fillna) instead of once per step.
+    """
+    years = df['year'].to_numpy()
+    order, starts, seg = year_segments(years)
+
+    races = df['total_races'].to_numpy(dtype=np.float64)[order]
+    points = df['points'].to_numpy(dtype=np.float64)[order]
+    counts = {0: 'wins', 1: 'podiums', 3: 'one_two_finishes'}
+
+    raw = np.zeros((len(df), len(NORMALIZE_COLS)))
+    for j, col in counts.items():
+        if col in df.columns:
+            values = df[col].to_numpy(dtype=np.float64)[order]
+            np.divide(values, races, out=raw[:, j], where=races != 0)
+
+    # Missing points count as 0 in the year total, as in the groupby sum
+    year_points = np.add.reduceat(np.nan_to_num(points), starts)[seg]
+    np.divide(points, year_points, out=raw[:, 2], where=year_points != 0)
+    raw[np.isnan(raw)] = 0
+
+    norm = segment_minmax_normalize(raw, starts, seg)
+    scores = norm @ TDI_WEIGHTS
+
+    # Scatter back from year order to the caller's row order
+    unsorted = np.empty_like(order)
+    unsorted[order] = np.arange(len(order))
+
+    out = df.fillna(0)
+    for j, col in enumerate(NORMALIZE_COLS):
+        out[col] = raw[unsorted, j]
+    for j, col in enumerate(NORMALIZE_COLS):
+        out[f"{col}_norm"] = norm[unsorted, j]
+    out['TDI'] = scores[unsorted, 0]
+    out['TDI_alt'] = scores[unsorted, 1]
+
+    return out
+
+# -----------------------------------------------------------
+# 7. Normalize and rank TDI within each season
+# -----------------------------------------------------------
+
+@instrumented()
+def rank_TDI(df):
+    """
+    Adds the season-relative columns used by the final results table:
+    - TDI_normalized (Min-Max scaled TDI within the year)
+    - TDI_rank (dense rank, 1 = most dominant team of the year)
+    """
+    df = df.copy()
+
+    df['TDI_normalized'] = df.groupby('year')['TDI'].transform(
+        lambda x: (x - x.min()) / (x.max() - x.min()) if x.max() != x.min() else 1
+    )
+    df['TDI_rank'] = df.groupby('year')['TDI_normalized'].rank(
+        ascending=False, method='dense'
+    )
+    df = df.sort_values(['year', 'TDI_rank']).reset_index(drop=True)
+
+    return df
+
+# -----------------------------------------------------------
+# 8. Score several entity tables (constructors, drivers, engines, ...)
+# -----------------------------------------------------------
+
+def score_summaries(summaries):
+    """
+    Runs the fused metric stage and rank_TDI on every season summary in
+    `summaries` ({entity: DataFrame}, e.g. from
+    team_aggregation.build_entity_year_summaries).
+    Returns {entity: ranked metrics DataFrame}.
+    """
+    scored = {}
+    for entity, summary in summaries.items():
+        metrics_input = summary.rename(columns={'races': 'total_races', 'total_points': 'points'})
+        scored[entity] = rank_TDI(build_all_metrics_fused(metrics_input))
+    return scored
+
+# -----------------------------------------------------------
+# 9. Optional qualifying-pace input
+# -----------------------------------------------------------
+
+QUALI_WEIGHT = 0.15
+
+
+def with_qualifying_pace(df, pace, weight=QUALI_WEIGHT, gap_col='median_gap_pct'):
+    """
+    Joins a qualifying pace table (qualifying.qualifying_pace) onto the
+    metrics on (year, constructorId) and adds:
+    - quali_pace_norm  Min-Max scaled pace within the year (smallest gap
+                       to pole = 1, largest = 0; NaN without qualifying data)
+    - TDI_quali        (1 - weight) * TDI + weight * quali_pace_norm, or
+                       TDI itself where the team-season has no qualifying
+                       data
+    The qualifying file only covers some seasons (1980-2005), so a
+    missing gap is not read as slow: those rows keep their TDI instead
+    of being scaled down by (1 - weight). TDI and TDI_alt are left
+    unchanged; weight=0 gives TDI_quali == TDI.
+    """
+    out = df.merge(pace[['year', 'constructorId', gap_col]], on=['year', 'constructorId'], how='left')
+
+    pace_raw = -out[gap_col].to_numpy(dtype=np.float64)
+    has_pace = ~np.isnan(pace_raw)
+    norm = np.full(len(out), np.nan)
+    if has_pace.any():
+        years = out['year'].to_numpy()[has_pace]
+        order, starts, seg = year_segments(years)
+        scaled = segment_minmax_normalize(pace_raw[has_pace][order][:, None], starts, seg)[:, 0]
+        unsorted = np.empty_like(order)
+        unsorted[order] = np.arange(len(order))
+        norm[has_pace] = scaled[unsorted]
+
+    out['quali_pace_norm'] = norm
+    out['TDI_quali'] = np.where(has_pace, (1 - weight) * out['TDI'] + weight * norm, out['TDI'])
+    return out
+
+# -----------------------------------------------------------
+# 10. Script mode (if someone runs this file alone)
 # -----------------------------------------------------------
 
 if __name__ == "__main__":
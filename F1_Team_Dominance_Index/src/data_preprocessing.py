@@ -15,74 +15,106 @@ Output:
 import os
 import pandas as pd
 
+from dataset_registry import registry_for
+from instrumentation import instrumented
+from raw_loader import load_raw_tables
+
 BASE_DIR = os.path.dirname(os.path.abspath(__file__))
 DATA_DIR = os.path.join(BASE_DIR, "../data")
 RAW_DIR = os.path.join(DATA_DIR, "raw")
 PROCESSED_DIR = os.path.join(DATA_DIR, "processed")
 
-def load_processed_data(processed_dir: str = PROCESSED_DIR):
-   
+
+def _echo(verbose: bool, *args):
+    if verbose:
+        print(*args)
+
+
+@instrumented()
+def load_processed_data(processed_dir: str = PROCESSED_DIR, verbose: bool = False, names=None):
+    """
+    Returns {dataset name: DataFrame} for `names` through the shared
+    DatasetRegistry, so files are read at most once per change and missing
+    ones are read concurrently. Without `names`, returns a lazy mapping of
+    every CSV in processed_dir that reads a file when it is looked up.
+    """
     if not os.path.exists(processed_dir):
         raise FileNotFoundError(f"Processed data directory not found: {processed_dir}")
 
-    print(f"📂 Processed folder: {os.path.abspath(processed_dir)}")
-    csv_files = [f for f in os.listdir(processed_dir) if f.endswith(".csv")]
-    if not csv_files:
+    registry = registry_for(processed_dir)
+    _echo(verbose, f"📂 Processed folder: {os.path.abspath(processed_dir)}")
+    if not registry.available():
         raise FileNotFoundError(" No CSV files found in processed data folder.")
 
-    print(" CSV files found in data/processed:")
-    for file in csv_files:
-        print(f" - {file}")
+    if names is None:
+        datasets = registry.lazy()
+        _echo(verbose, " Datasets available in data/processed (read on first use):")
+    else:
+        datasets = registry.load(names)
+        _echo(verbose, " Datasets loaded from data/processed:")
+    for name in datasets:
+        _echo(verbose, f" - {name}")
+
+    return datasets
+
 
-    data_dict = {}
-    for file in csv_files:
-        path = os.path.join(processed_dir, file)
-        df = pd.read_csv(path)
-        data_dict[file.replace(".csv", "")] = df
+def load_raw_data(tables=None, raw_dir: str = RAW_DIR):
+    """
+    Loads raw f1db tables through the typed, cached loader in raw_loader.
+    Returns a dict keyed by logical table name (race_results, races, ...).
+    """
+    if not os.path.exists(raw_dir):
+        raise FileNotFoundError(f"Raw data directory not found: {raw_dir}")
 
-    return data_dict
+    return load_raw_tables(tables, raw_dir=raw_dir)
 
 
-def clean_dataframe(df: pd.DataFrame, name: str):
+@instrumented()
+def clean_dataframe(df: pd.DataFrame, name: str, verbose: bool = False):
     
-    print(f"\n🧹 Cleaning: {name}")
+    _echo(verbose, f"\n🧹 Cleaning: {name}")
 
-    df.columns = df.columns.str.strip().str.lower().str.replace(" ", "_")
+    # set_axis instead of assigning df.columns: frames from the dataset
+    # registry are shared and must not be renamed in place
+    df = df.set_axis(df.columns.str.strip().str.lower().str.replace(" ", "_"), axis=1)
 
     # Drop duplicates
     before = len(df)
     df = df.drop_duplicates()
     after = len(df)
     if before != after:
-        print(f"Removed {before - after} duplicate rows.")
+        _echo(verbose, f"Removed {before - after} duplicate rows.")
 
     # Null check
     null_counts = df.isnull().sum()
     null_cols = null_counts[null_counts > 0]
     if not null_cols.empty:
-        print("Columns with missing values:")
-        print(null_cols)
+        _echo(verbose, "Columns with missing values:")
+        _echo(verbose, null_cols)
     else:
-        print("No missing values found.")
+        _echo(verbose, "No missing values found.")
 
-    print(f"Shape after cleaning: {df.shape}")
+    _echo(verbose, f"Shape after cleaning: {df.shape}")
     return df
 
 
-def prepare_datasets():
+def prepare_datasets(verbose: bool = True):
    
-    datasets = load_processed_data(PROCESSED_DIR)
-
-    team_summary = datasets.get("team_year_summary")
-    team_dominance = datasets.get("team_dominance_index_with_alt")
+    try:
+        datasets = load_processed_data(
+            PROCESSED_DIR, verbose=verbose,
+            names=["team_year_summary", "team_dominance_index_with_alt"],
+        )
+    except FileNotFoundError as e:
+        raise KeyError(f"Required datasets not found. Ensure processed files exist. ({e})")
 
-    if team_summary is None or team_dominance is None:
-        raise KeyError("Required datasets not found. Ensure processed files exist.")
+    team_summary = datasets["team_year_summary"]
+    team_dominance = datasets["team_dominance_index_with_alt"]
 
-    team_summary = clean_dataframe(team_summary, "team_year_summary")
-    team_dominance = clean_dataframe(team_dominance, "team_dominance_index_with_alt")
+    team_summary = clean_dataframe(team_summary, "team_year_summary", verbose=verbose)
+    team_dominance = clean_dataframe(team_dominance, "team_dominance_index_with_alt", verbose=verbose)
 
-    print("\n✅ All datasets loaded and cleaned successfully.\n")
+    _echo(verbose, "\n✅ All datasets loaded and cleaned successfully.\n")
     return team_summary, team_dominance
 
 
@@ -0,0 +1,222 @@
+"""
+dataset_registry.py
+-------------------
+Lazy, memoized access to the processed team-season datasets.
+
+This file:
+- Maps logical dataset names to files and column dtypes (DATASETS)
+- Reads a dataset only when it is first accessed
+- Reads several missing datasets concurrently on a thread pool
+- LazyDatasets: a read-only {name: DataFrame} mapping that reads each
+  dataset on first lookup
+- Memoizes every frame until it is invalidated or its file changes
+  (size / mtime check on every access)
+
+Cached frames are shared between callers: treat them as read-only and
+copy before modifying.
+
+Input:
+    ../data/processed/*.csv
+"""
+
+import os
+import threading
+from collections.abc import Mapping
+from concurrent.futures import ThreadPoolExecutor
+
+import pandas as pd
+
+BASE_DIR = os.path.dirname(os.path.abspath(__file__))
+PROCESSED_DIR = os.path.join(BASE_DIR, "../data/processed")
+
+# -----------------------------------------------------------
+# 1. Dataset schemas
+# -----------------------------------------------------------
+# Declared dtypes skip type inference for the key and count columns;
+# the remaining (float) columns are inferred as before.
+
+_TEAM_SEASON = {
+    "year": "int64",
+    "constructorId": "str",
+    "name": "str",
+    "races": "int64",
+    "wins": "int64",
+    "podiums": "int64",
+}
+
+DATASETS = {
+    "team_year_summary": {
+        "file": "team_year_summary.csv",
+        "dtypes": _TEAM_SEASON,
+    },
+    "team_year_summary_with_metrics": {
+        "file": "team_year_summary_with_metrics.csv",
+        "dtypes": {**_TEAM_SEASON, "total_races": "int64"},
+    },
+    "team_dominance_index": {
+        "file": "team_dominance_index.csv",
+        "dtypes": _TEAM_SEASON,
+    },
+    "team_dominance_index_with_alt": {
+        "file": "team_dominance_index_with_alt.csv",
+        "dtypes": {**_TEAM_SEASON, "poles": "int64", "one_two_finishes": "int64",
+                   "max_possible_points": "int64"},
+    },
+    "team_dominance_index_with_games": {
+        "file": "team_dominance_index_with_games.csv",
+        "dtypes": {**_TEAM_SEASON, "total_games": "int64"},
+    },
+}
+
+# -----------------------------------------------------------
+# 2. Registry
+# -----------------------------------------------------------
+
+class DatasetRegistry:
+    """
+    Name -> DataFrame access to the CSVs of one directory.
+
+    registry["team_year_summary"]          loads on first access
+    registry.load(["a", "b"])              loads missing ones concurrently
+    registry.lazy()                        mapping that loads on lookup
+    registry.invalidate("a") / .invalidate()  drops memoized frames
+    """
+
+    def __init__(self, data_dir=PROCESSED_DIR, datasets=DATASETS, max_workers=4, discover=True):
+        self.data_dir = data_dir
+        self.max_workers = max_workers
+        self.discover = discover
+        self._specs = dict(datasets)
+        self._cache = {}                                   # name -> (file signature, frame)
+        self._locks = {name: threading.Lock() for name in self._specs}
+        self._discover()
+
+    def _discover(self):
+        # CSVs without a declared schema stay reachable under their file stem
+        if not self.discover or not os.path.isdir(self.data_dir):
+            return
+        known = {spec["file"] for spec in self._specs.values()}
+        for file in sorted(os.listdir(self.data_dir)):
+            name = file[:-len(".csv")]
+            if file.endswith(".csv") and file not in known and name not in self._specs:
+                self._specs[name] = {"file": file, "dtypes": {}}
+                self._locks[name] = threading.Lock()
+
+    # ----------------------- metadata -----------------------
+
+    @property
+    def names(self):
+        """Every registered dataset name."""
+        return list(self._specs)
+
+    def available(self):
+        """Registered datasets whose file exists (re-scans the directory)."""
+        self._discover()
+        return [name for name in self._specs if os.path.exists(self.path(name))]
+
+    @property
+    def loaded(self):
+        """Datasets currently memoized."""
+        return list(self._cache)
+
+    def path(self, name):
+        return os.path.join(self.data_dir, self._spec(name)["file"])
+
+    def _spec(self, name):
+        if name not in self._specs:
+            raise KeyError(f"Unknown dataset '{name}'. Known datasets: {self.names}")
+        return self._specs[name]
+
+    def __contains__(self, name):
+        return name in self._specs
+
+    # ------------------------ access ------------------------
+
+    def get(self, name):
+        """The dataset as a DataFrame, read on first access or after a file change."""
+        spec = self._spec(name)
+        path = self.path(name)
+        with self._locks[name]:
+            if not os.path.exists(path):
+                self._cache.pop(name, None)
+                raise FileNotFoundError(f"Dataset file not found: {path}")
+            stat = os.stat(path)
+            signature = (stat.st_size, stat.st_mtime_ns)
+
+            entry = self._cache.get(name)
+            if entry is None or entry[0] != signature:
+                df = pd.read_csv(path, dtype=spec["dtypes"])
+                entry = self._cache[name] = (signature, df)
+            return entry[1]
+
+    __getitem__ = get
+
+    def load(self, names=None):
+        """
+        Returns {name: DataFrame} for `names` (default: every available
+        dataset). Datasets not yet memoized are read concurrently.
+        """
+        names = self.available() if names is None else list(names)
+        missing = [n for n in names if n not in self._cache]
+        if len(missing) > 1 and self.max_workers > 1:
+            with ThreadPoolExecutor(max_workers=min(self.max_workers, len(missing))) as pool:
+                list(pool.map(self.get, missing))
+        return {name: self.get(name) for name in names}
+
+    def lazy(self, names=None):
+        """
+        {name: DataFrame} mapping over `names` (default: every available
+        dataset) that reads a dataset only when it is looked up.
+        """
+        return LazyDatasets(self, self.available() if names is None else names)
+
+    def invalidate(self, name=None):
+        """Drops one memoized dataset, or all of them."""
+        if name is None:
+            self._cache.clear()
+        else:
+            self._spec(name)
+            self._cache.pop(name, None)
+
+    def __repr__(self):
+        return (f"DatasetRegistry({os.path.abspath(self.data_dir)}, "
+                f"datasets={len(self._specs)}, loaded={len(self._cache)})")
+
+
+class LazyDatasets(Mapping):
+    """
+    Read-only {name: DataFrame} view of a registry. Keys are known up
+    front; a frame is read (or taken from the registry's memo) on lookup.
+    """
+
+    def __init__(self, registry, names):
+        self._registry = registry
+        self._names = list(names)
+        for name in self._names:
+            registry._spec(name)                               # unknown names fail early
+
+    def __getitem__(self, name):
+        if name not in self._names:
+            raise KeyError(name)
+        return self._registry.get(name)
+
+    def __iter__(self):
+        return iter(self._names)
+
+    def __len__(self):
+        return len(self._names)
+
+    def __repr__(self):
+        loaded = [n for n in self._names if n in self._registry.loaded]
+        return f"LazyDatasets({self._names}, loaded={loaded})"
+
+
+_REGISTRIES = {}
+
+
+def registry_for(data_dir=PROCESSED_DIR):
+    """Shared registry per directory, so repeated callers reuse its cache."""
+    key = os.path.abspath(data_dir)
+    if key not in _REGISTRIES:
+        _REGISTRIES[key] = DatasetRegistry(data_dir)
+    return _REGISTRIES[key]
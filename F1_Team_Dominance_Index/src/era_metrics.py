@@ -0,0 +1,219 @@
+"""
+era_metrics.py
+-------------------
+Multi-season dominance: rolling windows, streaks, peak windows and
+decade / era aggregates for every team.
+
+This file:
+- Sorts the TDI table once by (team, year) and builds prefix sums of the
+  score (O(n))
+- Answers a k-season rolling window for every team-season from the
+  prefix sums, so any window length is one vectorized pass, without
+  rebuilding or recomputing each window
+- Finds streaks above a threshold with one run-length pass
+- Aggregates decades / custom eras with grouped bincounts
+
+Windows are calendar windows: the k-season window ending in year y
+covers y-k+1 .. y. Seasons a team did not enter add 0 to the window sum,
+so `rolling_TDI` is the window mean over k seasons; `mean_TDI` is the
+mean over the seasons actually raced.
+
+Usage:
+    from era_metrics import RollingDominance
+    eras = RollingDominance(final_tdi)
+    eras.rolling(5), eras.peak_windows(5), eras.streaks(0.75), eras.top_by_era()
+"""
+
+import numpy as np
+import pandas as pd
+
+from team_aggregation import group_ids
+
+DOMINANCE_THRESHOLD = 0.75
+
+
+class RollingDominance:
+    """
+    Per-team season series of a score (default TDI) with O(n) prefix
+    sums. Accepts the final TDI table or any table with year, `key` and
+    `score` columns; duplicate (key, year) rows are averaged.
+    """
+
+    def __init__(self, df, score="TDI", key="name"):
+        self.score, self.key = score, key
+        data = df[[key, "year", score]].dropna(subset=[key])
+        if data.duplicated([key, "year"]).any():
+            data = data.groupby([key, "year"], as_index=False, sort=False)[score].mean()
+        data = data.sort_values([key, "year"], kind="stable").reset_index(drop=True)
+        self.frame = data
+
+        self.names = data[key].to_numpy(dtype=object)
+        self.years = data["year"].to_numpy(dtype=np.int64)
+        self.values = data[score].to_numpy(dtype=np.float64)
+
+        new_team = np.r_[True, self.names[1:] != self.names[:-1]] if len(data) else np.array([], bool)
+        self.team = np.cumsum(new_team) - 1                  # team code per row
+        self.team_start = np.flatnonzero(new_team)           # first row of each team
+
+        # Prefix sums over the sorted series; row i's entry covers rows < i
+        self.csum = np.r_[0.0, np.cumsum(self.values)]
+
+        # Composite (team, year) key, increasing along the sorted rows
+        span = int(self.years.max() - self.years.min() + 2) if len(data) else 1
+        self._year0, self._span = (int(self.years.min()) if len(data) else 0), span
+        self._order_key = self.team * span + (self.years - self._year0)
+
+    # ----------------------- windows -----------------------
+
+    def _window_start(self, k):
+        """First row of each row's k-season window (same team, year >= y-k+1)."""
+        lo_year = np.maximum(self.years - k + 1 - self._year0, 0)
+        return np.searchsorted(self._order_key, self.team * self._span + lo_year, side="left")
+
+    def rolling(self, k):
+        """
+        One row per team-season: the k-season window ending that season.
+        Columns: key, year, start_year, seasons (raced in the window),
+        window_sum, rolling_TDI (sum / k), mean_TDI (sum / seasons).
+        """
+        if k < 1:
+            raise ValueError("Window length must be at least 1 season")
+        rows = np.arange(len(self.values))
+        start = self._window_start(k)
+        total = self.csum[rows + 1] - self.csum[start]
+        seasons = rows + 1 - start
+        return pd.DataFrame({
+            self.key: self.names,
+            "year": self.years,
+            "start_year": self.years - k + 1,
+            "seasons": seasons,
+            "window_sum": total,
+            f"rolling_{self.score}": total / k,
+            f"mean_{self.score}": total / seasons,
+        })
+
+    def peak_windows(self, k, top=None):
+        """Each team's best k-season window (highest rolling score), best teams first."""
+        windows = self.rolling(k)
+        column = f"rolling_{self.score}"
+        best = windows.sort_values([column, "year"], ascending=[False, True], kind="stable")
+        best = best.drop_duplicates(self.key).reset_index(drop=True)
+        best = best.rename(columns={"year": "end_year"})
+        best = best[[self.key, "start_year", "end_year", "seasons", column]]
+        return best if top is None else best.head(top)
+
+    # ----------------------- streaks -----------------------
+
+    def streaks(self, threshold=DOMINANCE_THRESHOLD, min_length=1):
+        """
+        Runs of consecutive seasons with score > threshold.
+        Columns: key, start_year, end_year, length, mean score, peak score;
+        longest first.
+        """
+        above = self.values > threshold
+        idx = np.flatnonzero(above)
+        if not len(idx):
+            return pd.DataFrame(columns=[self.key, "start_year", "end_year", "length",
+                                         f"mean_{self.score}", f"peak_{self.score}"])
+
+        # A run breaks when the team changes or a season is skipped / not above
+        breaks = np.r_[True, (np.diff(idx) != 1)
+                       | (self.team[idx[1:]] != self.team[idx[:-1]])
+                       | (np.diff(self.years[idx]) != 1)]
+        run = np.cumsum(breaks) - 1
+        starts = idx[breaks]
+        ends = idx[np.r_[breaks[1:], True]]
+        length = np.bincount(run)
+        total = np.bincount(run, weights=self.values[idx])
+        peak = np.maximum.reduceat(self.values[idx], np.flatnonzero(breaks))
+
+        out = pd.DataFrame({
+            self.key: self.names[starts],
+            "start_year": self.years[starts],
+            "end_year": self.years[ends],
+            "length": length,
+            f"mean_{self.score}": total / length,
+            f"peak_{self.score}": peak,
+        })
+        out = out[out["length"] >= min_length]
+        return out.sort_values(["length", f"mean_{self.score}"], ascending=False,
+                               kind="stable").reset_index(drop=True)
+
+    def dominance_summary(self, threshold=DOMINANCE_THRESHOLD):
+        """
+        The notebook's dominance table, per team: dominant seasons
+        (score > threshold), peak year / score and longest dominant streak.
+        """
+        n_teams = len(self.team_start)
+        above = self.values > threshold
+        dominant = np.bincount(self.team, weights=above, minlength=n_teams).astype(np.int64)
+
+        # Peak row per team: sort by (team, score desc) and take each team's first row
+        order = np.lexsort((-self.values, self.team))
+        first = order[np.r_[True, self.team[order][1:] != self.team[order][:-1]]]
+
+        longest = np.zeros(n_teams, dtype=np.int64)
+        streaks = self.streaks(threshold)
+        if len(streaks):
+            team_of = pd.Index(self.names[self.team_start]).get_indexer(streaks[self.key])
+            np.maximum.at(longest, team_of, streaks["length"].to_numpy())
+
+        out = pd.DataFrame({
+            self.key: self.names[self.team_start],
+            "dominant_years": dominant,
+            "peak_year": self.years[first],
+            f"peak_{self.score}": self.values[first],
+            "longest_streak": longest,
+        })
+        return out.sort_values("dominant_years", ascending=False, kind="stable").reset_index(drop=True)
+
+    # ------------------------ eras ------------------------
+
+    def eras(self, bounds=None, span=10, threshold=DOMINANCE_THRESHOLD):
+        """
+        Aggregates per (era, team). Eras are decades by default (`span`
+        years, aligned to multiples of span) or the half-open intervals
+        given by sorted `bounds`, e.g. [1950, 1983, 2014].
+        Columns: era, key, seasons, mean score, max score, dominant seasons
+        (score > threshold).
+        """
+        if bounds is None:
+            era = self.years // span * span
+        else:
+            bounds = np.asarray(sorted(bounds))
+            pos = np.searchsorted(bounds, self.years, side="right") - 1
+            keep = pos >= 0
+            era = np.where(keep, bounds[np.maximum(pos, 0)], -1)
+        keep = era >= 0
+
+        era_codes, eras = pd.factorize(era[keep], sort=True)
+        gid, n, first = group_ids(era_codes, self.team[keep])
+        values = self.values[keep]
+        seasons = np.bincount(gid, minlength=n)
+        peak = np.full(n, -np.inf)
+        np.maximum.at(peak, gid, values)
+
+        return pd.DataFrame({
+            "era": np.asarray(eras)[era_codes[first]],
+            self.key: self.names[keep][first],
+            "seasons": seasons,
+            f"mean_{self.score}": np.bincount(gid, weights=values, minlength=n) / seasons,
+            f"max_{self.score}": peak,
+            "dominant_seasons": np.bincount(
+                gid, weights=values > threshold, minlength=n).astype(np.int64),
+        })
+
+    def top_by_era(self, bounds=None, span=10):
+        """
+        Most dominant team of every era by mean score -- the notebooks'
+        decade_dominance_summary (decade, name, TDI) for the default decades.
+        """
+        table = self.eras(bounds, span)
+        column = f"mean_{self.score}"
+        top = table.sort_values(["era", column], ascending=[True, False], kind="stable")
+        top = top.drop_duplicates("era").reset_index(drop=True)
+        top = top[["era", self.key, column]].rename(columns={column: self.score})
+        return top.rename(columns={"era": "decade"}) if bounds is None and span == 10 else top
+
+    def __repr__(self):
+        return f"RollingDominance(rows={len(self.values)}, teams={len(self.team_start)}, score={self.score!r})"
@@ -0,0 +1,310 @@
+"""
+f1tdi.py
+-------------------
+Single command-line entry point for the F1 Team Dominance Index tools.
+
+Subcommands:
+    build     run the cached pipeline (or fold in new race results)
+    query     answer questions from the final TDI table
+    serve     run the local HTTP/JSON query service
+    simulate  Monte Carlo constructors' championship probabilities
+    render    batch-render every chart to files
+    validate  stream-validate raw tables and processed datasets
+    bench     import-time budget check, metric and pipeline benchmarks
+
+Heavy modules (pandas, numpy, matplotlib, seaborn) are imported only by
+the subcommands that need them. `query` answers from the SQLite results
+store (results_store, stdlib sqlite3) and falls back to reading the
+final CSV with the csv module, so it never pays for the data or
+plotting stack.
+
+Usage:
+    python src/f1tdi.py query top 2022 -n 5
+    python src/f1tdi.py query team "Red Bull"
+    python src/f1tdi.py serve [--port 8765]
+    python src/f1tdi.py build [--force] [--new-results CSV] [--profile auto]
+    python src/f1tdi.py simulate [--sims 100000] [--years 2008 2021] [--workers 4]
+    python src/f1tdi.py render [--formats png svg] [--workers 4]
+    python src/f1tdi.py validate [--tables race_results] [--json]
+    python src/f1tdi.py bench imports [--budget-ms 150]
+    python src/f1tdi.py bench pipeline --scales 1 10
+"""
+
+import argparse
+import csv
+import json
+import os
+import subprocess
+import sys
+import time
+
+BASE_DIR = os.path.dirname(os.path.abspath(__file__))
+PROJECT_DIR = os.path.dirname(BASE_DIR)
+FINAL_TDI_CSV = os.path.join(PROJECT_DIR, "output", "results", "final_team_tdi.csv")
+RESULTS_DB = os.path.join(PROJECT_DIR, "output", "tdi.db")
+
+# `bench` targets that delegate to a script in benchmarks/
+BENCH_SCRIPTS = {
+    "metrics": "bench_compute_metrics.py",
+    "pipeline": "bench_pipeline.py",
+}
+
+# Modules a non-plotting query must never import
+HEAVY_MODULES = ("pandas", "numpy", "matplotlib", "seaborn")
+IMPORT_BUDGET_MS = 150          # import time allowed for `query` (tests/test_import_time.py)
+
+# -----------------------------------------------------------
+# 1. query (stdlib only)
+# -----------------------------------------------------------
+
+def _read_rows(path):
+    if not os.path.exists(path):
+        raise FileNotFoundError(f"File not found: {path}")
+    with open(path, newline="") as f:
+        return list(csv.DictReader(f))
+
+
+def query_top(path, year, n):
+    rows = [r for r in _read_rows(path) if int(r["year"]) == year]
+    rows.sort(key=lambda r: float(r["TDI"]), reverse=True)
+    return rows[:n]
+
+
+def query_team(path, name):
+    wanted = name.lower()
+    rows = [r for r in _read_rows(path) if r["name"].lower() == wanted]
+    rows.sort(key=lambda r: int(r["year"]))
+    return rows
+
+
+def _store(args):
+    """The results store when no CSV was requested and the database exists, else None."""
+    if args.csv is not None or not os.path.exists(args.db):
+        return None
+    import results_store
+
+    return results_store.ResultsStore(args.db, readonly=True)
+
+
+def _print_rows(rows, as_json):
+    if as_json:
+        print(json.dumps(rows, indent=2))
+        return
+    if not rows:
+        print("No matching rows.")
+        return
+    columns = list(rows[0])
+    widths = {c: max(len(c), *(len(str(r[c])) for r in rows)) for c in columns}
+    print("  ".join(c.ljust(widths[c]) for c in columns))
+    for r in rows:
+        print("  ".join(str(r[c]).ljust(widths[c]) for c in columns))
+
+
+def cmd_query(args):
+    store = _store(args)
+    if store is not None:
+        with store:
+            rows = store.top(args.year, args.n) if args.what == "top" else store.team(args.name)
+    elif args.what == "top":
+        rows = query_top(args.csv or FINAL_TDI_CSV, args.year, args.n)
+    else:
+        rows = query_team(args.csv or FINAL_TDI_CSV, args.name)
+    _print_rows(rows, args.json)
+    return 0
+
+
+# -----------------------------------------------------------
+# 2. build / render / serve / simulate (load their modules lazily)
+# -----------------------------------------------------------
+
+def cmd_build(args):
+    import logging
+    import main_pipeline
+
+    if args.new_results:
+        main_pipeline.update(args.new_results)
+        return 0
+    logging.getLogger().setLevel(logging.INFO)
+    return main_pipeline.main(force=args.force, report=not args.no_report,
+                              profile=args.profile, trace_memory=args.trace_memory)
+
+
+def cmd_render(args):
+    import batch_render
+    import pandas as pd
+
+    result = batch_render.render_all(pd.read_csv(args.csv), out_dir=args.out,
+                                     formats=args.formats, workers=args.workers,
+                                     force=args.force)
+    print(f"🖼  Rendered {len(result['rendered'])} files, "
+          f"skipped {len(result['skipped'])} unchanged → {os.path.abspath(args.out)}")
+    return 0
+
+
+def cmd_serve(args):
+    import tdi_service
+
+    argv = ["--host", args.host, "--port", str(args.port), "--db", args.db]
+    return tdi_service.main(argv)
+
+
+def cmd_simulate(args):
+    import championship_sim
+
+    argv = ["--sims", str(args.sims), "--seed", str(args.seed), "--out", args.out]
+    if args.workers is not None:
+        argv += ["--workers", str(args.workers)]
+    if args.years:
+        argv += ["--years"] + [str(y) for y in args.years]
+    return championship_sim.main(argv)
+
+
+def cmd_validate(args):
+    import validation
+
+    tables = args.tables or list(validation.SCHEMAS)
+    reports = [validation.validate_table(t, raw_dir=args.raw_dir, chunksize=args.chunksize)
+               for t in tables]
+    if args.json:
+        print(json.dumps(reports, indent=2))
+    else:
+        for report in reports:
+            print(validation.format_report(report))
+    return 0 if all(r["ok"] for r in reports) else 1
+
+
+# -----------------------------------------------------------
+# 3. bench
+# -----------------------------------------------------------
+
+def import_profile(argv):
+    """
+    Runs `python -X importtime f1tdi.py <argv>` and returns
+    (wall_seconds, total_import_us, {module: cumulative_us}).
+    """
+    cmd = [sys.executable, "-X", "importtime", os.path.abspath(__file__)] + argv
+    start = time.perf_counter()
+    proc = subprocess.run(cmd, capture_output=True, text=True)
+    wall = time.perf_counter() - start
+    if proc.returncode != 0:
+        raise RuntimeError(f"{' '.join(argv)} failed:\n{proc.stderr}")
+
+    total, modules = 0, {}
+    for line in proc.stderr.splitlines():
+        if not line.startswith("import time:") or "self [us]" in line:
+            continue
+        self_us, cumulative_us, name = line[len("import time:"):].split("|")
+        total += int(self_us)
+        modules[name.strip()] = int(cumulative_us)
+    return wall, total, modules
+
+
+def cmd_bench(args):
+    if args.what in BENCH_SCRIPTS:
+        script = os.path.join(PROJECT_DIR, "benchmarks", BENCH_SCRIPTS[args.what])
+        return subprocess.call([sys.executable, script] + args.extra)
+
+    year = args.year
+    if year is None:
+        year = max(int(r["year"]) for r in _read_rows(FINAL_TDI_CSV))
+    wall, total_us, modules = import_profile(["query", "top", str(year), "-n", "1"])
+
+    heavy = sorted(m for m in modules if m.split(".")[0] in HEAVY_MODULES and "." not in m)
+    slowest = sorted(modules.items(), key=lambda kv: kv[1], reverse=True)[:5]
+
+    print(f"⏱  query top {year}: wall {wall * 1000:.0f} ms, imports {total_us / 1000:.1f} ms "
+          f"(budget {args.budget_ms} ms)")
+    for name, us in slowest:
+        print(f"   {us / 1000:7.1f} ms  {name}")
+
+    failed = False
+    if heavy:
+        print(f"❌ Heavy modules imported by a non-plotting query: {heavy}")
+        failed = True
+    if total_us / 1000 > args.budget_ms:
+        print("❌ Import-time budget exceeded")
+        failed = True
+    if not failed:
+        print("✅ Within import-time budget")
+    return 1 if failed else 0
+
+
+# -----------------------------------------------------------
+# 4. Argument parsing
+# -----------------------------------------------------------
+
+def build_parser():
+    parser = argparse.ArgumentParser(prog="f1tdi", description="F1 Team Dominance Index tools")
+    sub = parser.add_subparsers(dest="command", required=True)
+
+    p = sub.add_parser("build", help="run the pipeline")
+    p.add_argument("--force", action="store_true", help="ignore the stage cache")
+    p.add_argument("--new-results", metavar="CSV", help="fold new race-result rows into the outputs")
+    p.add_argument("--no-report", action="store_true", help="skip the JSON run report")
+    p.add_argument("--trace-memory", action="store_true", help="add tracemalloc peaks to the report (slower)")
+    p.add_argument("--profile", metavar="STAGE", help="cProfile one stage ('auto' = previous slowest)")
+    p.set_defaults(func=cmd_build)
+
+    p = sub.add_parser("query", help="query the final TDI table")
+    p.add_argument("--db", default=RESULTS_DB, help="results database (used when it exists)")
+    p.add_argument("--csv", default=None, help="read this CSV instead of the database")
+    p.add_argument("--json", action="store_true", help="print JSON instead of a table")
+    qsub = p.add_subparsers(dest="what", required=True)
+    q = qsub.add_parser("top", help="top teams of a season")
+    q.add_argument("year", type=int)
+    q.add_argument("-n", type=int, default=10)
+    q = qsub.add_parser("team", help="one team's TDI by season")
+    q.add_argument("name")
+    p.set_defaults(func=cmd_query)
+
+    p = sub.add_parser("serve", help="serve the results database over HTTP/JSON")
+    p.add_argument("--host", default="127.0.0.1")
+    p.add_argument("--port", type=int, default=8765)
+    p.add_argument("--db", default=RESULTS_DB)
+    p.set_defaults(func=cmd_serve)
+
+    p = sub.add_parser("simulate", help="simulate constructors' championships (title probabilities)")
+    p.add_argument("--sims", type=int, default=100_000, help="simulated seasons per year")
+    p.add_argument("--years", type=int, nargs="+", default=None)
+    p.add_argument("--workers", type=int, default=None, help="processes (default: all CPUs)")
+    p.add_argument("--seed", type=int, default=0)
+    p.add_argument("--out", default=os.path.join(PROJECT_DIR, "output", "results", "championship_probabilities.csv"))
+    p.set_defaults(func=cmd_simulate)
+
+    p = sub.add_parser("render", help="render every chart to files")
+    p.add_argument("--csv", default=FINAL_TDI_CSV)
+    p.add_argument("--out", default=os.path.join(PROJECT_DIR, "output", "visuals"))
+    p.add_argument("--formats", nargs="+", default=["png"])
+    p.add_argument("--workers", type=int, default=None)
+    p.add_argument("--force", action="store_true")
+    p.set_defaults(func=cmd_render)
+
+    p = sub.add_parser("validate", help="stream-validate raw tables and processed datasets")
+    p.add_argument("--tables", nargs="+", default=None, help="table names (default: all raw tables)")
+    p.add_argument("--raw-dir", default=os.path.join(PROJECT_DIR, "data", "raw"))
+    p.add_argument("--chunksize", type=int, default=100_000)
+    p.add_argument("--json", action="store_true", help="print the reports as JSON")
+    p.set_defaults(func=cmd_validate)
+
+    p = sub.add_parser("bench", help="benchmarks")
+    p.add_argument("what", choices=["imports"] + list(BENCH_SCRIPTS))
+    p.add_argument("--budget-ms", type=float, default=IMPORT_BUDGET_MS,
+                   help="import-time budget for `query` (imports)")
+    p.add_argument("--year", type=int, default=None, help="season to query (imports)")
+    p.add_argument("extra", nargs=argparse.REMAINDER, help="arguments passed to the benchmark script")
+    p.set_defaults(func=cmd_bench)
+
+    return parser
+
+
+def main(argv=None):
+    args = build_parser().parse_args(argv)
+    try:
+        return args.func(args)
+    except (FileNotFoundError, KeyError, RuntimeError) as e:
+        print(f"❌ Error: {e}", file=sys.stderr)
+        return 1
+
+
+if __name__ == "__main__":
+    sys.exit(main())
@@ -0,0 +1,271 @@
+"""
+head_to_head.py
+-------------------
+Pairwise dominance: how often each team finished ahead of each other team
+in the races they both entered, season by season.
+
+This file:
+- Reduces the race results to one finish per (race, team): the team's
+  best-placed car
+- Groups races by number of entrants and compares all entrants of a
+  block of races at once by broadcasting over the upper-triangle pairs
+  (no per-race Python loop)
+- Accumulates the (season, team, opponent) counts sparsely: each block
+  is collapsed to its distinct pair keys, only pairs that actually met
+  are ever stored
+- Works for drivers, engines and tyres too (team_aggregation.ENTITY_KEYS)
+
+"Ahead" compares positionDisplayOrder, the same finishing order the
+summary's wins / podiums use; equal orders count as a race together
+but neither team ahead.
+
+Usage:
+    from head_to_head import build_head_to_head
+    h2h = build_head_to_head(results, races, constructors)
+    h2h.matrix(2023)            # team x opponent "beats" counts for one season
+    h2h.table()                 # long (year, team, opponent) table
+    h2h.season_summary()        # per team-season totals, see with_head_to_head
+"""
+
+import numpy as np
+import pandas as pd
+
+from race_store import as_frame
+from team_aggregation import ENTITY_KEYS, encode_keys, group_ids
+
+# Pairs compared per broadcast block; bounds the temporary arrays
+BLOCK_PAIRS = 2_000_000
+
+# -----------------------------------------------------------
+# 1. Sparse season x team x opponent counts
+# -----------------------------------------------------------
+
+class HeadToHead:
+    """
+    Sparse head-to-head counts for one entity type.
+
+    Stored per season and unordered pair (a < b, entity codes):
+    ahead_a (a finished ahead of b), ahead_b and ties. Codes index
+    `ids` / `names`.
+    """
+
+    def __init__(self, entity, years, a, b, ahead_a, ahead_b, ties, ids, names):
+        self.entity, self.key = entity, ENTITY_KEYS[entity]
+        self.years, self.a, self.b = years, a, b
+        self.ahead_a, self.ahead_b, self.ties = ahead_a, ahead_b, ties
+        self.ids, self.names = ids, names
+        self._table = None
+
+    def __len__(self):
+        return len(self.years)
+
+    def _directed(self):
+        # Both orientations of every pair: (team, opponent, ahead, behind)
+        team = np.concatenate([self.a, self.b])
+        opponent = np.concatenate([self.b, self.a])
+        ahead = np.concatenate([self.ahead_a, self.ahead_b])
+        behind = np.concatenate([self.ahead_b, self.ahead_a])
+        races = ahead + behind + np.concatenate([self.ties, self.ties])
+        return np.concatenate([self.years, self.years]), team, opponent, ahead, behind, races
+
+    def table(self):
+        """
+        One row per season, team and opponent they met:
+        year, <key>, name, opponent_<key>, opponent, races, ahead, behind,
+        ahead_rate (ahead / races together).
+        Sorted by year, built once and cached: treat it as read-only.
+        """
+        if self._table is not None:
+            return self._table
+        years, team, opponent, ahead, behind, races = self._directed()
+        order = np.lexsort((opponent, team, years))
+        years, team, opponent, ahead, behind, races = (
+            years[order], team[order], opponent[order], ahead[order], behind[order], races[order])
+        self._table = pd.DataFrame({
+            "year": years,
+            self.key: self.ids[team],
+            "name": self.names[team],
+            f"opponent_{self.key}": self.ids[opponent],
+            "opponent": self.names[opponent],
+            "races": races,
+            "ahead": ahead,
+            "behind": behind,
+            "ahead_rate": ahead / races,
+        })
+        return self._table
+
+    def matrix(self, year, value="ahead"):
+        """
+        Dense team x opponent matrix for one season, labelled by name.
+        value: "ahead" (row team ahead of column team), "behind", "races"
+        or "ahead_rate".
+        """
+        table = self.table()
+        years = table["year"].to_numpy()
+        season = table.iloc[np.searchsorted(years, year, "left"):np.searchsorted(years, year, "right")]
+        if season.empty:
+            raise KeyError(f"No head-to-head data for {year}")
+        teams = np.unique(np.concatenate([season["name"].to_numpy(dtype=object),
+                                          season["opponent"].to_numpy(dtype=object)]))
+        matrix = season.pivot_table(index="name", columns="opponent", values=value,
+                                    aggfunc="sum", sort=True)
+        matrix = matrix.reindex(index=teams, columns=teams)
+        return matrix if value == "ahead_rate" else matrix.fillna(0).astype(np.int64)
+
+    def cube(self, value="ahead", years=None):
+        """
+        Dense (season, team, opponent) array of `value` counts for
+        `years` (default: every season), over the teams that raced in
+        them. Returns (years, team ids, array). Size grows with
+        seasons x teams^2, so restrict `years` for driver-level data.
+        """
+        all_years, team, opponent, ahead, behind, races = self._directed()
+        counts = {"ahead": ahead, "behind": behind, "races": races}[value]
+        keep = np.ones(len(all_years), bool) if years is None else np.isin(all_years, years)
+        season_codes, seasons = pd.factorize(all_years[keep], sort=True)
+        team_codes, teams = pd.factorize(np.concatenate([team[keep], opponent[keep]]), sort=True)
+        rows = len(season_codes)
+        out = np.zeros((len(seasons), len(teams), len(teams)), dtype=np.int64)
+        out[season_codes, team_codes[:rows], team_codes[rows:]] = counts[keep]
+        return np.asarray(seasons), self.ids[np.asarray(teams, dtype=np.int64)], out
+
+    def season_summary(self):
+        """
+        Per team-season totals over all opponents: h2h_races (opponent
+        meetings), h2h_ahead, h2h_behind and h2h_rate
+        (ahead / (ahead + behind)).
+        """
+        years, team, _, ahead, behind, races = self._directed()
+        gid, n, first = group_ids(years - years.min() if len(years) else years, team)
+        ahead_sum = np.bincount(gid, weights=ahead, minlength=n).astype(np.int64)
+        behind_sum = np.bincount(gid, weights=behind, minlength=n).astype(np.int64)
+        decided = ahead_sum + behind_sum
+        return pd.DataFrame({
+            "year": years[first],
+            self.key: self.ids[team[first]],
+            "h2h_races": np.bincount(gid, weights=races, minlength=n).astype(np.int64),
+            "h2h_ahead": ahead_sum,
+            "h2h_behind": behind_sum,
+            "h2h_rate": np.divide(ahead_sum, decided, out=np.full(n, np.nan), where=decided > 0),
+        })
+
+    def __repr__(self):
+        return (f"HeadToHead({self.entity!r}, pairs={len(self)}, "
+                f"seasons={len(np.unique(self.years))}, entities={len(self.ids)})")
+
+
+# -----------------------------------------------------------
+# 2. Build from race results
+# -----------------------------------------------------------
+
+def _best_finish_per_race(race_pos, codes, finish):
+    """Rows reduced to one (race, entity) each, keeping the best finish, sorted by race then finish."""
+    if not len(race_pos):
+        return race_pos, codes, finish
+    order = np.lexsort((finish, codes, race_pos))
+    race_pos, codes, finish = race_pos[order], codes[order], finish[order]
+    first = np.r_[True, (race_pos[1:] != race_pos[:-1]) | (codes[1:] != codes[:-1])]
+    race_pos, codes, finish = race_pos[first], codes[first], finish[first]
+    order = np.lexsort((finish, race_pos))
+    return race_pos[order], codes[order], finish[order]
+
+
+def _count_pairs(season, codes, finish, race_starts, sizes, n_codes):
+    """
+    Compares every pair of entrants inside each race and returns the
+    distinct (season, a, b) keys with ahead_a / ahead_b / tie counts.
+    Rows are sorted by finish within each race, so in a pair (i < j)
+    entrant i is ahead unless the finishes are equal.
+    """
+    keys, weights = [], []
+    for n in np.unique(sizes):
+        if n < 2:
+            continue
+        starts = race_starts[sizes == n]
+        iu, ju = np.triu_indices(n, 1)
+        per_block = max(1, BLOCK_PAIRS // len(iu))
+        for lo in range(0, len(starts), per_block):
+            rows = starts[lo:lo + per_block, None] + np.arange(n)      # (races, n)
+            first, second = rows[:, iu].ravel(), rows[:, ju].ravel()
+            ca, cb = codes[first], codes[second]
+            tie = finish[first] == finish[second]
+            a, b = np.minimum(ca, cb), np.maximum(ca, cb)
+            key = (season[first] * n_codes + a) * n_codes + b
+            # 0: a ahead, 1: b ahead, 2: tie
+            outcome = np.where(tie, 2, np.where(ca == a, 0, 1))
+            block_keys, inverse = np.unique(key, return_inverse=True)
+            counts = np.bincount(inverse.ravel() * 3 + outcome, minlength=3 * len(block_keys))
+            keys.append(block_keys)
+            weights.append(counts.reshape(-1, 3))
+
+    if not keys:
+        return np.array([], dtype=np.int64), np.zeros((0, 3), dtype=np.int64)
+    keys, weights = np.concatenate(keys), np.concatenate(weights)
+    uniques, inverse = np.unique(keys, return_inverse=True)
+    totals = np.stack([np.bincount(inverse.ravel(), weights=weights[:, i], minlength=len(uniques))
+                       for i in range(3)], axis=1).astype(np.int64)
+    return uniques, totals
+
+
+def build_head_to_head(results, races, constructors=None, entity="constructor"):
+    """
+    Builds the HeadToHead counts for `entity` (constructor, driver,
+    engine or tyre) from raw race results. Constructors follow
+    build_team_year_summary's rules: rows for constructors missing from
+    `constructors` are dropped and names come from that table; other
+    entities are named by their id. `results` may also be a
+    race_store.RaceResultsStore.
+    """
+    if entity not in ENTITY_KEYS:
+        raise KeyError(f"Unknown entity '{entity}'. Known entities: {list(ENTITY_KEYS)}")
+    key = ENTITY_KEYS[entity]
+    results = as_frame(results, ["raceId", "positionDisplayOrder", key])
+
+    race_pos = pd.Index(races["id"].to_numpy()).get_indexer(results["raceId"].to_numpy())
+    codes, ids = encode_keys(results[key])
+    keep = (race_pos >= 0) & (codes >= 0)
+    if entity == "constructor":
+        if constructors is None:
+            raise ValueError("build_head_to_head needs the constructors table for entity='constructor'")
+        name_pos = pd.Index(constructors["id"].astype(str)).get_indexer(ids)
+        keep &= name_pos[np.where(codes >= 0, codes, 0)] >= 0
+        names = np.full(len(ids), None, dtype=object)
+        names[name_pos >= 0] = constructors["name"].to_numpy(dtype=object)[name_pos[name_pos >= 0]]
+    else:
+        names = ids
+
+    finish = results["positionDisplayOrder"].to_numpy(dtype=np.float64)
+    race_pos, codes, finish = _best_finish_per_race(race_pos[keep], codes[keep], finish[keep])
+
+    race_year = races["year"].to_numpy().astype(np.int64)
+    year0 = int(race_year.min()) if len(race_year) else 0
+    season = race_year[race_pos] - year0
+
+    race_starts = np.flatnonzero(np.r_[True, race_pos[1:] != race_pos[:-1]][:len(race_pos)])
+    sizes = np.diff(np.r_[race_starts, len(race_pos)])
+
+    n_codes = max(len(ids), 1)
+    pair_keys, totals = _count_pairs(season, codes, finish, race_starts, sizes, n_codes)
+    pair_season, rest = np.divmod(pair_keys, n_codes * n_codes)
+    a, b = np.divmod(rest, n_codes)
+
+    return HeadToHead(entity, pair_season + year0, a, b,
+                      totals[:, 0], totals[:, 1], totals[:, 2], ids, names)
+
+
+# -----------------------------------------------------------
+# 3. Alongside the TDI metrics
+# -----------------------------------------------------------
+
+def with_head_to_head(metrics, h2h):
+    """
+    build_all_metrics / build_all_metrics_fused output with the
+    per-season head-to-head totals (h2h_races, h2h_ahead, h2h_behind,
+    h2h_rate) joined on (year, <entity key>). Teams without a shared
+    race keep NaN / 0.
+    """
+    summary = h2h.season_summary()
+    out = metrics.merge(summary, on=["year", h2h.key], how="left")
+    for column in ("h2h_races", "h2h_ahead", "h2h_behind"):
+        out[column] = out[column].fillna(0).astype(np.int64)
+    return out
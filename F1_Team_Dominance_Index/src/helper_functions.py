@@ -1,15 +1,8 @@
-import pandas as pd
-import numpy as np
 import os
 import logging
 
-# ------------------------------------------------------
-# Logging Setup
-# ------------------------------------------------------
-logging.basicConfig(
-    level=logging.INFO,
-    format="%(levelname)s - %(message)s"
-)
+# pandas is imported inside the CSV helpers so that importing this module
+# stays cheap; logging is configured by the entry points (main_pipeline, f1tdi).
 
 # ------------------------------------------------------
 # File Helpers
@@ -18,6 +11,8 @@ def load_csv(path):
     if not os.path.exists(path):
         logging.error(f"File not found: {path}")
         return None
+    import pandas as pd
+
     try:
         df = pd.read_csv(path)
         logging.info(f"Loaded file: {path}  | Shape: {df.shape}")
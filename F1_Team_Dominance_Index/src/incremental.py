@@ -0,0 +1,225 @@
+"""
+incremental.py
+-------------------
+Per-season incremental refresh of the TDI outputs when new race results
+arrive (e.g. one Grand Prix weekend mid-season).
+
+Every metric in compute_metrics is scoped by season: points_share sums
+within the year and normalize_metrics scales within the year. So a new
+round only needs:
+1. The new rows aggregated and added to that season's summary rows
+2. That one season re-scored with build_all_metrics + rank_TDI
+3. That season's rows replaced in every output CSV
+
+Output CSVs are sorted by year, so the current season is the trailing
+block of each file. It is located by reading the file backwards and
+replaced by truncate + append, which keeps the update cost independent of
+how many historical seasons the files hold. A season that is not the
+trailing block falls back to a full rewrite of that file.
+
+new_results must hold complete results for races not yet included in the
+stored summary (re-applying the same race would count it twice).
+season_results rebuilds the full result rows of the affected seasons for
+outputs that need more than the summary's additive aggregates.
+"""
+
+import io
+import logging
+import os
+
+import numpy as np
+import pandas as pd
+
+from compute_metrics import build_all_metrics_fused, rank_TDI
+from team_aggregation import SUMMARY_COLUMNS, build_team_year_summary
+
+ADDITIVE_COLUMNS = ['races', 'entries', 'wins', 'podiums', 'one_two_finishes', 'poles']
+
+# -----------------------------------------------------------
+# 1. Merge new rows into a season's summary
+# -----------------------------------------------------------
+
+def merge_season_summary(season_summary, partial):
+    """
+    Adds the aggregates of new results (`partial`, from
+    build_team_year_summary) onto the stored summary rows of the same season.
+    Counts and points are added; avg_finish is re-weighted by entries.
+    """
+    old = season_summary.set_index('constructorId')
+    new = partial.set_index('constructorId')
+    merged = old.reindex(old.index.union(new.index))
+
+    both = new.index.intersection(old.index)
+    only_new = new.index.difference(old.index)
+
+    for col in ADDITIVE_COLUMNS:
+        merged.loc[both, col] = old.loc[both, col] + new.loc[both, col]
+
+    # Finishing orders are integers, so the stored sum is recovered exactly
+    finish_sum = np.round(old.loc[both, 'avg_finish'] * old.loc[both, 'entries'])
+    finish_sum += np.round(new.loc[both, 'avg_finish'] * new.loc[both, 'entries'])
+    merged.loc[both, 'avg_finish'] = finish_sum / merged.loc[both, 'entries']
+
+    # Points are exact in hundredths (see team_aggregation._group_sum)
+    merged.loc[both, 'total_points'] = (
+        np.round(old.loc[both, 'total_points'] * 100)
+        + np.round(new.loc[both, 'total_points'] * 100)
+    ) / 100
+
+    merged.loc[only_new] = new.loc[only_new, merged.columns]
+
+    merged = merged.reset_index()
+    for col in ADDITIVE_COLUMNS + ['year']:
+        merged[col] = merged[col].astype(np.int64)
+    return merged[SUMMARY_COLUMNS]
+
+
+def rescore_season(season_summary):
+    """Runs the metric + ranking stage on one season's summary rows."""
+    metrics_input = season_summary.rename(
+        columns={'races': 'total_races', 'total_points': 'points'}
+    )
+    return rank_TDI(build_all_metrics_fused(metrics_input))
+
+
+# -----------------------------------------------------------
+# 2. Season-block access for year-sorted CSVs
+# -----------------------------------------------------------
+
+def trailing_season_offset(path, year, block_size=1 << 16):
+    """
+    Returns the byte offset where the trailing rows for `year` start in a
+    year-sorted CSV whose first column is `year`. When the file has no rows
+    for `year` yet and every stored year is older, the offset is the end of
+    the file. Returns None when rows for a later year follow (the season is
+    not the trailing block).
+    """
+    with open(path, 'rb') as f:
+        f.seek(0, os.SEEK_END)
+        end = f.tell()
+        pos, tail = end, b''
+
+        while True:
+            step = min(block_size, pos)
+            pos -= step
+            f.seek(pos)
+            chunk = f.read(step) + tail
+            lines = chunk.split(b'\n')
+            # The first piece may be a partial line unless we reached the start
+            tail = lines.pop(0) if pos > 0 else b''
+            line_end = pos + len(chunk)
+
+            for line in reversed(lines):
+                after = min(line_end + 1, end)
+                line_end -= len(line) + 1
+                if not line.strip():
+                    continue
+                first = line.split(b',', 1)[0].strip()
+                if not first.isdigit():
+                    return after                    # header reached
+                row_year = int(first)
+                if row_year > year:
+                    return None
+                if row_year < year:
+                    return after
+
+            if pos == 0:
+                return 0
+
+
+def read_trailing_season(path, year):
+    """Reads only the trailing block of rows for `year` from a year-sorted CSV."""
+    offset = trailing_season_offset(path, year)
+    if offset is None:
+        df = pd.read_csv(path)
+        return df[df['year'] == year].reset_index(drop=True)
+
+    with open(path, 'rb') as f:
+        header = f.readline()
+        f.seek(offset)
+        body = f.read()
+    return pd.read_csv(io.BytesIO(header + body))
+
+
+def replace_season_rows(path, year, season_rows):
+    """
+    Replaces the rows of `year` in a year-sorted CSV with `season_rows`
+    (columns are taken from the file header). Uses truncate + append when
+    the season is the trailing block, a full rewrite otherwise.
+    """
+    with open(path) as f:
+        columns = f.readline().rstrip('\r\n').split(',')
+    season_rows = season_rows[columns]
+
+    offset = trailing_season_offset(path, year)
+    if offset is not None:
+        with open(path, 'r+b') as f:
+            f.truncate(offset)
+        season_rows.to_csv(path, mode='a', header=False, index=False)
+        return
+
+    df = pd.read_csv(path)
+    df = pd.concat([df[df['year'] < year], season_rows, df[df['year'] > year]])
+    df.to_csv(path, index=False)
+
+
+# -----------------------------------------------------------
+# 3. Season results for the downstream outputs
+# -----------------------------------------------------------
+
+# A new row is already stored when either key matches a stored row
+RESULT_KEYS = [['raceId', 'driverId'], ['raceId', 'positionDisplayOrder']]
+
+
+def drop_known_results(new_results, results):
+    """Rows of new_results not already in results (matched on RESULT_KEYS)."""
+    keep = np.ones(len(new_results), dtype=bool)
+    for keys in RESULT_KEYS:
+        known = pd.MultiIndex.from_frame(results[keys].astype(object))
+        keep &= ~pd.MultiIndex.from_frame(new_results[keys].astype(object)).isin(known)
+    return new_results[keep]
+
+
+def season_results(results, new_results, years):
+    """
+    Every result row of `years`: the stored rows plus the new rows not
+    already among them, so new rows that were also appended to the raw
+    CSV are counted once.
+    """
+    stored = results[results['year'].isin(years)]
+    new_rows = drop_known_results(new_results, stored)
+    return pd.concat([stored, new_rows.reindex(columns=stored.columns)], ignore_index=True)
+
+
+# -----------------------------------------------------------
+# 4. Public entry point
+# -----------------------------------------------------------
+
+def apply_new_results(new_results, races, constructors, summary_path, output_paths):
+    """
+    Folds new race-result rows into the stored outputs.
+
+    new_results:  raw f1db race-result rows for the new race(s)
+    races, constructors: f1db lookup tables (for season and team names)
+    summary_path: stored team_year_summary CSV (the additive aggregates)
+    output_paths: year-sorted output CSVs to patch, e.g. team_metrics,
+                  team_tdi and final_team_tdi; each keeps its own columns
+
+    Returns {year: re-scored metrics rows for that season}.
+    """
+    partial = build_team_year_summary(new_results, races, constructors)
+    updated = {}
+
+    for year, season_partial in partial.groupby('year'):
+        season_summary = read_trailing_season(summary_path, year)
+        season_summary = merge_season_summary(season_summary, season_partial)
+        season_metrics = rescore_season(season_summary)
+
+        replace_season_rows(summary_path, year, season_summary)
+        for path in output_paths:
+            replace_season_rows(path, year, season_metrics)
+
+        logging.info(f"Updated season {year}: {len(season_metrics)} teams re-scored")
+        updated[year] = season_metrics
+
+    return updated
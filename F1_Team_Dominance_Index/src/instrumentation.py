@@ -0,0 +1,319 @@
+"""
+instrumentation.py
+-------------------
+Low-overhead run instrumentation for the TDI pipeline.
+
+This file:
+- RunRecorder: records one span per pipeline stage / instrumented
+  function with wall time, CPU time, memory, rows in / out and counters
+  such as cache hits
+- instrumented: decorator for library functions (load, clean, aggregate,
+  compute_additional_metrics, normalize_metrics, scoring, rendering);
+  it costs one global lookup when no recorder is active
+- Writes a JSON run report (output/reports/run-<time>.json and
+  latest.json) and optionally a cProfile dump of one stage, e.g. the
+  slowest stage of the previous run ("auto")
+
+Memory is recorded two ways:
+- always: RSS change over the span and the process RSS high-water mark
+  at its end (two cheap syscalls per span). Either is None where the
+  platform does not provide it (no /proc, no resource module on Windows)
+- trace_memory=True: exact peak of Python allocations inside the span
+  via tracemalloc. Tracing slows allocation-heavy code (matplotlib
+  rendering runs ~4x slower), so it is opt-in for diagnosis runs.
+
+Spans nest: a function called inside a stage is recorded with that stage
+as its parent, and the stage's traced peak includes its children.
+
+Usage:
+    from instrumentation import RunRecorder
+    with RunRecorder("pipeline", profile="auto") as recorder:
+        ...  # run the pipeline
+    recorder.save()
+"""
+
+import cProfile
+import datetime
+import functools
+import json
+import os
+import platform
+import sys
+import time
+import tracemalloc
+from contextlib import contextmanager
+
+try:
+    import resource
+except ImportError:     # Windows
+    resource = None
+
+BASE_DIR = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+REPORTS_DIR = os.path.join(BASE_DIR, "output", "reports")
+KEEP_REPORTS = 20
+
+_ACTIVE = None          # RunRecorder currently recording, if any
+
+# -----------------------------------------------------------
+# 1. Row counting
+# -----------------------------------------------------------
+
+def count_rows(value):
+    """
+    Rows held by a stage input / output: len() of DataFrames and Series,
+    summed over tuples, lists and dict values. None when nothing tabular.
+    """
+    if hasattr(value, "shape") and hasattr(value, "index"):
+        return len(value)
+    if isinstance(value, dict):
+        value = list(value.values())
+    if isinstance(value, (list, tuple)):
+        counts = [c for c in (count_rows(v) for v in value) if c is not None]
+        return sum(counts) if counts else None
+    return None
+
+
+def _rss_bytes():
+    try:
+        with open("/proc/self/statm") as f:
+            return int(f.read().split()[1]) * os.sysconf("SC_PAGE_SIZE")
+    except OSError:
+        return None
+
+
+def _max_rss_bytes():
+    if resource is None:
+        return None
+    peak = resource.getrusage(resource.RUSAGE_SELF).ru_maxrss
+    return peak if sys.platform == "darwin" else peak * 1024
+
+
+# -----------------------------------------------------------
+# 2. Recorder
+# -----------------------------------------------------------
+
+class RunRecorder:
+    """
+    Collects spans for one run. trace_memory=True adds tracemalloc
+    allocation peaks (alloc_peak_mb) at a real cost in speed.
+    """
+
+    def __init__(self, name="pipeline", trace_memory=False, profile=None, reports_dir=REPORTS_DIR):
+        self.name = name
+        self.trace_memory = trace_memory
+        self.reports_dir = reports_dir
+        self.profile = resolve_profile_target(profile, reports_dir)
+        self.spans = []
+        self.profile_path = None
+        self._stack = []
+        self._profiler = None
+        self._started_tracing = False
+        self.started = None
+        self.wall_s = self.cpu_s = None
+
+    # ----------------------- lifecycle -----------------------
+
+    def __enter__(self):
+        global _ACTIVE
+        self.started = datetime.datetime.now()
+        if self.trace_memory and not tracemalloc.is_tracing():
+            tracemalloc.start()
+            self._started_tracing = True
+        self._t0, self._c0 = time.perf_counter(), time.process_time()
+        self._previous, _ACTIVE = _ACTIVE, self
+        return self
+
+    def __exit__(self, *exc):
+        global _ACTIVE
+        self.wall_s = time.perf_counter() - self._t0
+        self.cpu_s = time.process_time() - self._c0
+        _ACTIVE = self._previous
+        if self._started_tracing:
+            tracemalloc.stop()
+            self._started_tracing = False
+
+    # ------------------------ spans ------------------------
+
+    @contextmanager
+    def stage(self, name, rows_in=None):
+        """
+        Records one span. Yields its dict, where the caller may set
+        rows_in / rows_out / status or bump counters.
+        """
+        parent = self._stack[-1] if self._stack else None
+        span = {
+            "name": name,
+            "parent": parent["name"] if parent else None,
+            "depth": len(self._stack),
+            "status": "ran",
+            "rows_in": rows_in,
+            "rows_out": None,
+            "counters": {},
+        }
+        tracing = self.trace_memory and tracemalloc.is_tracing()
+        if tracing:
+            current, peak = tracemalloc.get_traced_memory()
+            if parent is not None:
+                # The parent's peak so far would be lost by reset_peak
+                parent["_peak"] = max(parent["_peak"], peak)
+            span["_base"] = current
+            span["_peak"] = span["_base"]
+            tracemalloc.reset_peak()
+
+        profiler = None
+        if self.profile == name and self._profiler is None:
+            profiler = self._profiler = cProfile.Profile()
+            profiler.enable()
+
+        rss0 = _rss_bytes()
+        self._stack.append(span)
+        t0, c0 = time.perf_counter(), time.process_time()
+        span["start_s"] = t0 - getattr(self, "_t0", t0)
+        try:
+            yield span
+        except BaseException:
+            span["status"] = "failed"
+            raise
+        finally:
+            span["wall_s"] = time.perf_counter() - t0
+            span["cpu_s"] = time.process_time() - c0
+            self._stack.pop()
+            if profiler is not None:
+                profiler.disable()
+                if span["status"] == "cached":
+                    self._profiler = None           # nothing ran; try the next span of that name
+            rss1 = _rss_bytes()
+            span["rss_delta_mb"] = None if rss0 is None or rss1 is None else (rss1 - rss0) / 1e6
+            max_rss = _max_rss_bytes()
+            span["max_rss_mb"] = None if max_rss is None else max_rss / 1e6
+            if tracing:
+                peak = max(span.pop("_peak"), tracemalloc.get_traced_memory()[1])
+                span["alloc_peak_mb"] = (peak - span.pop("_base")) / 1e6
+                if parent is not None and "_peak" in parent:
+                    parent["_peak"] = max(parent["_peak"], peak)
+                tracemalloc.reset_peak()
+            else:
+                span["alloc_peak_mb"] = None
+            self.spans.append(span)
+
+    def count(self, key, n=1):
+        """Adds n to a counter of the innermost open span."""
+        if self._stack:
+            counters = self._stack[-1]["counters"]
+            counters[key] = counters.get(key, 0) + n
+
+    # ----------------------- report -----------------------
+
+    def report(self):
+        spans = sorted(self.spans, key=lambda s: (s["start_s"], s["depth"]))
+        top = [s for s in spans if s["depth"] == 0]
+        slowest = max((s for s in top if s["status"] == "ran"), key=lambda s: s["wall_s"], default=None)
+        return {
+            "run": self.name,
+            "started": self.started.isoformat(timespec="seconds") if self.started else None,
+            "python": platform.python_version(),
+            "trace_memory": self.trace_memory,
+            "wall_s": self.wall_s,
+            "cpu_s": self.cpu_s,
+            "stages_ran": sum(s["status"] == "ran" for s in top),
+            "stages_cached": sum(s["status"] == "cached" for s in top),
+            "slowest_stage": slowest["name"] if slowest else None,
+            "profiled_stage": self.profile if self._profiler is not None else None,
+            "profile": self.profile_path,
+            "spans": spans,
+        }
+
+    def save(self, reports_dir=None):
+        """Writes run-<time>.json (+ .prof when profiled) and latest.json; returns the report path."""
+        reports_dir = reports_dir or self.reports_dir
+        os.makedirs(reports_dir, exist_ok=True)
+        stamp = (self.started or datetime.datetime.now()).strftime("%Y%m%d-%H%M%S")
+        path = os.path.join(reports_dir, f"run-{stamp}.json")
+
+        if self._profiler is not None:
+            self.profile_path = path[:-len(".json")] + ".prof"
+            self._profiler.dump_stats(self.profile_path)
+
+        payload = json.dumps(self.report(), indent=2)
+        for target in (path, os.path.join(reports_dir, "latest.json")):
+            with open(target, "w") as f:
+                f.write(payload)
+        _prune(reports_dir)
+        return path
+
+    def summary(self, n=5):
+        """Lines describing the n slowest top-level stages."""
+        top = sorted((s for s in self.spans if s["depth"] == 0), key=lambda s: s["wall_s"], reverse=True)
+        lines = []
+        for s in top[:n]:
+            if s["alloc_peak_mb"] is not None:
+                peak = f", alloc peak {s['alloc_peak_mb']:.1f} MB"
+            elif s["max_rss_mb"] is not None:
+                peak = f", max rss {s['max_rss_mb']:.0f} MB"
+            else:
+                peak = ""
+            rows = "" if s["rows_out"] is None else f", {s['rows_out']} rows out"
+            lines.append(f"{s['name']:<16} {s['wall_s']:7.2f}s wall, {s['cpu_s']:6.2f}s cpu{peak}{rows}"
+                         f" [{s['status']}]")
+        return lines
+
+
+def _prune(reports_dir, keep=KEEP_REPORTS):
+    runs = sorted(f for f in os.listdir(reports_dir) if f.startswith("run-") and f.endswith(".json"))
+    for old in runs[:-keep]:
+        for ext in (".json", ".prof"):
+            path = os.path.join(reports_dir, old[:-len(".json")] + ext)
+            if os.path.exists(path):
+                os.remove(path)
+
+
+def resolve_profile_target(profile, reports_dir=REPORTS_DIR):
+    """
+    Stage to profile: a stage name, or "auto" for the slowest stage that
+    ran in the previous report (latest.json). None when there is none.
+    """
+    if profile != "auto":
+        return profile
+    latest = os.path.join(reports_dir, "latest.json")
+    if not os.path.exists(latest):
+        return None
+    with open(latest) as f:
+        return json.load(f).get("slowest_stage")
+
+
+def active():
+    """The recorder currently recording, or None."""
+    return _ACTIVE
+
+
+# -----------------------------------------------------------
+# 3. Decorator for library functions
+# -----------------------------------------------------------
+
+def instrumented(name=None):
+    """
+    Records every call of the decorated function as a span (rows in from
+    the arguments, rows out from the result) while a RunRecorder is
+    active; otherwise calls straight through.
+    """
+    def decorate(func):
+        span_name = name or func.__name__
+
+        @functools.wraps(func)
+        def wrapper(*args, **kwargs):
+            recorder = _ACTIVE
+            if recorder is None:
+                return func(*args, **kwargs)
+            with recorder.stage(span_name, rows_in=count_rows(list(args) + list(kwargs.values()))) as span:
+                result = func(*args, **kwargs)
+                span["rows_out"] = count_rows(result)
+            return result
+
+        return wrapper
+    return decorate
+
+
+def count(key, n=1):
+    """Bumps a counter on the active recorder's innermost span (no-op when inactive)."""
+    if _ACTIVE is not None:
+        _ACTIVE.count(key, n)
@@ -1,57 +1,370 @@
+import argparse
+import contextlib
 import logging
-from helper_functions import load_csv, save_csv, ensure_dir
-import subprocess
 import os
+import sys
+
+import pandas as pd
+
+import compute_metrics
+import era_metrics
+import head_to_head
+import incremental
+import instrumentation
+import metric_matrix
+import points_systems
+import qualifying
+import raw_loader
+import results_store
+import team_aggregation
+from compute_metrics import build_all_metrics_fused, rank_TDI, score_summaries
+from helper_functions import save_csv, ensure_dir
+from pipeline import Pipeline, PipelineError, Stage
+from team_aggregation import ENTITY_KEYS, build_entity_year_summaries
 
 logging.basicConfig(level=logging.INFO, format="%(levelname)s - %(message)s")
 
 # -------------------------
 # PATH CONFIG
 # -------------------------
-DATA_DIR = "data"
-OUTPUT_DIR = "output"
+BASE_DIR = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+DATA_DIR = os.path.join(BASE_DIR, "data")
+RAW_DIR = os.path.join(DATA_DIR, "raw")
+OUTPUT_DIR = os.path.join(BASE_DIR, "output")
+
+RESULTS_CSV = os.path.join(RAW_DIR, "f1db-races-race-results.csv")
+RACES_CSV = os.path.join(RAW_DIR, "f1db-races.csv")
+CONSTRUCTORS_CSV = os.path.join(RAW_DIR, "f1db-constructors.csv")
+QUALIFYING_CSV = os.path.join(RAW_DIR, "f1db-races-qualifying-1-results.csv")
+
+TEAM_SUMMARY_PATH = os.path.join(OUTPUT_DIR, "processed", "team_year_summary.csv")
+TEAM_METRICS_PATH = os.path.join(OUTPUT_DIR, "processed", "team_metrics.csv")
+TDI_PATH = os.path.join(OUTPUT_DIR, "processed", "team_tdi.csv")
+# The pipeline scores with compute_metrics (normalized-metric TDI, rank_TDI),
+# not the notebook formula, so it does not overwrite the notebooks'
+# tracked final_team_tdi.csv
+FINAL_TDI_PATH = os.path.join(OUTPUT_DIR, "results", "final_team_tdi_pipeline.csv")
+DECADE_SUMMARY_PATH = os.path.join(OUTPUT_DIR, "results", "decade_dominance_summary.csv")
+DOMINANCE_SUMMARY_PATH = os.path.join(OUTPUT_DIR, "results", "dominance_summary.csv")
+HEAD_TO_HEAD_PATH = os.path.join(OUTPUT_DIR, "results", "constructor_head_to_head.csv")
+TEAM_METRICS_H2H_PATH = os.path.join(OUTPUT_DIR, "processed", "team_metrics_h2h.csv")
+QUALI_PACE_PATH = os.path.join(OUTPUT_DIR, "results", "constructor_qualifying_pace.csv")
+TEAM_METRICS_QUALI_PATH = os.path.join(OUTPUT_DIR, "processed", "team_metrics_quali.csv")
+POINTS_EFFICIENCY_PATH = os.path.join(OUTPUT_DIR, "results", "constructor_points_efficiency.csv")
+ENTITY_TDI_PATH = os.path.join(OUTPUT_DIR, "results", "{entity}_tdi.csv")
+RESULTS_DB = results_store.RESULTS_DB
+SHARED_DIR = metric_matrix.SHARED_DIR
+VISUALS_DIR = os.path.join(OUTPUT_DIR, "visuals")
+CACHE_DIR = os.path.join(OUTPUT_DIR, ".cache")
+
+# -------------------------
+# STAGES
+# -------------------------
+
+def load_raw(results_csv, races_csv, constructors_csv):
+    results = raw_loader.load_table("race_results", raw_dir=os.path.dirname(results_csv))
+    races = raw_loader.load_table("races", raw_dir=os.path.dirname(races_csv))
+    constructors = raw_loader.load_table("constructors", raw_dir=os.path.dirname(constructors_csv))
+    return results, races, constructors
+
+
+def summarize(results, races, constructors):
+    # Constructors, drivers, engines and tyres in one scan of the results
+    summaries = build_entity_year_summaries(results, races, constructors)
+    team_year_summary = summaries.pop("constructor")
+    return team_year_summary, summaries
+
+
+def score(team_year_summary):
+    metrics_input = team_year_summary.rename(
+        columns={"races": "total_races", "total_points": "points"}
+    )
+    team_metrics = rank_TDI(build_all_metrics_fused(metrics_input))
+    final_tdi = team_metrics[["year", "name", "TDI", "TDI_normalized", "TDI_rank"]]
+    return team_metrics, final_tdi
+
+
+def score_entities(entity_summaries):
+    return score_summaries(entity_summaries)
+
+
+def save(team_year_summary, team_metrics, final_tdi, entity_tdi):
+    save_csv(team_year_summary, TEAM_SUMMARY_PATH)
+    save_csv(team_metrics, TEAM_METRICS_PATH)
+    save_csv(team_metrics[["year", "constructorId", "name", "TDI", "TDI_alt",
+                           "TDI_normalized", "TDI_rank"]], TDI_PATH)
+    save_csv(final_tdi, FINAL_TDI_PATH)
+    written = [TEAM_SUMMARY_PATH, TEAM_METRICS_PATH, TDI_PATH, FINAL_TDI_PATH]
+
+    for entity, metrics in entity_tdi.items():
+        path = ENTITY_TDI_PATH.format(entity=entity)
+        save_csv(metrics[["year", ENTITY_KEYS[entity], "TDI", "TDI_alt",
+                          "TDI_normalized", "TDI_rank"]], path)
+        written.append(path)
+    return written
+
+
+def eras(final_tdi):
+    dominance = era_metrics.RollingDominance(final_tdi)
+    save_csv(dominance.top_by_era(), DECADE_SUMMARY_PATH)
+    save_csv(dominance.dominance_summary(), DOMINANCE_SUMMARY_PATH)
+    return [DECADE_SUMMARY_PATH, DOMINANCE_SUMMARY_PATH]
+
+
+def pairwise(results, races, constructors, team_metrics):
+    h2h = head_to_head.build_head_to_head(results, races, constructors)
+    save_csv(h2h.table(), HEAD_TO_HEAD_PATH)
+    save_csv(head_to_head.with_head_to_head(team_metrics, h2h), TEAM_METRICS_H2H_PATH)
+    return [HEAD_TO_HEAD_PATH, TEAM_METRICS_H2H_PATH]
+
+
+def quali_pace(qualifying_csv, races, constructors, team_metrics):
+    qualifying_results = raw_loader.load_table("qualifying", raw_dir=os.path.dirname(qualifying_csv))
+    pace = qualifying.qualifying_pace(qualifying_results, races, constructors)
+    save_csv(pace, QUALI_PACE_PATH)
+    save_csv(compute_metrics.with_qualifying_pace(team_metrics, pace), TEAM_METRICS_QUALI_PATH)
+    return [QUALI_PACE_PATH, TEAM_METRICS_QUALI_PATH]
+
+
+def points_efficiency_table(results, races, constructors):
+    # Historical scoring, plus every season re-scored under the 2010 system
+    keys = ["year", "constructorId"]
+    historical = points_systems.team_points_efficiency(results, races, constructors)
+    modern = points_systems.team_points_efficiency(results, races, constructors,
+                                                   table=points_systems.uniform_table("2010"))
+    modern = modern[keys + ["points", "points_eff"]].rename(
+        columns={"points": "points_2010", "points_eff": "points_eff_2010"})
+    return historical.merge(modern, on=keys, how="left")
+
+
+def points_efficiency(results, races, constructors):
+    save_csv(points_efficiency_table(results, races, constructors), POINTS_EFFICIENCY_PATH)
+    return [POINTS_EFFICIENCY_PATH]
+
+
+def share_metrics(team_metrics):
+    header = metric_matrix.publish_matrix(team_metrics, out_dir=SHARED_DIR)
+    shared = metric_matrix.SharedMetrics(header)
+    logging.info(f"🧮 Metric matrix published to {SHARED_DIR} (version {shared.version})")
+    return [header] + [os.path.join(SHARED_DIR, f) for f in shared.meta["files"].values()]
+
+
+def store(team_metrics, entity_tdi):
+    # Same summaries as the eras stage, computed from the frames (cheap)
+    dominance = era_metrics.RollingDominance(team_metrics)
+    with results_store.ResultsStore(RESULTS_DB) as db:
+        version = db.publish(team_metrics, entity_tdi,
+                             decade_summary=dominance.top_by_era(),
+                             dominance_summary=dominance.dominance_summary())
+    logging.info(f"🗄  Results published to {RESULTS_DB} (version {version})")
+    return [RESULTS_DB]
+
+
+def render(final_tdi):
+    import batch_render
+
+    result = batch_render.render_all(final_tdi, out_dir=VISUALS_DIR)
+    return result["rendered"] + result["skipped"]
+
+
+def build_pipeline(cache_dir=CACHE_DIR):
+    return Pipeline([
+        Stage("load_raw", load_raw,
+              inputs=["results_csv", "races_csv", "constructors_csv"],
+              outputs=["results", "races", "constructors"],
+              depends_on=[raw_loader]),
+        Stage("summarize", summarize,
+              inputs=["results", "races", "constructors"],
+              outputs=["team_year_summary", "entity_summaries"],
+              depends_on=[team_aggregation]),
+        Stage("score", score,
+              inputs=["team_year_summary"],
+              outputs=["team_metrics", "final_tdi"],
+              depends_on=[compute_metrics]),
+        Stage("score_entities", score_entities,
+              inputs=["entity_summaries"],
+              outputs=["entity_tdi"],
+              depends_on=[compute_metrics]),
+        Stage("save", save,
+              inputs=["team_year_summary", "team_metrics", "final_tdi", "entity_tdi"],
+              outputs=["written"]),
+        Stage("eras", eras,
+              inputs=["final_tdi"],
+              outputs=["era_tables"],
+              depends_on=[era_metrics]),
+        Stage("store", store,
+              inputs=["team_metrics", "entity_tdi"],
+              outputs=["results_db"],
+              depends_on=[results_store, era_metrics]),
+        Stage("share_metrics", share_metrics,
+              inputs=["team_metrics"],
+              outputs=["metric_matrix"],
+              depends_on=[metric_matrix]),
+        Stage("head_to_head", pairwise,
+              inputs=["results", "races", "constructors", "team_metrics"],
+              outputs=["head_to_head_tables"],
+              depends_on=[head_to_head]),
+        Stage("qualifying_pace", quali_pace,
+              inputs=["qualifying_csv", "races", "constructors", "team_metrics"],
+              outputs=["qualifying_tables"],
+              depends_on=[qualifying, compute_metrics]),
+        Stage("points_efficiency", points_efficiency,
+              inputs=["results", "races", "constructors"],
+              outputs=["points_tables"],
+              depends_on=[points_systems]),
+        Stage("render", render,
+              inputs=["final_tdi"],
+              outputs=["visuals"],
+              depends_on=[os.path.join(BASE_DIR, "src", "visualize_utils.py"),
+                          os.path.join(BASE_DIR, "src", "tdi_index.py"),
+                          os.path.join(BASE_DIR, "src", "batch_render.py")]),
+    ], cache_dir=cache_dir)
 
-TEAM_METRICS_PATH = f"{OUTPUT_DIR}/processed/team_metrics.csv"
-TDI_PATH = f"{OUTPUT_DIR}/processed/team_tdi.csv"
 
 # -------------------------
-# STEP EXECUTION WRAPPER
+# INCREMENTAL UPDATE
 # -------------------------
+def update(new_results_csv):
+    """
+    Folds the race-result rows in new_results_csv (same layout as
+    f1db-races-race-results.csv) into the stored outputs, re-scoring only
+    the affected season(s). Requires a prior full run.
+
+    Patched season by season, in place:
+    - team summary / metrics / TDI CSVs
+    - driver / engine / tyre TDI, head-to-head and points efficiency CSVs,
+      rebuilt from the affected seasons' result rows
+
+    Not refreshed: the results DB, the shared metric matrix, the era
+    summaries, qualifying pace and the charts span every season. Every
+    stage's cache entry is dropped instead, so the next full run rebuilds
+    them (and re-checks the patched files).
+
+    Order: pass only rows that the last full run did not include, and
+    pass each row once. Appending them to the raw CSV is required for the
+    next full run to keep them. It may happen before or after update():
+    new rows already present in the raw CSV are not counted twice.
+    """
+    for path in (TEAM_SUMMARY_PATH, TEAM_METRICS_PATH, TDI_PATH, FINAL_TDI_PATH):
+        if not os.path.exists(path):
+            raise FileNotFoundError(f"Run the full pipeline first, missing: {path}")
+
+    new_results = pd.read_csv(new_results_csv, low_memory=False)
+    races = raw_loader.load_table("races", raw_dir=RAW_DIR)
+    constructors = raw_loader.load_table("constructors", raw_dir=RAW_DIR)
+    updated = incremental.apply_new_results(
+        new_results,
+        races,
+        constructors,
+        summary_path=TEAM_SUMMARY_PATH,
+        output_paths=[TEAM_METRICS_PATH, TDI_PATH, FINAL_TDI_PATH],
+    )
+    logging.info(f"✅ Re-scored seasons: {sorted(updated)}")
+    if updated:
+        refresh_downstream(new_results, races, constructors, updated)
+    return updated
+
 
-def run_step(script_name):
-    logging.info(f"\n🚀 Running {script_name} ...")
-    result = subprocess.run(["python", script_name], capture_output=True, text=True)
+def refresh_downstream(new_results, races, constructors, updated):
+    """
+    Patches the season-scoped outputs built from race results for the
+    seasons in `updated` ({year: re-scored team metrics}) and marks every
+    stage's cache stale.
+    """
+    years = sorted(updated)
+    raw = raw_loader.load_table("race_results", raw_dir=RAW_DIR)
+    results = incremental.season_results(raw, new_results, years)
 
-    if result.returncode == 0:
-        logging.info(f"✅ Completed: {script_name}")
-    else:
-        logging.error(f"❌ Error in {script_name}")
-        logging.error(result.stderr)
+    entities = [e for e in ENTITY_KEYS if e != "constructor"]
+    entity_tdi = score_summaries(build_entity_year_summaries(results, races, constructors, entities))
+    h2h = head_to_head.build_head_to_head(results, races, constructors)
+    team_metrics = pd.concat(updated.values(), ignore_index=True)
+
+    patches = {ENTITY_TDI_PATH.format(entity=e): df for e, df in entity_tdi.items()}
+    patches[HEAD_TO_HEAD_PATH] = h2h.table()
+    patches[TEAM_METRICS_H2H_PATH] = head_to_head.with_head_to_head(team_metrics, h2h)
+    patches[POINTS_EFFICIENCY_PATH] = points_efficiency_table(results, races, constructors)
+    for path, table in patches.items():
+        if not os.path.exists(path):
+            logging.warning(f"⚠️ Not patched, missing (rebuilt by the next full run): {path}")
+            continue
+        for year in years:
+            incremental.replace_season_rows(path, year, table[table["year"] == year])
+    logging.info(f"🔁 Patched {len(patches)} season-scoped outputs for {years}")
+
+    pipeline = build_pipeline()
+    pipeline.invalidate([stage.name for stage in pipeline.stages])
+    logging.warning("⚠️ Stale until the next full run: results DB, shared metric matrix, "
+                    "era summaries, qualifying pace, charts")
 
 
 # -------------------------
 # MAIN PIPELINE
 # -------------------------
-def main():
+def main(force=False, report=True, profile=None, trace_memory=False):
+    """
+    Runs the cached stage graph. With report=True every stage is recorded
+    (wall / CPU time, RSS, rows, cache hits) into a JSON run report under
+    output/reports/; trace_memory adds tracemalloc peaks (slower run);
+    profile names a stage (or "auto": the slowest stage of the previous
+    run) to dump with cProfile.
+    """
 
     logging.info("\n===============================")
     logging.info("      F1 DOMINANCE PIPELINE     ")
     logging.info("===============================\n")
 
     # Ensure output folders exist
-    ensure_dir(f"{OUTPUT_DIR}/processed")
-    ensure_dir(f"{OUTPUT_DIR}/visuals")
+    ensure_dir(os.path.join(OUTPUT_DIR, "processed"))
+    ensure_dir(VISUALS_DIR)
+
+    sources = {
+        "results_csv": RESULTS_CSV,
+        "races_csv": RACES_CSV,
+        "constructors_csv": CONSTRUCTORS_CSV,
+        "qualifying_csv": QUALIFYING_CSV,
+    }
 
-    # Run sequential scripts
-    run_step("01_load_and_clean_data.py")
-    run_step("02_compute_team_metrics.py")
-    run_step("03_compute_tdi.py")
-    run_step("04_visualize_dominance.py")
+    recorder = instrumentation.RunRecorder("pipeline", trace_memory=trace_memory, profile=profile) \
+        if report else None
+    try:
+        with recorder or contextlib.nullcontext():
+            _, stages = build_pipeline().run(sources, targets=[], force=force, recorder=recorder)
+    except (PipelineError, FileNotFoundError, KeyError) as e:
+        logging.error(f"❌ Pipeline failed: {e}")
+        if recorder:
+            logging.info(f"🧾 Run report: {recorder.save()}")
+        return 1
 
-    logging.info("\n🎉 Pipeline finished successfully!")
+    total = sum(r["seconds"] for r in stages)
+    ran = [r["stage"] for r in stages if r["status"] == "ran"]
+    logging.info(f"\n🎉 Pipeline finished in {total:.2f}s (ran: {', '.join(ran) or 'nothing, all cached'})")
     logging.info(f"📁 Metrics saved to: {TEAM_METRICS_PATH}")
     logging.info(f"📁 TDI saved to: {TDI_PATH}")
-    logging.info("\nAll visuals stored in /output/visuals")
+    logging.info(f"\nAll visuals stored in {VISUALS_DIR}")
+    if recorder:
+        path = recorder.save()
+        for line in recorder.summary():
+            logging.info(f"   {line}")
+        logging.info(f"🧾 Run report: {path}" + (f" (profile: {recorder.profile_path})"
+                                                  if recorder.profile_path else ""))
+    return 0
+
 
 if __name__ == "__main__":
-    main()
+    parser = argparse.ArgumentParser(description="Run the F1 TDI pipeline in-process.")
+    parser.add_argument("--force", action="store_true", help="ignore the stage cache")
+    parser.add_argument("--new-results", metavar="CSV",
+                        help="only fold these new race-result rows into the stored outputs")
+    parser.add_argument("--no-report", action="store_true", help="skip the JSON run report")
+    parser.add_argument("--trace-memory", action="store_true",
+                        help="add tracemalloc allocation peaks to the report (slower)")
+    parser.add_argument("--profile", metavar="STAGE",
+                        help="cProfile one stage; 'auto' = slowest stage of the previous run")
+    args = parser.parse_args()
+
+    if args.new_results:
+        update(args.new_results)
+        sys.exit(0)
+    sys.exit(main(force=args.force, report=not args.no_report, profile=args.profile,
+                  trace_memory=args.trace_memory))
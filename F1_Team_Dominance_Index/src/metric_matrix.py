@@ -0,0 +1,237 @@
+"""
+metric_matrix.py
+-------------------
+Memory-mapped team-season metric matrix for multi-process analysis.
+
+This file:
+- publish_matrix: writes the numeric columns of a build_all_metrics
+  table as one column-major float64 .npy, the year and team-code key
+  arrays as .npy, and a small JSON header: column names, team ids and
+  names, year segment offsets, shape and dataset version
+- SharedMetrics: attaches to a published matrix read-only with
+  np.load(mmap_mode="r"), so nothing is copied. Pickling a SharedMetrics
+  only sends its header path; a pool worker re-attaches to the same
+  pages, so startup cost and total memory stay flat as workers are added
+
+Rows are sorted by year (year_segments), so every season is a
+contiguous row slice. The matrix is column-major, so any column or
+run of adjacent columns is a zero-copy view.
+
+Every version is written under its own file names, and the header
+pointer <name>.json is replaced last with os.replace. Readers always see
+a complete version. A worker pinned to an older version keeps reading
+it until it is pruned (KEEP_VERSIONS).
+
+Usage:
+    from metric_matrix import SharedMetrics
+    shared = SharedMetrics.attach()
+    X = shared.block(["win_rate_norm", "podium_rate_norm"])
+"""
+
+import datetime
+import hashlib
+import json
+import os
+
+import numpy as np
+
+from compute_metrics import year_segments
+
+BASE_DIR = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+SHARED_DIR = os.path.join(BASE_DIR, "output", "shared")
+KEEP_VERSIONS = 3
+FORMAT_VERSION = 1
+
+KEY_COLUMNS = ["year", "constructorId", "name"]
+
+# -----------------------------------------------------------
+# 1. Publishing
+# -----------------------------------------------------------
+
+def _save_npy(path, array):
+    tmp = path + ".tmp"
+    with open(tmp, "wb") as f:
+        np.save(f, array)
+    os.replace(tmp, path)
+
+
+def _write_json(path, payload):
+    tmp = path + ".tmp"
+    with open(tmp, "w") as f:
+        json.dump(payload, f, indent=2)
+    os.replace(tmp, path)
+
+
+def publish_matrix(df, out_dir=SHARED_DIR, name="team_metrics", key="constructorId", columns=None):
+    """
+    Publishes the numeric columns of df (default: every numeric column
+    except year) with its year / team keys. Returns the header path of
+    the new version; an unchanged table re-uses its existing files.
+    """
+    years = df["year"].to_numpy(dtype=np.int64)
+    order, starts, _ = year_segments(years)
+    data = df.iloc[order]
+    if columns is None:
+        columns = [c for c in data.columns if c != "year" and data[c].dtype.kind in "biuf"]
+
+    values = np.asfortranarray(data[columns].to_numpy(dtype=np.float64))
+    team_ids, team_codes = np.unique(data[key].astype(str).to_numpy(), return_inverse=True)
+    team_codes = team_codes.astype(np.int32)
+    names = data.groupby(data[key].astype(str), sort=True)["name"].first() if "name" in data else None
+    sorted_years = years[order].astype(np.int32)
+
+    digest = hashlib.sha1()
+    digest.update(json.dumps([name, key, list(columns), team_ids.tolist()]).encode())
+    for array in (values, sorted_years, team_codes):
+        digest.update(np.ascontiguousarray(array).tobytes())
+    version = digest.hexdigest()[:16]
+
+    os.makedirs(out_dir, exist_ok=True)
+    stem = f"{name}-{version}"
+    header_path = os.path.join(out_dir, stem + ".json")
+    if os.path.exists(header_path):
+        _write_json(os.path.join(out_dir, name + ".json"), _read_json(header_path))
+        return header_path
+
+    files = {"values": stem + ".values.npy", "year": stem + ".year.npy", "team": stem + ".team.npy"}
+    _save_npy(os.path.join(out_dir, files["values"]), values)
+    _save_npy(os.path.join(out_dir, files["year"]), sorted_years)
+    _save_npy(os.path.join(out_dir, files["team"]), team_codes)
+
+    header = {
+        "format": FORMAT_VERSION,
+        "name": name,
+        "dataset_version": version,
+        "published_at": datetime.datetime.now().isoformat(timespec="seconds"),
+        "shape": list(values.shape),
+        "dtype": "float64",
+        "order": "F",
+        "columns": list(columns),
+        "key": key,
+        "teams": team_ids.tolist(),
+        "team_names": None if names is None else names.reindex(team_ids).tolist(),
+        "years": sorted_years[starts].tolist(),
+        "year_offsets": np.r_[starts, len(values)].tolist(),
+        "files": files,
+    }
+    _write_json(header_path, header)
+    _write_json(os.path.join(out_dir, name + ".json"), header)      # readers switch here
+    _prune(out_dir, name)
+    return header_path
+
+
+def _read_json(path):
+    with open(path) as f:
+        return json.load(f)
+
+
+def _prune(out_dir, name, keep=KEEP_VERSIONS):
+    headers = [f for f in os.listdir(out_dir) if f.startswith(name + "-") and f.endswith(".json")]
+    headers.sort(key=lambda f: os.path.getmtime(os.path.join(out_dir, f)))
+    for old in headers[:-keep]:
+        header = _read_json(os.path.join(out_dir, old))
+        # Open mappings keep their pages after unlink
+        for path in list(header["files"].values()) + [old]:
+            try:
+                os.remove(os.path.join(out_dir, path))
+            except FileNotFoundError:
+                pass
+
+
+# -----------------------------------------------------------
+# 2. Read-only, zero-copy attachment
+# -----------------------------------------------------------
+
+class SharedMetrics:
+    """
+    Read-only view of a published metric matrix.
+
+    values:   (rows, columns) float64 memmap, column-major, rows by year
+    year:     (rows,) int32 memmap
+    team:     (rows,) int32 memmap of codes into team_ids / team_names
+    starts:   first row of each season; ends = starts[1:] + [rows]
+    """
+
+    def __init__(self, header_path):
+        self.header_path = os.path.abspath(header_path)
+        self.meta = _read_json(self.header_path)
+        if self.meta.get("format") != FORMAT_VERSION:
+            raise RuntimeError(f"Unsupported metric matrix format in {header_path}")
+        base = os.path.dirname(self.header_path)
+        files = self.meta["files"]
+        self.values = np.load(os.path.join(base, files["values"]), mmap_mode="r")
+        self.year = np.load(os.path.join(base, files["year"]), mmap_mode="r")
+        self.team = np.load(os.path.join(base, files["team"]), mmap_mode="r")
+        if list(self.values.shape) != self.meta["shape"]:
+            raise RuntimeError(f"Metric matrix {files['values']} does not match its header")
+
+        self.version = self.meta["dataset_version"]
+        self.columns = self.meta["columns"]
+        self.team_ids = np.asarray(self.meta["teams"], dtype=object)
+        self.team_names = None if self.meta["team_names"] is None else \
+            np.asarray(self.meta["team_names"], dtype=object)
+        offsets = np.asarray(self.meta["year_offsets"], dtype=np.int64)
+        self.years, self.starts, self.ends = np.asarray(self.meta["years"]), offsets[:-1], offsets[1:]
+        self._col = {c: i for i, c in enumerate(self.columns)}
+
+    @classmethod
+    def attach(cls, name="team_metrics", shared_dir=SHARED_DIR):
+        """Attaches to the latest published version of `name`, pinned to that version."""
+        pointer = os.path.join(shared_dir, name + ".json")
+        if not os.path.exists(pointer):
+            raise FileNotFoundError(f"No published metric matrix at {pointer}")
+        version = _read_json(pointer)["dataset_version"]
+        return cls(os.path.join(shared_dir, f"{name}-{version}.json"))
+
+    def __reduce__(self):
+        # Workers re-attach to the same files instead of receiving the data
+        return (SharedMetrics, (self.header_path,))
+
+    def __len__(self):
+        return self.values.shape[0]
+
+    def __repr__(self):
+        return (f"SharedMetrics(version={self.version}, rows={len(self)}, "
+                f"columns={len(self.columns)}, seasons={len(self.years)})")
+
+    # ----------------------- access -----------------------
+
+    def column(self, name):
+        """One column as a zero-copy view."""
+        return self.values[:, self._col[name]]
+
+    def block(self, names):
+        """
+        Several columns as a (rows, len(names)) matrix: a zero-copy view
+        when they are adjacent and in order, otherwise a copy.
+        """
+        idx = [self._col[n] for n in names]
+        if idx == list(range(idx[0], idx[0] + len(idx))):
+            return self.values[:, idx[0]:idx[0] + len(idx)]
+        return self.values[:, idx]
+
+    def season(self, year):
+        """Row slice (start, end) of one season."""
+        i = int(np.searchsorted(self.years, year))
+        if i == len(self.years) or self.years[i] != year:
+            raise KeyError(f"No season {year} in the metric matrix")
+        return int(self.starts[i]), int(self.ends[i])
+
+    def keys(self):
+        """year / key / name per row as a DataFrame (copied; small)."""
+        import pandas as pd
+
+        codes = np.asarray(self.team)
+        keys = pd.DataFrame({"year": np.asarray(self.year, dtype=np.int64),
+                             self.meta["key"]: self.team_ids[codes]})
+        if self.team_names is not None:
+            keys["name"] = self.team_names[codes]
+        return keys
+
+    def frame(self, columns=None):
+        """Keys plus `columns` (default: all) as a pandas DataFrame (copies)."""
+        columns = self.columns if columns is None else list(columns)
+        out = self.keys()
+        for c in columns:
+            out[c] = np.asarray(self.column(c))
+        return out
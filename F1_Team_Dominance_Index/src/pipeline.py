@@ -0,0 +1,315 @@
+"""
+pipeline.py
+-------------------
+In-process stage graph for the F1 Team Dominance Index (TDI) pipeline.
+
+This file:
+- Declares pipeline stages with named inputs and outputs
+- Runs stages in dependency order inside one interpreter
+- Passes DataFrames between stages in memory
+- Skips a stage when the hash of its inputs and its code is unchanged
+
+Cached stage outputs live in ``<cache_dir>/<stage>.pkl`` next to a small
+``<stage>.json`` header holding the stage key and the digest of every output.
+Downstream keys are built from those digests, so an unchanged re-run only
+hashes the source files and reads the headers.
+"""
+
+import hashlib
+import inspect
+import json
+import logging
+import os
+import pickle
+import time
+from contextlib import nullcontext
+
+import pandas as pd
+
+from instrumentation import count_rows
+
+
+class PipelineError(RuntimeError):
+    """Raised when the stage graph is invalid or a stage yields no data."""
+
+
+# -----------------------------------------------------------
+# 1. Content hashing
+# -----------------------------------------------------------
+
+def hash_value(value):
+    """
+    Returns a stable hex digest for a stage input or output.
+    - DataFrames / Series are hashed row by row with pandas
+    - Paths to existing files are hashed by file content
+    - Containers are hashed element by element
+    """
+    h = hashlib.sha1()
+
+    if isinstance(value, pd.DataFrame):
+        h.update(b"frame")
+        h.update(repr(list(value.columns)).encode())
+        h.update(repr([str(t) for t in value.dtypes]).encode())
+        h.update(pd.util.hash_pandas_object(value, index=True).values.tobytes())
+    elif isinstance(value, pd.Series):
+        h.update(b"series")
+        h.update(str(value.name).encode())
+        h.update(pd.util.hash_pandas_object(value, index=True).values.tobytes())
+    elif isinstance(value, str) and os.path.isfile(value):
+        h.update(b"file")
+        with open(value, "rb") as f:
+            for block in iter(lambda: f.read(1 << 20), b""):
+                h.update(block)
+    elif isinstance(value, (list, tuple)):
+        h.update(type(value).__name__.encode())
+        for item in value:
+            h.update(hash_value(item).encode())
+    elif isinstance(value, dict):
+        h.update(b"dict")
+        for key in sorted(value, key=str):
+            h.update(str(key).encode())
+            h.update(hash_value(value[key]).encode())
+    else:
+        h.update(repr(value).encode())
+
+    return h.hexdigest()
+
+
+def hash_code(objects):
+    """Hashes the source code of functions / modules / .py paths a stage depends on."""
+    h = hashlib.sha1()
+    for obj in objects:
+        if isinstance(obj, str) and os.path.isfile(obj):
+            with open(obj, "rb") as f:
+                h.update(f.read())
+            continue
+        try:
+            h.update(inspect.getsource(obj).encode())
+        except (OSError, TypeError):
+            h.update(repr(obj).encode())
+    return h.hexdigest()
+
+
+# -----------------------------------------------------------
+# 2. Stage definition
+# -----------------------------------------------------------
+
+class Stage:
+    """
+    One node of the pipeline graph.
+
+    func is called with the declared inputs as keyword arguments. A stage
+    with one output returns the value directly; a stage with several
+    outputs returns a tuple in the declared order.
+
+    depends_on lists extra functions or modules whose source is part of
+    the stage key (e.g. the compute_metrics module for the metrics stage).
+    """
+
+    def __init__(self, name, func, inputs=(), outputs=(), depends_on=(), allow_empty=False):
+        self.name = name
+        self.func = func
+        self.inputs = tuple(inputs)
+        self.outputs = tuple(outputs)
+        self.depends_on = tuple(depends_on)
+        self.allow_empty = allow_empty
+        self.code_hash = hash_code((func,) + self.depends_on)
+
+    def key(self, input_digests):
+        h = hashlib.sha1()
+        h.update(self.name.encode())
+        h.update(self.code_hash.encode())
+        for name, digest in zip(self.inputs, input_digests):
+            h.update(name.encode())
+            h.update(digest.encode())
+        return h.hexdigest()
+
+    def __repr__(self):
+        return f"Stage({self.name!r}, inputs={self.inputs}, outputs={self.outputs})"
+
+
+# -----------------------------------------------------------
+# 3. Pipeline runner
+# -----------------------------------------------------------
+
+class Pipeline:
+    """
+    Runs a set of stages in dependency order with content-hash caching.
+    """
+
+    def __init__(self, stages, cache_dir=None):
+        self.stages = list(stages)
+        self.cache_dir = cache_dir
+        self.producers = {}
+        for stage in self.stages:
+            for out in stage.outputs:
+                if out in self.producers:
+                    raise PipelineError(
+                        f"Output '{out}' produced by both "
+                        f"'{self.producers[out].name}' and '{stage.name}'"
+                    )
+                self.producers[out] = stage
+        self.order = self._topological_order()
+
+    # ------------------------- graph -------------------------
+
+    def _topological_order(self):
+        order, state = [], {}
+
+        def visit(stage):
+            mark = state.get(stage.name)
+            if mark == "done":
+                return
+            if mark == "active":
+                raise PipelineError(f"Cycle detected at stage '{stage.name}'")
+            state[stage.name] = "active"
+            for name in stage.inputs:
+                if name in self.producers:
+                    visit(self.producers[name])
+            state[stage.name] = "done"
+            order.append(stage)
+
+        for stage in self.stages:
+            visit(stage)
+        return order
+
+    # ------------------------- cache -------------------------
+
+    def _cache_paths(self, stage):
+        base = os.path.join(self.cache_dir, stage.name)
+        return base + ".json", base + ".pkl"
+
+    def _read_header(self, stage):
+        if self.cache_dir is None:
+            return None
+        header_path, data_path = self._cache_paths(stage)
+        if not (os.path.exists(header_path) and os.path.exists(data_path)):
+            return None
+        with open(header_path) as f:
+            return json.load(f)
+
+    def _write_cache(self, stage, key, outputs, digests):
+        if self.cache_dir is None:
+            return
+        os.makedirs(self.cache_dir, exist_ok=True)
+        header_path, data_path = self._cache_paths(stage)
+        with open(data_path, "wb") as f:
+            pickle.dump(outputs, f, protocol=pickle.HIGHEST_PROTOCOL)
+        header = {"key": key, "outputs": digests, "files": _written_files(outputs)}
+        with open(header_path, "w") as f:
+            json.dump(header, f, indent=2)
+
+    def _load_cached(self, stage):
+        _, data_path = self._cache_paths(stage)
+        with open(data_path, "rb") as f:
+            return pickle.load(f)
+
+    def invalidate(self, names):
+        """Drops the cache entries of the named stages, so they re-run next time."""
+        if self.cache_dir is None:
+            return
+        for stage in self.stages:
+            if stage.name in names:
+                for path in self._cache_paths(stage):
+                    if os.path.exists(path):
+                        os.remove(path)
+
+    # -------------------------- run --------------------------
+
+    def run(self, sources, targets=None, force=False, recorder=None):
+        """
+        Executes the graph.
+
+        sources: dict of values that are not produced by any stage
+                 (typically raw file paths or parameters).
+        targets: output names to return (default: every output).
+        force:   ignore the cache and re-run every stage.
+        recorder: optional instrumentation.RunRecorder; every stage is
+                 recorded as a span (time, memory, rows, cache hits).
+
+        Returns (values, report) where report lists each stage with its
+        status ("ran" / "cached") and wall time in seconds.
+        """
+        values = dict(sources)
+        digests = {name: hash_value(value) for name, value in sources.items()}
+        loaded = set()
+        report = []
+
+        def fetch(name):
+            if name not in values:
+                stage = self.producers[name]
+                values.update(self._load_cached(stage))
+                loaded.add(stage.name)
+            return values[name]
+
+        for stage in self.order:
+            missing = [n for n in stage.inputs if n not in digests]
+            if missing:
+                raise PipelineError(f"Stage '{stage.name}' is missing inputs: {missing}")
+
+            with recorder.stage(stage.name) if recorder else nullcontext({}) as span:
+                start = time.perf_counter()
+                key = stage.key([digests[n] for n in stage.inputs])
+                header = None if force else self._read_header(stage)
+
+                if header and header["key"] == key and all(os.path.exists(p) for p in header["files"]):
+                    digests.update(header["outputs"])
+                    report.append({"stage": stage.name, "status": "cached",
+                                   "seconds": time.perf_counter() - start})
+                    span.update(status="cached", counters={"cache_hits": 1})
+                    logging.info(f"⏭  Skipped (unchanged): {stage.name}")
+                    continue
+
+                logging.info(f"🚀 Running stage: {stage.name}")
+                inputs = {n: fetch(n) for n in stage.inputs}
+                span["rows_in"] = count_rows(inputs) if recorder else None
+                result = stage.func(**inputs)
+                if len(stage.outputs) == 1:
+                    result = (result,)
+                if len(result) != len(stage.outputs):
+                    raise PipelineError(
+                        f"Stage '{stage.name}' returned {len(result)} values, "
+                        f"expected {len(stage.outputs)}"
+                    )
+
+                outputs = dict(zip(stage.outputs, result))
+                if not stage.allow_empty:
+                    for name, value in outputs.items():
+                        if _is_empty(value):
+                            raise PipelineError(f"Stage '{stage.name}' produced no data for '{name}'")
+
+                out_digests = {name: hash_value(value) for name, value in outputs.items()}
+                values.update(outputs)
+                digests.update(out_digests)
+                self._write_cache(stage, key, outputs, out_digests)
+                span["rows_out"] = count_rows(outputs) if recorder else None
+
+                report.append({"stage": stage.name, "status": "ran",
+                               "seconds": time.perf_counter() - start})
+                logging.info(f"✅ Completed: {stage.name} ({report[-1]['seconds']:.2f}s)")
+
+        wanted = targets if targets is not None else list(self.producers)
+        return {name: fetch(name) for name in wanted}, report
+
+
+# -----------------------------------------------------------
+# 4. Internal helpers
+# -----------------------------------------------------------
+
+def _is_empty(value):
+    if value is None:
+        return True
+    if isinstance(value, (pd.DataFrame, pd.Series)):
+        return value.empty
+    if isinstance(value, (list, tuple, dict)):
+        return len(value) == 0
+    return False
+
+
+def _written_files(outputs):
+    """Collects file paths returned by writer stages (str or list of str)."""
+    files = []
+    for value in outputs.values():
+        items = value if isinstance(value, (list, tuple)) else [value]
+        files.extend(p for p in items if isinstance(p, str) and os.path.isfile(p))
+    return files
@@ -0,0 +1,298 @@
+"""
+points_systems.py
+-------------------
+World Championship points systems since 1950, as a year-indexed rule
+table, plus vectorized scoring of race results under any of them.
+
+This file:
+- Declares every era's scoring rules (POINTS_SYSTEMS): finishing-position
+  points, fastest-lap point (and whether it needs a top-10 finish),
+  sprint points, split or no points for shared drives, half points for
+  shortened races and double points at the last round
+- Expands them into a table with one row per season (points_table), or
+  applies one era's rules to every season (uniform_table) to re-score
+  history under an alternative system
+- Scores every result row with array lookups into the table (rescore);
+  no per-row Python
+- Computes each team-season's points, maximum possible points and
+  points efficiency in one pass (team_points_efficiency)
+
+Maximum possible points of a team in a race: the points for the top k
+positions, k = cars the team entered, plus the fastest-lap point, under
+that race's multiplier (half / double points). Points efficiency is the
+team's points over that maximum, comparable across points systems.
+
+Sprint races are not in f1db-races-race-results.csv, so sprint points
+are only added to the maximum when include_sprints=True.
+"""
+
+import numpy as np
+import pandas as pd
+
+from instrumentation import instrumented
+from race_store import as_frame
+from team_aggregation import encode_keys, group_ids
+
+# -----------------------------------------------------------
+# 1. Rules
+# -----------------------------------------------------------
+
+_2010 = (25, 18, 15, 12, 10, 8, 6, 4, 2, 1)
+
+# One entry per era; years are inclusive
+POINTS_SYSTEMS = [
+    {"era": "1950", "years": (1950, 1957), "points": (8, 6, 4, 3, 2),
+     "fastest_lap": 1, "shared_drives": "split", "half_points_below": None},
+    {"era": "1958", "years": (1958, 1959), "points": (8, 6, 4, 3, 2),
+     "fastest_lap": 1, "half_points_below": None},
+    {"era": "1960", "years": (1960, 1960), "points": (8, 6, 4, 3, 2, 1)},
+    {"era": "1961", "years": (1961, 1990), "points": (9, 6, 4, 3, 2, 1)},
+    {"era": "1991", "years": (1991, 2002), "points": (10, 6, 4, 3, 2, 1)},
+    {"era": "2003", "years": (2003, 2009), "points": (10, 8, 6, 5, 4, 3, 2, 1)},
+    {"era": "2010", "years": (2010, 2018), "points": _2010},
+    {"era": "2019", "years": (2019, 2020), "points": _2010, "fastest_lap": 1, "fastest_lap_top": 10},
+    {"era": "2021", "years": (2021, 2021), "points": _2010, "fastest_lap": 1, "fastest_lap_top": 10,
+     "sprint": (3, 2, 1)},
+    {"era": "2022", "years": (2022, 2024), "points": _2010, "fastest_lap": 1, "fastest_lap_top": 10,
+     "sprint": (8, 7, 6, 5, 4, 3, 2, 1), "half_points_below": None},
+    {"era": "2025", "years": (2025, 2100), "points": _2010,
+     "sprint": (8, 7, 6, 5, 4, 3, 2, 1), "half_points_below": None},
+]
+
+# Seasons whose last round paid double points
+DOUBLE_POINTS_FINALE = {2014}
+
+_DEFAULTS = {
+    "fastest_lap": 0,            # points for the fastest lap
+    "fastest_lap_top": 0,        # fastest lap only scores inside this position (0 = always)
+    "sprint": (),                # sprint race points by position
+    "shared_drives": "zero",     # a shared car's points: "split" between its drivers, or "zero"
+    "half_points_below": 0.75,   # races stopped below this share of laps pay half points
+}
+
+
+def _era_rows(systems):
+    for system in systems:
+        rules = {**_DEFAULTS, **system}
+        first, last = rules["years"]
+        for year in range(first, last + 1):
+            yield year, rules
+
+
+def points_table(systems=POINTS_SYSTEMS):
+    """
+    One row per season with that season's rules:
+    era, points (tuple), fastest_lap, fastest_lap_top, sprint,
+    shared_drives, half_points_below, double_points_finale.
+    """
+    rows = [{
+        "year": year,
+        "era": rules["era"],
+        "points": tuple(rules["points"]),
+        "fastest_lap": rules["fastest_lap"],
+        "fastest_lap_top": rules["fastest_lap_top"],
+        "sprint": tuple(rules["sprint"]),
+        "shared_drives": rules["shared_drives"],
+        "half_points_below": np.nan if rules["half_points_below"] is None else rules["half_points_below"],
+        "double_points_finale": year in DOUBLE_POINTS_FINALE,
+    } for year, rules in _era_rows(systems)]
+    return pd.DataFrame(rows).set_index("year")
+
+
+def uniform_table(era, years=None, systems=POINTS_SYSTEMS):
+    """
+    The rules of one era (e.g. "2010") applied to every season in
+    `years` (default: every season of `systems`), for re-scoring history
+    under that system. Per-race events (double points, half points for
+    shortened races) follow the chosen era's rules; shared drives keep
+    each season's own rule, so a shared car never scores more than once.
+    """
+    base = points_table(systems)
+    matches = base[base["era"] == era]
+    if matches.empty:
+        raise KeyError(f"Unknown points system '{era}'. Known: {sorted(base['era'].unique())}")
+    years = base.index if years is None else pd.Index(years)
+    table = pd.DataFrame([matches.iloc[0]] * len(years), index=years)
+    table.index.name = "year"
+    table["double_points_finale"] = False
+    # Shared drives describe how a season was raced, not how it was scored
+    table["shared_drives"] = base["shared_drives"].reindex(
+        years, fill_value=_DEFAULTS["shared_drives"]).to_numpy()
+    return table
+
+
+# -----------------------------------------------------------
+# 2. Table -> dense lookup arrays
+# -----------------------------------------------------------
+
+def compile_rules(table):
+    """
+    Dense arrays for vectorized lookups. Row i of each array is season
+    years[i]; position arrays are padded with zeros (index 0 unused) and
+    cumulative arrays give the points of the top k positions.
+    """
+    width = max(len(p) for p in table["points"]) + 1
+    sprint_width = max([len(p) for p in table["sprint"]] + [0]) + 1
+    position = np.zeros((len(table), width))
+    sprint = np.zeros((len(table), sprint_width))
+    for i, (pts, spr) in enumerate(zip(table["points"], table["sprint"])):
+        position[i, 1:len(pts) + 1] = pts
+        sprint[i, 1:len(spr) + 1] = spr
+    return {
+        "years": table.index.to_numpy(dtype=np.int64),
+        "position": position,
+        "top_k": np.cumsum(position, axis=1),
+        "sprint": sprint,
+        "sprint_top_k": np.cumsum(sprint, axis=1),
+        "fastest_lap": table["fastest_lap"].to_numpy(dtype=np.float64),
+        "fastest_lap_top": table["fastest_lap_top"].to_numpy(dtype=np.int64),
+        "split_shared": (table["shared_drives"] == "split").to_numpy(),
+        "half_below": table["half_points_below"].to_numpy(dtype=np.float64),
+        "double_finale": table["double_points_finale"].to_numpy(dtype=bool),
+    }
+
+
+def race_context(races, rules):
+    """Per race: season row in the rules table, points multiplier and sprint flag."""
+    year = races["year"].to_numpy().astype(np.int64)
+    season = pd.Index(rules["years"]).get_indexer(year)
+    if (season < 0).any():
+        missing = sorted(set(year[season < 0]))
+        raise KeyError(f"No points system for seasons {missing}")
+
+    multiplier = np.ones(len(races))
+    if "scheduledLaps" in races.columns:
+        laps = races["laps"].to_numpy(dtype=np.float64)
+        scheduled = races["scheduledLaps"].to_numpy(dtype=np.float64, na_value=np.nan)
+        threshold = rules["half_below"][season]
+        with np.errstate(invalid="ignore"):
+            shortened = (laps < threshold * scheduled) & ~np.isnan(threshold)
+        multiplier[shortened] = 0.5
+
+    rounds = races["round"].to_numpy().astype(np.int64)
+    last_round = pd.Series(rounds).groupby(year).transform("max").to_numpy()
+    multiplier[rules["double_finale"][season] & (rounds == last_round)] = 2.0
+
+    has_sprint = races["sprintRaceDate"].notna().to_numpy() if "sprintRaceDate" in races.columns \
+        else np.zeros(len(races), bool)
+    return season, multiplier, has_sprint
+
+
+# -----------------------------------------------------------
+# 3. Scoring
+# -----------------------------------------------------------
+
+RESULT_COLUMNS = ["raceId", "constructorId", "driverNumber", "positionNumber", "fastestLap", "points"]
+
+
+@instrumented()
+def rescore(results, races, table=None):
+    """
+    Points of every result row under `table` (default: the historical
+    systems), as a float array aligned with `results`. Rows of races
+    missing from `races` score NaN.
+
+    - position points by positionNumber, times the race multiplier
+    - fastest-lap points split between the drivers credited with it
+    - a position held by several rows is a shared car: its points are
+      split between the drivers ("split", until 1957) or not awarded
+      ("zero", from 1958)
+
+    Under the historical systems this matches the points column except
+    for ~20 rows of individual rulings the rules cannot express
+    (ineligible Formula 2 entries, excluded or reassigned results) and
+    the 1950s fractions the data rounds to two decimals.
+    """
+    table = points_table() if table is None else table
+    rules = compile_rules(table)
+    results = as_frame(results, RESULT_COLUMNS)
+    race_season, race_mult, _ = race_context(races, rules)
+
+    race_pos = pd.Index(races["id"].to_numpy()).get_indexer(results["raceId"].to_numpy())
+    known = race_pos >= 0
+    race_pos = np.where(known, race_pos, 0)
+    season = race_season[race_pos]
+    mult = race_mult[race_pos]
+
+    position = results["positionNumber"].to_numpy(dtype=np.float64, na_value=np.nan)
+    classified = ~np.isnan(position)
+    place = np.where(classified, position, 0).astype(np.int64)
+    pos = np.where(place < rules["position"].shape[1], place, 0)
+    points = rules["position"][season, pos] * mult
+
+    # Shared drives: several rows holding one scoring position
+    scoring = classified & (pos > 0)
+    if scoring.any():
+        gid, n, _ = group_ids(race_pos[scoring], pos[scoring])
+        drivers = np.bincount(gid, minlength=n)[gid]
+        split = rules["split_shared"][season[scoring]]
+        points[scoring] = np.where(split, points[scoring] / drivers,
+                                   np.where(drivers > 1, 0.0, points[scoring]))
+
+    # Fastest lap: split between every driver credited with it in the race
+    fastest = results["fastestLap"].to_numpy(dtype=bool, na_value=False) & (rules["fastest_lap"][season] > 0)
+    top = rules["fastest_lap_top"][season]
+    fastest &= (top == 0) | (classified & (place <= top))
+    if fastest.any():
+        per_race = np.bincount(race_pos[fastest], minlength=len(races))
+        points[fastest] += rules["fastest_lap"][season[fastest]] / per_race[race_pos[fastest]]
+
+    points[~known] = np.nan
+    return points
+
+
+@instrumented()
+def team_points_efficiency(results, races, constructors, table=None, include_sprints=False):
+    """
+    One row per (year, constructorId): points under `table`, maximum
+    possible points and points_eff = points / max_possible_points.
+    Constructors missing from `constructors` are dropped, like
+    build_team_year_summary.
+    """
+    table = points_table() if table is None else table
+    rules = compile_rules(table)
+    results = as_frame(results, RESULT_COLUMNS)
+    race_season, race_mult, race_sprint = race_context(races, rules)
+    points = rescore(results, races, table)
+
+    race_pos = pd.Index(races["id"].to_numpy()).get_indexer(results["raceId"].to_numpy())
+    codes, ids = encode_keys(results["constructorId"])
+    name_pos = pd.Index(constructors["id"].astype(str)).get_indexer(ids)
+    keep = (race_pos >= 0) & (codes >= 0)
+    keep &= name_pos[np.where(codes >= 0, codes, 0)] >= 0
+    race_pos, codes, points = race_pos[keep], codes[keep], points[keep]
+    # Cars per (race, team): a classified car is its position (shared drives
+    # count once), anything else its car number
+    position = results["positionNumber"].to_numpy(dtype=np.float64, na_value=np.nan)[keep]
+    number = results["driverNumber"].to_numpy(dtype=np.float64, na_value=0)[keep]
+    car = np.where(np.isnan(position), np.nanmax(position, initial=0) + 1 + np.maximum(number, 0),
+                   position).astype(np.int64)
+    _, _, car_first = group_ids(race_pos, codes, car)
+    pair, n_pairs, pair_first = group_ids(race_pos, codes)
+    cars = np.bincount(pair[car_first], minlength=n_pairs)
+    pair_race, pair_code = race_pos[pair_first], codes[pair_first]
+
+    season = race_season[pair_race]
+    top_k = rules["top_k"]
+    race_max = top_k[season, np.minimum(cars, top_k.shape[1] - 1)] * race_mult[pair_race]
+    race_max += rules["fastest_lap"][season]
+    if include_sprints:
+        sprint_k = rules["sprint_top_k"]
+        race_max += np.where(race_sprint[pair_race],
+                             sprint_k[season, np.minimum(cars, sprint_k.shape[1] - 1)], 0)
+    pair_points = np.bincount(pair, weights=np.nan_to_num(points), minlength=n_pairs)
+
+    year = rules["years"][season]
+    gid, n, first = group_ids(year - year.min() if len(year) else year, pair_code)
+    total = np.bincount(gid, weights=pair_points, minlength=n)
+    maximum = np.bincount(gid, weights=race_max, minlength=n)
+    code = pair_code[first]
+
+    return pd.DataFrame({
+        "year": year[first],
+        "constructorId": ids[code],
+        "name": constructors["name"].to_numpy(dtype=object)[name_pos[code]],
+        "points": total,
+        "max_possible_points": maximum,
+        "points_eff": np.divide(total, maximum, out=np.zeros(n), where=maximum > 0),
+    })
@@ -0,0 +1,177 @@
+"""
+qualifying.py
+-------------------
+Qualifying pace per constructor-season, from the f1db qualifying results.
+
+This file:
+- Parses lap-time strings ("1:44.170", "44.170", "1:00:43.900") for a
+  whole column at once: the strings are laid out as a fixed-width byte
+  matrix, right-aligned, so every field sits at a fixed offset from the
+  end and is read with array arithmetic (no per-cell split / regex)
+- Fills the *Millis columns that are missing but have a time string
+- Computes each constructor's gap to pole in every race (its best car
+  against the fastest lap of the session) and summarizes it per season:
+  median / mean / best gap in percent and the median gap in ms
+
+The season table feeds compute_metrics.with_qualifying_pace, which
+offers the pace as an optional, season-normalized TDI input.
+
+Input:
+    ../data/raw/f1db-races-qualifying-1-results.csv
+"""
+
+import numpy as np
+import pandas as pd
+
+from team_aggregation import encode_keys, group_ids
+
+TIME_COLUMNS = ["time", "q1", "q2", "q3"]
+
+# Right-aligned layout "hh:mm:ss.fff": (offset from the end, place value in ms)
+_DIGITS = [(1, 1), (2, 10), (3, 100),
+           (5, 1_000), (6, 10_000),
+           (8, 60_000), (9, 600_000),
+           (11, 3_600_000), (12, 36_000_000)]
+_SEPARATORS = {4: ord("."), 7: ord(":"), 10: ord(":")}
+_WIDTH = 12
+
+# -----------------------------------------------------------
+# 1. Vectorized lap-time parsing
+# -----------------------------------------------------------
+
+def parse_lap_times(values):
+    """
+    Lap-time strings -> float64 milliseconds (NaN for missing or
+    malformed entries). Accepts [[h:]m:]ss.fff with three decimals,
+    the f1db format.
+    """
+    text = pd.Series(values, dtype="string").str.strip()
+    present = text.notna().to_numpy()
+    out = np.full(len(text), np.nan)
+    if not present.any():
+        return out
+
+    raw = np.asarray(text[present].str.encode("ascii", "replace").to_numpy(dtype=object), dtype="S")
+    width = raw.dtype.itemsize
+    chars = np.frombuffer(raw.tobytes(), dtype=np.uint8).reshape(len(raw), width)
+    lengths = (chars != 0).sum(axis=1)
+
+    # Right-align: column _WIDTH - k holds the k-th character from the end
+    src = lengths[:, None] - _WIDTH + np.arange(_WIDTH)
+    aligned = np.where(src >= 0, chars[np.arange(len(raw))[:, None], np.clip(src, 0, width - 1)], 0)
+    digits = aligned.astype(np.int64) - ord("0")
+    is_digit = (digits >= 0) & (digits <= 9)
+
+    ok = (lengths >= 5) & (lengths <= _WIDTH) & ~np.isin(lengths, list(_SEPARATORS))
+    millis = np.zeros(len(raw), dtype=np.int64)
+    for offset, place in _DIGITS:
+        col = _WIDTH - offset
+        inside = offset <= lengths
+        ok &= ~inside | is_digit[:, col]
+        millis += np.where(inside, digits[:, col], 0) * place
+    for offset, sep in _SEPARATORS.items():
+        ok &= (offset > lengths) | (aligned[:, _WIDTH - offset] == sep)
+
+    out[np.flatnonzero(present)[ok]] = millis[ok]
+    return out
+
+
+def fill_lap_millis(qualifying, columns=TIME_COLUMNS):
+    """
+    Copy of `qualifying` where every missing <col>Millis value that has a
+    time string in <col> is filled with the parsed time. Existing millis
+    are kept.
+    """
+    out = qualifying.copy()
+    for col in columns:
+        if col not in out.columns:
+            continue
+        target = f"{col}Millis"
+        parsed = parse_lap_times(out[col])
+        if target in out.columns:
+            current = out[target].to_numpy(dtype=np.float64, na_value=np.nan)
+            filled = np.where(np.isnan(current), parsed, current)
+            dtype = out[target].dtype
+        else:
+            filled, dtype = parsed, "Int32"
+        out[target] = pd.Series(np.round(filled), index=out.index).astype("Int64").astype(dtype)
+    return out
+
+
+def best_lap_millis(qualifying, columns=TIME_COLUMNS):
+    """Each row's fastest lap over time / q1 / q2 / q3, parsing strings where millis are missing."""
+    filled = fill_lap_millis(qualifying, columns)
+    laps = np.column_stack([
+        filled[f"{col}Millis"].to_numpy(dtype=np.float64, na_value=np.nan)
+        for col in columns if f"{col}Millis" in filled.columns
+    ] or [np.full(len(filled), np.nan)])
+    best = np.full(len(filled), np.nan)
+    has_lap = ~np.isnan(laps).all(axis=1)
+    best[has_lap] = np.nanmin(laps[has_lap], axis=1)
+    return best
+
+
+# -----------------------------------------------------------
+# 2. Gap to pole per constructor-season
+# -----------------------------------------------------------
+
+def _sorted_median(gid, values, n_groups):
+    """Median of `values` per group id via one sort (groups must be non-empty)."""
+    order = np.lexsort((values, gid))
+    sizes = np.bincount(gid, minlength=n_groups)
+    starts = np.r_[0, np.cumsum(sizes)[:-1]]
+    lo = values[order][starts + (sizes - 1) // 2]
+    hi = values[order][starts + sizes // 2]
+    return (lo + hi) / 2
+
+
+def qualifying_pace(qualifying, races, constructors):
+    """
+    One row per (year, constructorId) with qualifying pace:
+    - quali_races        races with a timed lap
+    - median_gap_pct     median gap to pole, % of the pole lap
+    - mean_gap_pct       mean gap to pole, %
+    - best_gap_pct       smallest gap of the season (0 = took pole)
+    - median_gap_ms      median gap to pole, ms
+
+    A constructor's lap in a race is its fastest car; pole is the fastest
+    lap of the session. Rows for unknown races / constructors or without
+    any lap time are ignored.
+    """
+    best = best_lap_millis(qualifying)
+    race_pos = pd.Index(races["id"].to_numpy()).get_indexer(qualifying["raceId"].to_numpy())
+    codes, ids = encode_keys(qualifying["constructorId"])
+    name_pos = pd.Index(constructors["id"].astype(str)).get_indexer(ids)
+    keep = (race_pos >= 0) & (codes >= 0) & ~np.isnan(best)
+    keep &= name_pos[np.where(codes >= 0, codes, 0)] >= 0
+    race_pos, codes, best = race_pos[keep], codes[keep], best[keep]
+
+    # Team best lap per race, then the pole lap per race
+    pair, n_pairs, _ = group_ids(race_pos, codes)
+    team_lap = np.full(n_pairs, np.inf)
+    np.minimum.at(team_lap, pair, best)
+    pair_first = np.unique(pair, return_index=True)[1]
+    pair_race, pair_code = race_pos[pair_first], codes[pair_first]
+
+    pole = np.full(len(races), np.inf)
+    np.minimum.at(pole, pair_race, team_lap)
+    gap_ms = team_lap - pole[pair_race]
+    gap_pct = 100 * gap_ms / pole[pair_race]
+
+    year = races["year"].to_numpy().astype(np.int64)[pair_race]
+    gid, n, first = group_ids(year - year.min() if len(year) else year, pair_code)
+    count = np.bincount(gid, minlength=n)
+    code = pair_code[first]
+    names = constructors["name"].to_numpy(dtype=object)[name_pos[code]]
+
+    return pd.DataFrame({
+        "year": year[first],
+        "constructorId": ids[code],
+        "name": names,
+        "quali_races": count,
+        "median_gap_pct": _sorted_median(gid, gap_pct, n),
+        "mean_gap_pct": np.bincount(gid, weights=gap_pct, minlength=n) / count,
+        "best_gap_pct": np.minimum.reduceat(gap_pct[np.argsort(gid, kind="stable")],
+                                            np.r_[0, np.cumsum(count)[:-1]]) if n else np.array([]),
+        "median_gap_ms": _sorted_median(gid, gap_ms, n),
+    })
@@ -0,0 +1,299 @@
+"""
+race_store.py
+-------------------
+Compact, integer-coded in-memory store for f1db race results.
+
+This file:
+- Dictionary-encodes string ids (driver, constructor, engine, tyre) into
+  int16/int32 codes with lookup tables that can be shared between stores
+- Keeps positions and counters as small ints with a sentinel for missing
+- Keeps points as int16 hundredths (f1db points are exact to 0.01)
+- Bit-packs the boolean flags (1 bit per row per flag)
+- Stores mostly-null columns (time penalties, laps behind) sparsely
+
+Rows are kept in (year, raceId) order, so each season is a contiguous
+row range whatever order the race ids were assigned in.
+`to_frame` rebuilds a typed DataFrame (categorical ids, nullable ints)
+for code that expects pandas input, e.g. build_team_year_summary.
+"""
+
+import numpy as np
+import pandas as pd
+
+# -----------------------------------------------------------
+# 1. Shared id lookup tables
+# -----------------------------------------------------------
+
+class IdLookup:
+    """
+    String id <-> integer code table. One instance can be shared by several
+    stores (race results, qualifying, standings) so codes line up.
+    """
+
+    def __init__(self, values=()):
+        self.values = np.asarray(list(values), dtype=object)
+        self._index = pd.Index(self.values)
+
+    def __len__(self):
+        return len(self.values)
+
+    @property
+    def dtype(self):
+        return np.int16 if len(self.values) < np.iinfo(np.int16).max else np.int32
+
+    def encode(self, values):
+        """Codes for `values`, extending the table with unseen ids. Missing -> -1."""
+        values = pd.Series(values, dtype=object)
+        present = values.notna()
+        unseen = pd.Index(values[present].unique()).difference(self._index)
+        if len(unseen):
+            self.values = np.concatenate([self.values, np.asarray(sorted(unseen), dtype=object)])
+            self._index = pd.Index(self.values)
+
+        codes = np.full(len(values), -1, dtype=np.int64)
+        codes[present.to_numpy()] = self._index.get_indexer(values[present])
+        return codes.astype(self.dtype)
+
+    def decode(self, codes):
+        """Ids for `codes` (-1 -> None)."""
+        codes = np.asarray(codes)
+        out = self.values[np.where(codes >= 0, codes, 0)] if len(self.values) else np.full(len(codes), None)
+        return np.where(codes >= 0, out, None)
+
+    def code(self, value):
+        """Code of a single id, or -1 if unknown."""
+        return int(self._index.get_indexer([value])[0])
+
+
+# -----------------------------------------------------------
+# 2. Column layout
+# -----------------------------------------------------------
+
+ID_COLUMNS = {
+    'driverId': 'driver',
+    'constructorId': 'constructor',
+    'engineManufacturerId': 'engine',
+    'tyreManufacturerId': 'tyre',
+}
+
+# Dense small-int columns: (numpy dtype, sentinel used for missing values)
+INT_COLUMNS = {
+    'raceId': (np.int32, None),
+    'year': (np.int16, None),
+    'round': (np.int8, None),
+    'positionDisplayOrder': (np.int16, None),
+    'positionNumber': (np.int8, -1),
+    'driverNumber': (np.int16, None),
+    'laps': (np.int16, -1),
+    'qualificationPositionNumber': (np.int8, -1),
+    'gridPositionNumber': (np.int8, -1),
+    'positionsGained': (np.int8, np.iinfo(np.int8).min),
+    'pitStops': (np.int8, -1),
+    'timeMillis': (np.int32, -1),
+}
+
+FLAG_COLUMNS = ['sharedCar', 'polePosition', 'fastestLap', 'grandSlam', 'driverOfTheDay']
+
+# Kept as (row index, value) pairs; mostly null in f1db
+SPARSE_COLUMNS = {
+    'timePenaltyMillis': np.int32,
+    'gapLaps': np.int16,
+    'gapMillis': np.int32,
+}
+
+POINTS_SCALE = 100
+POINTS_MISSING = -1
+
+# -----------------------------------------------------------
+# 3. Store
+# -----------------------------------------------------------
+
+class RaceResultsStore:
+    """
+    Columnar, integer-coded race results. Build with from_frame / from_table.
+    """
+
+    def __init__(self, ids, ints, flags, points, sparse, n_rows, lookups):
+        self.ids = ids              # column -> code array
+        self.ints = ints            # column -> small-int array
+        self.flags = flags          # column -> packed uint8 bits
+        self.points = points        # int16 hundredths, POINTS_MISSING = null
+        self.sparse = sparse        # column -> (rows, values)
+        self.n_rows = n_rows
+        self.lookups = lookups      # kind -> IdLookup
+
+        years = self.ints['year']
+        self._year_starts = {}
+        if n_rows:
+            if (np.diff(years.astype(np.int64)) < 0).any():
+                raise ValueError("RaceResultsStore rows must be sorted by year")
+            starts = np.flatnonzero(np.r_[True, years[1:] != years[:-1]])
+            ends = np.r_[starts[1:], n_rows]
+            self._year_starts = {int(years[s]): (int(s), int(e)) for s, e in zip(starts, ends)}
+
+    # ------------------------ build ------------------------
+
+    @classmethod
+    def from_frame(cls, df, lookups=None):
+        """
+        Encodes a raw f1db race-results DataFrame (CSV or raw_loader types).
+        Pass `lookups` (kind -> IdLookup) to share id tables between stores.
+        """
+        lookups = {} if lookups is None else lookups
+        # Year first: race ids need not be in chronological order
+        df = df.sort_values(['year', 'raceId', 'positionDisplayOrder'], kind='stable')
+
+        ids = {}
+        for col, kind in ID_COLUMNS.items():
+            if col in df.columns:
+                lookup = lookups.setdefault(kind, IdLookup())
+                ids[col] = lookup.encode(df[col].astype(object).to_numpy())
+
+        ints = {}
+        for col, (dtype, sentinel) in INT_COLUMNS.items():
+            if col in df.columns:
+                values = df[col].astype('Float64').to_numpy(dtype=np.float64, na_value=np.nan)
+                if sentinel is not None:
+                    values = np.where(np.isnan(values), sentinel, values)
+                ints[col] = values.astype(dtype)
+
+        flags = {}
+        for col in FLAG_COLUMNS:
+            if col in df.columns:
+                values = df[col].astype('boolean').fillna(False).to_numpy(dtype=bool)
+                flags[col] = np.packbits(values)
+
+        raw_points = df['points'].to_numpy(dtype=np.float64, na_value=np.nan)
+        points = np.where(np.isnan(raw_points), POINTS_MISSING,
+                          np.round(raw_points * POINTS_SCALE)).astype(np.int16)
+
+        sparse = {}
+        for col, dtype in SPARSE_COLUMNS.items():
+            if col in df.columns:
+                values = df[col].to_numpy(dtype=np.float64, na_value=np.nan)
+                rows = np.flatnonzero(~np.isnan(values)).astype(np.int32)
+                sparse[col] = (rows, values[rows].astype(dtype))
+
+        return cls(ids, ints, flags, points, sparse, len(df), lookups)
+
+    @classmethod
+    def from_table(cls, lookups=None, **load_kwargs):
+        """Loads f1db race results through raw_loader and encodes them."""
+        import raw_loader
+        return cls.from_frame(raw_loader.load_table('race_results', **load_kwargs), lookups)
+
+    # ----------------------- accessors -----------------------
+
+    def __len__(self):
+        return self.n_rows
+
+    @property
+    def columns(self):
+        return (list(self.ids) + list(self.ints) + list(self.flags) + ['points']
+                + list(self.sparse))
+
+    def codes(self, column):
+        """Integer codes of an id column (-1 = missing)."""
+        return self.ids[column]
+
+    def lookup(self, column):
+        """IdLookup used by an id column."""
+        return self.lookups[ID_COLUMNS[column]]
+
+    def flag(self, column, start=0, stop=None):
+        """Boolean array for a bit-packed flag column (rows start:stop)."""
+        stop = self.n_rows if stop is None else stop
+        first = start // 8                          # unpack only the bytes covering the range
+        bits = np.unpackbits(self.flags[column][first:(stop + 7) // 8], count=stop - first * 8)
+        return bits[start - first * 8:].astype(bool)
+
+    def points_array(self, start=0, stop=None):
+        """Race points as float64 (NaN where f1db has no points value)."""
+        points = self.points[start:stop]
+        return np.where(points == POINTS_MISSING, np.nan, points / POINTS_SCALE)
+
+    def column(self, name, start=0, stop=None):
+        """
+        One column (rows start:stop, default all) as a numpy / pandas array:
+        - id columns -> Categorical of the shared lookup values
+        - sentinel ints / sparse columns -> pandas nullable Int arrays
+        - flags -> bool, points -> float64
+        Only the requested rows are decoded.
+        """
+        stop = self.n_rows if stop is None else stop
+        if name in self.ids:
+            lookup = self.lookup(name)
+            return pd.Categorical.from_codes(self.ids[name][start:stop], categories=lookup.values)
+        if name in self.ints:
+            values = self.ints[name][start:stop]
+            sentinel = INT_COLUMNS[name][1]
+            if sentinel is None:
+                return values
+            return pd.arrays.IntegerArray(values, values == sentinel)
+        if name in self.flags:
+            return self.flag(name, start, stop)
+        if name == 'points':
+            return self.points_array(start, stop)
+        if name in self.sparse:
+            rows, values = self.sparse[name]
+            lo, hi = np.searchsorted(rows, [start, stop])     # rows are sorted
+            dense = np.zeros(stop - start, dtype=values.dtype)
+            dense[rows[lo:hi] - start] = values[lo:hi]
+            mask = np.ones(stop - start, dtype=bool)
+            mask[rows[lo:hi] - start] = False
+            return pd.arrays.IntegerArray(dense, mask)
+        raise KeyError(f"Unknown column '{name}'")
+
+    def to_frame(self, columns=None, rows=None):
+        """
+        Materializes selected columns (default: all) as a typed DataFrame.
+        A contiguous `rows` slice is cut from the coded arrays before
+        decoding; any other row selection is applied to the full frame.
+        """
+        columns = self.columns if columns is None else columns
+        if isinstance(rows, slice) and rows.step in (None, 1):
+            start, stop, _ = rows.indices(self.n_rows)
+            return pd.DataFrame({name: self.column(name, start, max(start, stop)) for name in columns})
+        frame = pd.DataFrame({name: self.column(name) for name in columns})
+        return frame if rows is None else frame.iloc[rows].reset_index(drop=True)
+
+    # ------------------------ queries ------------------------
+
+    def years(self):
+        return sorted(self._year_starts)
+
+    def year_rows(self, year):
+        """Row range (start, stop) of a season; (0, 0) if absent."""
+        return self._year_starts.get(int(year), (0, 0))
+
+    def season(self, year, columns=None):
+        """Typed DataFrame for one season (a contiguous row slice)."""
+        start, stop = self.year_rows(year)
+        return self.to_frame(columns, rows=slice(start, stop))
+
+    def rows_for(self, column, value):
+        """Row indices where an id column equals `value`."""
+        code = self.lookup(column).code(value)
+        return np.flatnonzero(self.ids[column] == code) if code >= 0 else np.array([], dtype=np.int64)
+
+    # ------------------------ sizing ------------------------
+
+    @property
+    def nbytes(self):
+        """Resident bytes of the encoded arrays (lookup tables excluded)."""
+        total = sum(a.nbytes for a in self.ids.values())
+        total += sum(a.nbytes for a in self.ints.values())
+        total += sum(a.nbytes for a in self.flags.values())
+        total += self.points.nbytes
+        total += sum(r.nbytes + v.nbytes for r, v in self.sparse.values())
+        return total
+
+    def __repr__(self):
+        return f"RaceResultsStore(rows={self.n_rows}, seasons={len(self._year_starts)}, {self.nbytes / 1e6:.2f} MB)"
+
+
+def as_frame(results, columns):
+    """Lets functions take either a results DataFrame or a RaceResultsStore."""
+    if isinstance(results, RaceResultsStore):
+        return results.to_frame(columns)
+    return results
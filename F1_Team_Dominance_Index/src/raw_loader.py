@@ -0,0 +1,322 @@
+"""
+raw_loader.py
+-------------------
+Typed, cached loader for the raw f1db CSV tables.
+
+This file:
+- Declares an explicit schema (columns + compact dtypes) for each f1db table
+- Parses each CSV once with column projection and fixed dtypes
+- Writes a columnar cache (Parquet, or pickle when pyarrow is missing)
+- Re-uses the cache while the CSV's size, mtime and content hash match
+
+Input:
+    ../data/raw/f1db-*.csv
+
+Output:
+    ../data/cache/<table>.parquet (+ <table>.meta.json)
+"""
+
+import hashlib
+import json
+import logging
+import os
+
+import pandas as pd
+
+import instrumentation
+
+BASE_DIR = os.path.dirname(os.path.abspath(__file__))
+DATA_DIR = os.path.join(BASE_DIR, "../data")
+RAW_DIR = os.path.join(DATA_DIR, "raw")
+CACHE_DIR = os.path.join(DATA_DIR, "cache")
+
+try:
+    import pyarrow  # noqa: F401
+    CACHE_FORMAT = "parquet"
+except ImportError:
+    CACHE_FORMAT = "pickle"
+
+# -----------------------------------------------------------
+# 1. Table schemas
+# -----------------------------------------------------------
+# Only the listed columns are read. Integer widths follow the observed
+# ranges of the f1db export; nullable columns use pandas' Int* / boolean
+# extension types so missing values survive without falling back to float.
+# Points stay float64 so season sums match the CSV-based pipeline exactly.
+
+SCHEMAS = {
+    "race_results": {
+        "file": "f1db-races-race-results.csv",
+        "dtypes": {
+            "raceId": "int32",
+            "year": "int16",
+            "round": "int8",
+            "positionDisplayOrder": "int16",
+            "positionNumber": "Int16",
+            "positionText": "category",
+            "driverNumber": "int16",
+            "driverId": "category",
+            "constructorId": "category",
+            "engineManufacturerId": "category",
+            "tyreManufacturerId": "category",
+            "sharedCar": "bool",
+            "laps": "Int16",
+            "time": "string",
+            "timeMillis": "Int32",
+            "gapMillis": "Int32",
+            "gapLaps": "Int16",
+            "reasonRetired": "category",
+            "points": "float64",
+            "polePosition": "bool",
+            "qualificationPositionNumber": "Int16",
+            "gridPositionNumber": "Int16",
+            "positionsGained": "Int16",
+            "pitStops": "Int8",
+            "fastestLap": "boolean",
+            "driverOfTheDay": "boolean",
+            "grandSlam": "bool",
+        },
+    },
+    "races": {
+        "file": "f1db-races.csv",
+        "dtypes": {
+            "id": "int32",
+            "year": "int16",
+            "round": "int8",
+            "date": "string",
+            "grandPrixId": "category",
+            "officialName": "string",
+            "qualifyingFormat": "category",
+            "circuitId": "category",
+            "circuitType": "category",
+            "courseLength": "float64",
+            "laps": "int16",
+            "distance": "float64",
+            "scheduledLaps": "Int16",
+            "sprintRaceDate": "string",
+            "driversChampionshipDecider": "bool",
+            "constructorsChampionshipDecider": "bool",
+        },
+    },
+    "constructors": {
+        "file": "f1db-constructors.csv",
+        "dtypes": {
+            "id": "string",
+            "name": "string",
+            "fullName": "string",
+            "countryId": "category",
+            "totalChampionshipWins": "int16",
+            "totalRaceEntries": "int32",
+            "totalRaceWins": "int32",
+            "total1And2Finishes": "int32",
+            "totalPodiums": "int32",
+            "totalPoints": "float64",
+            "totalPolePositions": "int32",
+        },
+    },
+    "constructor_standings": {
+        "file": "f1db-races-constructor-standings.csv",
+        "dtypes": {
+            "raceId": "int32",
+            "year": "int16",
+            "round": "int8",
+            "positionDisplayOrder": "int16",
+            "positionNumber": "Int16",
+            "positionText": "category",
+            "constructorId": "category",
+            "engineManufacturerId": "category",
+            "points": "float64",
+            "positionsGained": "Int16",
+        },
+    },
+    "qualifying": {
+        "file": "f1db-races-qualifying-1-results.csv",
+        "dtypes": {
+            "raceId": "int32",
+            "year": "int16",
+            "round": "int8",
+            "positionDisplayOrder": "int16",
+            "positionNumber": "Int16",
+            "driverNumber": "int16",
+            "driverId": "category",
+            "constructorId": "category",
+            "engineManufacturerId": "category",
+            "tyreManufacturerId": "category",
+            "time": "string",
+            "timeMillis": "Int32",
+            "q1": "string",
+            "q1Millis": "Int32",
+            "q2": "string",
+            "q2Millis": "Int32",
+            "q3": "string",
+            "q3Millis": "Int32",
+            "gapMillis": "Int32",
+            "laps": "Int16",
+        },
+    },
+}
+
+
+def schema_version(name):
+    """Short hash of a table schema; a schema edit invalidates its cache."""
+    payload = json.dumps(SCHEMAS[name], sort_keys=True).encode()
+    return hashlib.sha1(payload).hexdigest()[:12]
+
+
+# -----------------------------------------------------------
+# 2. Typed CSV parsing
+# -----------------------------------------------------------
+
+def read_csv_typed(path, name):
+    """
+    Parses one f1db CSV using the declared schema for `name`.
+    Only schema columns are read (usecols) and dtypes are fixed up front,
+    so no type inference pass is needed.
+    """
+    dtypes = SCHEMAS[name]["dtypes"]
+    return pd.read_csv(path, usecols=list(dtypes), dtype=dtypes)[list(dtypes)]
+
+
+# -----------------------------------------------------------
+# 3. Columnar cache with size / mtime / hash invalidation
+# -----------------------------------------------------------
+
+def _file_sha1(path):
+    h = hashlib.sha1()
+    with open(path, "rb") as f:
+        for block in iter(lambda: f.read(1 << 20), b""):
+            h.update(block)
+    return h.hexdigest()
+
+
+def _cache_paths(name, cache_dir):
+    ext = "parquet" if CACHE_FORMAT == "parquet" else "pkl"
+    base = os.path.join(cache_dir, name)
+    return f"{base}.{ext}", f"{base}.meta.json"
+
+
+def _read_meta(meta_path):
+    if not os.path.exists(meta_path):
+        return None
+    with open(meta_path) as f:
+        return json.load(f)
+
+
+def _write_meta(meta_path, meta):
+    with open(meta_path, "w") as f:
+        json.dump(meta, f, indent=2)
+
+
+def _cache_is_valid(name, csv_path, data_path, meta_path):
+    """
+    Cheap checks first: schema version, then size + mtime. Only when the
+    file was touched (mtime changed, same size) is the content re-hashed;
+    an identical hash refreshes the stored mtime and keeps the cache.
+    """
+    meta = _read_meta(meta_path)
+    if meta is None or not os.path.exists(data_path):
+        return False
+    if meta.get("schema") != schema_version(name) or meta.get("format") != CACHE_FORMAT:
+        return False
+
+    stat = os.stat(csv_path)
+    if meta["size"] != stat.st_size:
+        return False
+    if meta["mtime_ns"] == stat.st_mtime_ns:
+        return True
+
+    if meta["sha1"] != _file_sha1(csv_path):
+        return False
+    meta["mtime_ns"] = stat.st_mtime_ns
+    _write_meta(meta_path, meta)
+    return True
+
+
+def _write_cache(df, name, csv_path, data_path, meta_path):
+    os.makedirs(os.path.dirname(data_path), exist_ok=True)
+    if CACHE_FORMAT == "parquet":
+        df.to_parquet(data_path, index=False)
+    else:
+        df.to_pickle(data_path)
+
+    stat = os.stat(csv_path)
+    _write_meta(meta_path, {
+        "table": name,
+        "source": os.path.basename(csv_path),
+        "schema": schema_version(name),
+        "format": CACHE_FORMAT,
+        "size": stat.st_size,
+        "mtime_ns": stat.st_mtime_ns,
+        "sha1": _file_sha1(csv_path),
+        "rows": len(df),
+    })
+
+
+def _read_cache(data_path):
+    if CACHE_FORMAT == "parquet":
+        return pd.read_parquet(data_path)
+    return pd.read_pickle(data_path)
+
+
+# -----------------------------------------------------------
+# 4. Public loaders
+# -----------------------------------------------------------
+
+@instrumentation.instrumented()
+def load_table(name, raw_dir=RAW_DIR, cache_dir=CACHE_DIR, use_cache=True):
+    """
+    Loads one f1db table by logical name (see SCHEMAS).
+    Returns a typed DataFrame, served from the columnar cache when valid.
+    """
+    if name not in SCHEMAS:
+        raise KeyError(f"Unknown f1db table '{name}'. Known tables: {sorted(SCHEMAS)}")
+
+    csv_path = os.path.join(raw_dir, SCHEMAS[name]["file"])
+    if not os.path.exists(csv_path):
+        raise FileNotFoundError(f"Raw data file not found: {csv_path}")
+
+    if not use_cache:
+        return read_csv_typed(csv_path, name)
+
+    data_path, meta_path = _cache_paths(name, cache_dir)
+    if _cache_is_valid(name, csv_path, data_path, meta_path):
+        instrumentation.count("cache_hits")
+        return _read_cache(data_path)
+
+    instrumentation.count("cache_misses")
+    logging.info(f"Parsing {SCHEMAS[name]['file']} (cache miss)")
+    df = read_csv_typed(csv_path, name)
+    _write_cache(df, name, csv_path, data_path, meta_path)
+    return df
+
+
+def load_raw_tables(names=None, raw_dir=RAW_DIR, cache_dir=CACHE_DIR, use_cache=True):
+    """
+    Loads several f1db tables at once.
+    Returns a dict {table_name: DataFrame}.
+    """
+    names = list(SCHEMAS) if names is None else names
+    return {
+        name: load_table(name, raw_dir=raw_dir, cache_dir=cache_dir, use_cache=use_cache)
+        for name in names
+    }
+
+
+def clear_cache(cache_dir=CACHE_DIR):
+    """Removes every cached table so the next load re-parses the CSVs."""
+    if not os.path.isdir(cache_dir):
+        return
+    for file in os.listdir(cache_dir):
+        if file.endswith((".parquet", ".pkl", ".meta.json")):
+            os.remove(os.path.join(cache_dir, file))
+
+
+if __name__ == "__main__":
+    import time
+
+    for table in SCHEMAS:
+        start = time.perf_counter()
+        df = load_table(table)
+        elapsed = time.perf_counter() - start
+        mem = df.memory_usage(deep=True).sum() / 1e6
+        print(f"📦 {table:22s} {df.shape}  {mem:6.2f} MB  {elapsed * 1000:7.1f} ms")
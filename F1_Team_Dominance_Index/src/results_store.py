@@ -0,0 +1,298 @@
+"""
+results_store.py
+-------------------
+Embedded SQLite store for the pipeline results: team-season metrics,
+TDI variants for every entity and the derived summaries.
+
+This file:
+- Declares a versioned schema (PRAGMA user_version) with migrations
+- Indexes team seasons on (year, TDI_rank), (constructorId, year),
+  (name, year) and (TDI_rank, year), so point and range lookups are
+  index hits instead of full CSV parses
+- Publishes a whole run in one transaction with batched executemany
+  writes; readers (WAL mode) see either the previous run or the new one
+- Records a content hash of the stored data (dataset_version)
+- Offers a small query API that returns plain dict rows
+
+Only the stdlib is imported at module level; pandas is needed only by
+publish() (it takes DataFrames) and to_frame().
+
+Usage:
+    from results_store import ResultsStore
+    with ResultsStore() as store:
+        store.top(2023, n=5)
+        store.team("Red Bull", start=2010, end=2013)
+        store.decades()
+"""
+
+import datetime
+import hashlib
+import os
+import sqlite3
+
+BASE_DIR = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+RESULTS_DB = os.path.join(BASE_DIR, "output", "tdi.db")
+
+SCHEMA_VERSION = 1
+
+# Rows per executemany call inside the publishing transaction
+BATCH_ROWS = 5_000
+
+# -----------------------------------------------------------
+# 1. Schema and migrations
+# -----------------------------------------------------------
+
+TEAM_SEASON_COLUMNS = [
+    "year", "constructorId", "name", "total_races", "entries", "wins", "podiums",
+    "one_two_finishes", "poles", "avg_finish", "points",
+    "win_rate", "podium_rate", "points_share", "one_two_rate",
+    "win_rate_norm", "podium_rate_norm", "points_share_norm", "one_two_rate_norm",
+    "TDI", "TDI_alt", "TDI_normalized", "TDI_rank",
+]
+ENTITY_SEASON_COLUMNS = ["entity", "year", "entity_id", "TDI", "TDI_alt", "TDI_normalized", "TDI_rank"]
+DECADE_COLUMNS = ["decade", "name", "TDI"]
+DOMINANCE_COLUMNS = ["name", "dominant_years", "peak_year", "peak_TDI", "longest_streak"]
+PUBLISHED_TABLES = {"team_seasons": TEAM_SEASON_COLUMNS, "entity_seasons": ENTITY_SEASON_COLUMNS,
+                    "decade_summary": DECADE_COLUMNS, "dominance_summary": DOMINANCE_COLUMNS}
+
+# MIGRATIONS[v] upgrades a database from version v to v + 1
+MIGRATIONS = [
+    """
+    CREATE TABLE meta (
+        key   TEXT PRIMARY KEY,
+        value TEXT
+    );
+    CREATE TABLE team_seasons (
+        year INTEGER NOT NULL, constructorId TEXT NOT NULL, name TEXT COLLATE NOCASE,
+        total_races INTEGER, entries INTEGER, wins INTEGER, podiums INTEGER,
+        one_two_finishes INTEGER, poles INTEGER, avg_finish REAL, points REAL,
+        win_rate REAL, podium_rate REAL, points_share REAL, one_two_rate REAL,
+        win_rate_norm REAL, podium_rate_norm REAL, points_share_norm REAL, one_two_rate_norm REAL,
+        TDI REAL, TDI_alt REAL, TDI_normalized REAL, TDI_rank REAL,
+        PRIMARY KEY (constructorId, year)
+    );
+    CREATE INDEX idx_team_seasons_year ON team_seasons (year, TDI_rank);
+    CREATE INDEX idx_team_seasons_name ON team_seasons (name, year);
+    CREATE INDEX idx_team_seasons_rank ON team_seasons (TDI_rank, year);
+    CREATE INDEX idx_team_seasons_tdi ON team_seasons (TDI);
+
+    CREATE TABLE entity_seasons (
+        entity TEXT NOT NULL, year INTEGER NOT NULL, entity_id TEXT NOT NULL,
+        TDI REAL, TDI_alt REAL, TDI_normalized REAL, TDI_rank REAL,
+        PRIMARY KEY (entity, entity_id, year)
+    );
+    CREATE INDEX idx_entity_seasons_year ON entity_seasons (entity, year, TDI_rank);
+
+    CREATE TABLE decade_summary (
+        decade INTEGER PRIMARY KEY, name TEXT, TDI REAL
+    );
+    CREATE TABLE dominance_summary (
+        name TEXT PRIMARY KEY COLLATE NOCASE, dominant_years INTEGER, peak_year INTEGER,
+        peak_TDI REAL, longest_streak INTEGER
+    );
+
+    CREATE VIEW average_tdi_by_team AS
+        SELECT name, AVG(TDI) AS TDI, COUNT(*) AS seasons
+        FROM team_seasons GROUP BY name;
+    """,
+]
+
+assert len(MIGRATIONS) == SCHEMA_VERSION
+
+
+def migrate(conn):
+    """Brings the database schema up to SCHEMA_VERSION; returns the version found."""
+    found = conn.execute("PRAGMA user_version").fetchone()[0]
+    if found > SCHEMA_VERSION:
+        raise RuntimeError(f"Results database has schema v{found}, this code reads up to "
+                           f"v{SCHEMA_VERSION}. Update the project or rebuild the database.")
+    for version in range(found, SCHEMA_VERSION):
+        # executescript runs outside the implicit transaction; BEGIN/COMMIT keep each step atomic
+        conn.executescript(f"BEGIN; {MIGRATIONS[version]} PRAGMA user_version = {version + 1}; COMMIT;")
+    return found
+
+
+# -----------------------------------------------------------
+# 2. Store
+# -----------------------------------------------------------
+
+def _rows(df, columns):
+    """DataFrame -> list of tuples of Python scalars (NaN -> NULL) in `columns` order."""
+    present = [c for c in columns if c in df.columns]
+    values = df[present].astype(object)
+    values = values.where(values.notna(), None).to_numpy().tolist()
+    if len(present) == len(columns):
+        return [tuple(r) for r in values]
+    pos = [present.index(c) if c in present else None for c in columns]
+    return [tuple(r[p] if p is not None else None for p in pos) for r in values]
+
+
+class ResultsStore:
+    """
+    One SQLite results database. Opened read-only, it never creates or
+    migrates anything; opened writable, it creates / migrates the schema.
+    """
+
+    def __init__(self, path=RESULTS_DB, readonly=False):
+        self.path = path
+        self.readonly = readonly
+        if readonly:
+            if not os.path.exists(path):
+                raise FileNotFoundError(f"Results database not found: {path}")
+            self.conn = sqlite3.connect(f"file:{path}?mode=ro", uri=True, check_same_thread=False)
+            found = self.conn.execute("PRAGMA user_version").fetchone()[0]
+            if found != SCHEMA_VERSION:
+                self.conn.close()
+                raise RuntimeError(f"Results database has schema v{found}, expected v{SCHEMA_VERSION}")
+        else:
+            os.makedirs(os.path.dirname(os.path.abspath(path)), exist_ok=True)
+            self.conn = sqlite3.connect(path, check_same_thread=False)
+            self.conn.execute("PRAGMA journal_mode=WAL")
+            migrate(self.conn)
+        self.conn.row_factory = sqlite3.Row
+
+    def close(self):
+        self.conn.close()
+
+    def __enter__(self):
+        return self
+
+    def __exit__(self, *exc):
+        self.close()
+
+    # ----------------------- writing -----------------------
+
+    def _insert(self, table, columns, rows):
+        sql = f"INSERT INTO {table} ({', '.join(columns)}) VALUES ({', '.join('?' * len(columns))})"
+        for start in range(0, len(rows), BATCH_ROWS):
+            self.conn.executemany(sql, rows[start:start + BATCH_ROWS])
+
+    def publish(self, team_metrics, entity_tdi=None, decade_summary=None, dominance_summary=None):
+        """
+        Replaces the stored results with one pipeline run, atomically.
+        team_metrics: scored team seasons (main_pipeline.score);
+        entity_tdi: {entity: scored season table} with the entity key
+        column from team_aggregation.ENTITY_KEYS; the summaries as built
+        by era_metrics. Tables passed as None keep their stored rows.
+        Returns the new dataset_version.
+        """
+        from team_aggregation import ENTITY_KEYS
+
+        tables = {"team_seasons": (TEAM_SEASON_COLUMNS, _rows(team_metrics, TEAM_SEASON_COLUMNS))}
+        if entity_tdi is not None:
+            entity_rows = []
+            for entity, df in entity_tdi.items():
+                renamed = df.rename(columns={ENTITY_KEYS[entity]: "entity_id"}).assign(entity=entity)
+                entity_rows.extend(_rows(renamed, ENTITY_SEASON_COLUMNS))
+            tables["entity_seasons"] = (ENTITY_SEASON_COLUMNS, entity_rows)
+        if decade_summary is not None:
+            tables["decade_summary"] = (DECADE_COLUMNS, _rows(decade_summary, DECADE_COLUMNS))
+        if dominance_summary is not None:
+            tables["dominance_summary"] = (DOMINANCE_COLUMNS, _rows(dominance_summary, DOMINANCE_COLUMNS))
+
+        with self.conn:                                     # one transaction
+            for table, (columns, rows) in tables.items():
+                self.conn.execute(f"DELETE FROM {table}")
+                self._insert(table, columns, rows)
+            # Hashed from the stored rows, so tables kept from an earlier
+            # run count towards the version too
+            version = self._content_hash()
+            self.conn.executemany("INSERT OR REPLACE INTO meta (key, value) VALUES (?, ?)", [
+                ("dataset_version", version),
+                ("published_at", datetime.datetime.now().isoformat(timespec="seconds")),
+                ("team_seasons", str(len(tables["team_seasons"][1]))),
+            ])
+        return version
+
+    def _content_hash(self):
+        digest = hashlib.sha1()
+        for table, columns in sorted(PUBLISHED_TABLES.items()):
+            digest.update(table.encode())
+            for row in self.conn.execute(f"SELECT {', '.join(columns)} FROM {table} ORDER BY rowid"):
+                digest.update(repr(tuple(row)).encode())
+        return digest.hexdigest()[:16]
+
+    # ----------------------- reading -----------------------
+
+    def query(self, sql, params=()):
+        """Rows of an arbitrary SELECT as dicts."""
+        return [dict(r) for r in self.conn.execute(sql, params)]
+
+    def meta(self):
+        return {r["key"]: r["value"] for r in self.conn.execute("SELECT key, value FROM meta")}
+
+    def dataset_version(self):
+        row = self.conn.execute("SELECT value FROM meta WHERE key = 'dataset_version'").fetchone()
+        return row[0] if row else None
+
+    def season(self, year, columns="year, constructorId, name, TDI, TDI_normalized, TDI_rank"):
+        """Every team of one season, best first."""
+        return self.query(f"SELECT {columns} FROM team_seasons WHERE year = ? "
+                          "ORDER BY TDI_rank, TDI DESC", (year,))
+
+    def top(self, year, n=10):
+        """Top n teams of one season by TDI."""
+        return self.query("SELECT year, name, TDI, TDI_normalized, TDI_rank FROM team_seasons "
+                          "WHERE year = ? ORDER BY TDI_rank, TDI DESC LIMIT ?", (year, n))
+
+    def team(self, team, start=None, end=None):
+        """
+        One team's seasons (by constructorId or case-insensitive name),
+        optionally limited to start <= year <= end.
+        """
+        lo = -1 if start is None else start
+        hi = 1 << 30 if end is None else end
+        rows = self.query("SELECT year, name, TDI, TDI_normalized, TDI_rank FROM team_seasons "
+                          "WHERE constructorId = ? AND year BETWEEN ? AND ? ORDER BY year",
+                          (team, lo, hi))
+        return rows or self.query("SELECT year, name, TDI, TDI_normalized, TDI_rank FROM team_seasons "
+                                  "WHERE name = ? AND year BETWEEN ? AND ? ORDER BY year",
+                                  (team, lo, hi))
+
+    def seasons(self, start, end, max_rank=None):
+        """Team seasons with start <= year <= end (optionally TDI_rank <= max_rank)."""
+        if max_rank is None:
+            return self.query("SELECT year, name, TDI, TDI_normalized, TDI_rank FROM team_seasons "
+                              "WHERE year BETWEEN ? AND ? ORDER BY year, TDI_rank", (start, end))
+        return self.query("SELECT year, name, TDI, TDI_normalized, TDI_rank FROM team_seasons "
+                          "WHERE year BETWEEN ? AND ? AND TDI_rank <= ? ORDER BY year, TDI_rank",
+                          (start, end, max_rank))
+
+    def top_seasons(self, n=10):
+        """The n most dominant team seasons of all time (top_10_dominant_seasons)."""
+        return self.query("SELECT year, name, TDI FROM team_seasons ORDER BY TDI DESC LIMIT ?", (n,))
+
+    def average_by_team(self, min_seasons=1):
+        """Mean TDI per team, highest first (average_tdi_by_team)."""
+        return self.query("SELECT name, TDI, seasons FROM average_tdi_by_team "
+                          "WHERE seasons >= ? ORDER BY TDI DESC", (min_seasons,))
+
+    def decades(self):
+        return self.query(f"SELECT {', '.join(DECADE_COLUMNS)} FROM decade_summary ORDER BY decade")
+
+    def dominance(self):
+        return self.query(f"SELECT {', '.join(DOMINANCE_COLUMNS)} FROM dominance_summary "
+                          "ORDER BY dominant_years DESC, name")
+
+    def entity(self, entity, year=None, n=None):
+        """Scored seasons of drivers / engines / tyres, optionally one year, best first."""
+        sql = "SELECT year, entity_id, TDI, TDI_alt, TDI_normalized, TDI_rank FROM entity_seasons WHERE entity = ?"
+        params = [entity]
+        if year is not None:
+            sql += " AND year = ?"
+            params.append(year)
+        sql += " ORDER BY year, TDI_rank"
+        if n is not None:
+            sql += " LIMIT ?"
+            params.append(n)
+        return self.query(sql, params)
+
+    def __repr__(self):
+        return f"ResultsStore({os.path.abspath(self.path)}, version={self.dataset_version()})"
+
+
+def to_frame(rows):
+    """Query rows -> DataFrame (imports pandas on first use)."""
+    import pandas as pd
+
+    return pd.DataFrame(rows)
@@ -0,0 +1,211 @@
+"""
+sensitivity.py
+-------------------
+Weight-sensitivity sweep for the Team Dominance Index (TDI).
+
+This file:
+- Samples weight vectors uniformly from the simplex (Dirichlet(1, ..., 1))
+- Scores every team-season under each weight vector with one matrix product
+  over the *_norm columns
+- Ranks teams within each season and compares to the reference TDI ranking
+- Reports per team-season rank stability / top-rank frequency and
+  per-season Kendall-tau distributions
+
+Weights are processed in chunks so memory stays bounded by
+(teams per season)^2 x chunk_size, and chunks can be spread over a process
+pool. Each chunk draws its weights from its own SeedSequence child, so a
+sweep is reproducible for a given seed regardless of the worker count.
+
+Given a SharedMetrics (metric_matrix) instead of a DataFrame, chunks
+receive the handle and read the memory-mapped matrix, so the metric
+matrix is not pickled into every task.
+"""
+
+from concurrent.futures import ProcessPoolExecutor
+
+import numpy as np
+import pandas as pd
+
+from compute_metrics import NORMALIZE_COLS, TDI_WEIGHTS, year_segments
+from metric_matrix import SharedMetrics
+
+NORM_COLS = [f"{col}_norm" for col in NORMALIZE_COLS]
+TAU_BINS = np.linspace(-1, 1, 41)
+
+# -----------------------------------------------------------
+# 1. Weight sampling
+# -----------------------------------------------------------
+
+def sample_weights(n, k=len(NORM_COLS), rng=None):
+    """Returns a (k, n) matrix of weight vectors drawn uniformly from the simplex."""
+    rng = np.random.default_rng(rng)
+    return rng.dirichlet(np.ones(k), size=n).T
+
+
+# -----------------------------------------------------------
+# 2. Per-chunk kernel
+# -----------------------------------------------------------
+
+def _pair_signs(scores):
+    """sign(score_i - score_j) for every pair in a season, as int8 (m, m, c)."""
+    a = scores[:, None, :]
+    b = scores[None, :, :]
+    return (a > b).astype(np.int8) - (a < b).astype(np.int8)
+
+
+def _sweep_chunk(X, starts, base_signs, base_ranks, seed, n_weights):
+    """
+    Scores all rows under one chunk of sampled weights and returns additive
+    accumulators: per-row top / same-rank counts and rank moments, per-season
+    tau sums, minimum and histogram. X is the score matrix or a
+    SharedMetrics to read it from.
+    """
+    if isinstance(X, SharedMetrics):
+        X = X.block(NORM_COLS)
+    W = sample_weights(n_weights, X.shape[1], np.random.default_rng(seed))
+    S = X @ W
+
+    n_rows, n_seasons = len(X), len(starts)
+    ends = np.r_[starts[1:], n_rows]
+    acc = {
+        "top": np.zeros(n_rows),
+        "same_rank": np.zeros(n_rows),
+        "rank_sum": np.zeros(n_rows),
+        "rank_sq": np.zeros(n_rows),
+        "tau_sum": np.zeros(n_seasons),
+        "tau_sq": np.zeros(n_seasons),
+        "tau_min": np.full(n_seasons, np.inf),
+        "tau_hist": np.zeros((n_seasons, len(TAU_BINS) - 1)),
+        "n": n_weights,
+    }
+
+    for s, (lo, hi) in enumerate(zip(starts, ends)):
+        signs = _pair_signs(S[lo:hi])                       # (m, m, c)
+        ranks = 1 + (signs < 0).sum(axis=1)                 # competition ranking
+
+        acc["top"][lo:hi] = (ranks == 1).sum(axis=1)
+        acc["same_rank"][lo:hi] = (ranks == base_ranks[lo:hi, None]).sum(axis=1)
+        acc["rank_sum"][lo:hi] = ranks.sum(axis=1)
+        acc["rank_sq"][lo:hi] = (ranks.astype(np.float64) ** 2).sum(axis=1)
+
+        m = hi - lo
+        if m > 1:
+            agree = (signs * base_signs[s][:, :, None]).sum(axis=(0, 1))
+            tau = agree / (m * (m - 1))
+        else:
+            tau = np.ones(n_weights)
+        acc["tau_sum"][s] = tau.sum()
+        acc["tau_sq"][s] = (tau ** 2).sum()
+        acc["tau_min"][s] = tau.min()
+        acc["tau_hist"][s] = np.histogram(tau, bins=TAU_BINS)[0]
+
+    return acc
+
+
+def _merge(total, part):
+    if total is None:
+        return part
+    for key, value in part.items():
+        total[key] = np.minimum(total[key], value) if key == "tau_min" else total[key] + value
+    return total
+
+
+# -----------------------------------------------------------
+# 3. Public sweep API
+# -----------------------------------------------------------
+
+def weight_sweep(df, n_weights=10_000, chunk_size=256, workers=None, seed=0,
+                 reference_weights=TDI_WEIGHTS[:, 0]):
+    """
+    Runs a weight-sensitivity sweep over a build_all_metrics output.
+
+    df:                DataFrame with year, constructorId, name and *_norm columns,
+                       or a SharedMetrics holding them
+    n_weights:         number of weight vectors sampled from the simplex
+    chunk_size:        weight vectors scored per batch (bounds memory)
+    workers:           process count; None or 1 runs in-process
+    seed:              base seed; results do not depend on `workers`
+    reference_weights: baseline weighting ranks are compared against
+                       (default: the compute_TDI weights)
+
+    Returns a dict of DataFrames:
+    - "teams":    per team-season baseline_rank, mean_rank, rank_std,
+                  p_same_rank (share of weightings keeping the baseline rank)
+                  and p_top (share of weightings ranking the team first)
+    - "seasons":  per year tau_mean, tau_std, tau_min, tau_p05 (Kendall tau-a
+                  vs the baseline ranking) and p_leader_holds
+    - "tau_hist": per year counts of tau over TAU_BINS
+    """
+    if isinstance(df, SharedMetrics):
+        # Already year-sorted; tasks get the handle, not the matrix
+        data, starts, X = df.keys(), df.starts, df.block(NORM_COLS)
+        source = df
+    else:
+        order, starts, _ = year_segments(df['year'].to_numpy())
+        data = df.iloc[order].reset_index(drop=True)
+        X = source = data[NORM_COLS].to_numpy(dtype=np.float64)
+    ends = np.r_[starts[1:], len(X)]
+
+    base_scores = X @ np.asarray(reference_weights, dtype=np.float64)
+    base_signs, base_ranks = [], np.empty(len(X), dtype=np.int64)
+    for lo, hi in zip(starts, ends):
+        signs = _pair_signs(base_scores[lo:hi, None])[:, :, 0]
+        base_signs.append(signs)
+        base_ranks[lo:hi] = 1 + (signs < 0).sum(axis=1)
+
+    sizes = [chunk_size] * (n_weights // chunk_size)
+    if n_weights % chunk_size:
+        sizes.append(n_weights % chunk_size)
+    seeds = np.random.SeedSequence(seed).spawn(len(sizes))
+    jobs = [(source, starts, base_signs, base_ranks, sq, n) for sq, n in zip(seeds, sizes)]
+
+    acc = None
+    if workers is None or workers <= 1:
+        for job in jobs:
+            acc = _merge(acc, _sweep_chunk(*job))
+    else:
+        with ProcessPoolExecutor(max_workers=workers) as pool:
+            for part in pool.map(_sweep_chunk, *zip(*jobs)):
+                acc = _merge(acc, part)
+
+    n = acc["n"]
+    mean_rank = acc["rank_sum"] / n
+    teams = data[['year', 'constructorId', 'name']].assign(
+        baseline_rank=base_ranks,
+        mean_rank=mean_rank,
+        rank_std=np.sqrt(np.maximum(acc["rank_sq"] / n - mean_rank ** 2, 0)),
+        p_same_rank=acc["same_rank"] / n,
+        p_top=acc["top"] / n,
+    )
+
+    tau_mean = acc["tau_sum"] / n
+    cdf = np.cumsum(acc["tau_hist"], axis=1) / n
+    leader = teams[teams['baseline_rank'] == 1].groupby('year')['p_top'].max()
+    seasons = pd.DataFrame({
+        'year': data['year'].to_numpy()[starts],
+        'teams': ends - starts,
+        'tau_mean': tau_mean,
+        'tau_std': np.sqrt(np.maximum(acc["tau_sq"] / n - tau_mean ** 2, 0)),
+        'tau_min': acc["tau_min"],
+        'tau_p05': TAU_BINS[1:][np.argmax(cdf >= 0.05, axis=1)],
+    })
+    seasons['p_leader_holds'] = seasons['year'].map(leader).fillna(0).to_numpy()
+
+    bins = [f"{lo:.2f}..{hi:.2f}" for lo, hi in zip(TAU_BINS[:-1], TAU_BINS[1:])]
+    tau_hist = pd.DataFrame(acc["tau_hist"].astype(np.int64), columns=bins)
+    tau_hist.insert(0, 'year', seasons['year'])
+
+    return {"teams": teams, "seasons": seasons, "tau_hist": tau_hist}
+
+
+def team_top_rank_summary(sweep_teams):
+    """
+    Collapses the per team-season sweep table to one row per constructor:
+    expected number of seasons ranked first across all sampled weightings.
+    """
+    return (
+        sweep_teams.groupby(['constructorId', 'name'], as_index=False)
+        .agg(expected_titles=('p_top', 'sum'), seasons=('year', 'nunique'))
+        .sort_values('expected_titles', ascending=False)
+        .reset_index(drop=True)
+    )
@@ -0,0 +1,193 @@
+"""
+tdi_client.py
+-------------------
+Client and load generator for tdi_service.
+
+This file:
+- TDIClient: one keep-alive HTTP/1.1 connection, GET -> (status,
+  headers, decoded JSON), with optional If-None-Match
+- load_test: many concurrent clients cycling through a mix of queries,
+  reporting requests per second, latency percentiles and status counts
+
+Stdlib only (asyncio streams), so it can run next to the service on
+the same machine.
+
+Usage:
+    python src/tdi_client.py --port 8765 --requests 20000 --concurrency 32
+    python src/tdi_client.py --port 8765 --get /top/2023?n=3
+"""
+
+import argparse
+import asyncio
+import json
+import sys
+import time
+from collections import Counter
+
+from tdi_service import DEFAULT_HOST, DEFAULT_PORT
+
+# Query mix for the load test: the dashboards' usual questions
+DEFAULT_PATHS = [
+    "/top/2023?n=5", "/top/1988?n=3", "/top/2014", "/team/ferrari", "/team/Red%20Bull?start=2010&end=2013",
+    "/team/mclaren", "/seasons/top?n=10", "/decades", "/dominance", "/teams/average?min_seasons=5",
+]
+
+# -----------------------------------------------------------
+# 1. Client
+# -----------------------------------------------------------
+
+class TDIClient:
+    """One persistent connection to the service."""
+
+    def __init__(self, host=DEFAULT_HOST, port=DEFAULT_PORT):
+        self.host, self.port = host, port
+        self.reader = self.writer = None
+
+    async def connect(self):
+        self.reader, self.writer = await asyncio.open_connection(self.host, self.port)
+        return self
+
+    async def close(self):
+        if self.writer is not None:
+            self.writer.close()
+            await self.writer.wait_closed()
+            self.reader = self.writer = None
+
+    async def __aenter__(self):
+        return await self.connect()
+
+    async def __aexit__(self, *exc):
+        await self.close()
+
+    async def get_raw(self, path, etag=None):
+        """Returns (status, headers, body bytes); reconnects once if the server closed the socket."""
+        reused = self.writer is not None
+        if not reused:
+            await self.connect()
+        try:
+            return await self._exchange(path, etag)
+        except (asyncio.IncompleteReadError, ConnectionError):
+            if not reused:
+                raise
+        # The server dropped the idle keep-alive connection; GET is safe to resend
+        await self._drop()
+        await self.connect()
+        return await self._exchange(path, etag)
+
+    async def _drop(self):
+        try:
+            await self.close()
+        except ConnectionError:
+            self.reader = self.writer = None
+
+    async def _exchange(self, path, etag):
+        request = f"GET {path} HTTP/1.1\r\nHost: {self.host}\r\n"
+        if etag:
+            request += f"If-None-Match: {etag}\r\n"
+        self.writer.write((request + "\r\n").encode())
+        await self.writer.drain()
+
+        head = await self.reader.readuntil(b"\r\n\r\n")
+        lines = head.decode("latin-1").split("\r\n")
+        status = int(lines[0].split(" ", 2)[1])
+        headers = {}
+        for line in lines[1:]:
+            name, sep, value = line.partition(":")
+            if sep:
+                headers[name.strip().lower()] = value.strip()
+        body = await self.reader.readexactly(int(headers.get("content-length", 0)))
+        if headers.get("connection", "").lower() == "close":
+            await self.close()
+        return status, headers, body
+
+    async def get(self, path, etag=None):
+        """Returns (status, headers, decoded JSON or None for 304)."""
+        status, headers, body = await self.get_raw(path, etag)
+        return status, headers, json.loads(body) if body else None
+
+
+# -----------------------------------------------------------
+# 2. Load test
+# -----------------------------------------------------------
+
+async def load_test(host=DEFAULT_HOST, port=DEFAULT_PORT, paths=DEFAULT_PATHS,
+                    requests=20_000, concurrency=32, revalidate=False):
+    """
+    Sends `requests` GETs over `concurrency` keep-alive connections,
+    cycling through `paths`. With revalidate=True every request carries
+    the ETag of the previous answer (exercises the 304 path).
+    Returns a dict with rps, latency percentiles (ms) and status counts.
+    """
+    latencies, statuses = [], Counter()
+    per_client = [requests // concurrency + (i < requests % concurrency) for i in range(concurrency)]
+
+    async def worker(i, count):
+        etags = {}
+        async with TDIClient(host, port) as client:
+            for k in range(count):
+                path = paths[(i + k) % len(paths)]
+                start = time.perf_counter()
+                status, headers, _ = await client.get_raw(path, etags.get(path) if revalidate else None)
+                latencies.append(time.perf_counter() - start)
+                statuses[status] += 1
+                if "etag" in headers:
+                    etags[path] = headers["etag"]
+
+    start = time.perf_counter()
+    await asyncio.gather(*(worker(i, n) for i, n in enumerate(per_client) if n))
+    elapsed = time.perf_counter() - start
+
+    latencies.sort()
+
+    def pct(q):
+        return latencies[min(len(latencies) - 1, int(q * len(latencies)))] * 1e3 if latencies else float("nan")
+
+    return {
+        "requests": len(latencies),
+        "seconds": elapsed,
+        "rps": len(latencies) / elapsed if elapsed else float("nan"),
+        "p50_ms": pct(0.50),
+        "p95_ms": pct(0.95),
+        "p99_ms": pct(0.99),
+        "statuses": dict(statuses),
+    }
+
+
+# -----------------------------------------------------------
+# 3. Script mode
+# -----------------------------------------------------------
+
+def main(argv=None):
+    parser = argparse.ArgumentParser(description="Query or load-test the TDI service.")
+    parser.add_argument("--host", default=DEFAULT_HOST)
+    parser.add_argument("--port", type=int, default=DEFAULT_PORT)
+    parser.add_argument("--get", metavar="PATH", help="send one request and print the JSON answer")
+    parser.add_argument("--requests", type=int, default=20_000)
+    parser.add_argument("--concurrency", type=int, default=32)
+    parser.add_argument("--revalidate", action="store_true", help="send If-None-Match with known ETags")
+    parser.add_argument("--min-rps", type=float, default=None, help="exit 1 below this throughput")
+    args = parser.parse_args(argv)
+
+    if args.get:
+        async def one():
+            async with TDIClient(args.host, args.port) as client:
+                return await client.get(args.get)
+        status, headers, payload = asyncio.run(one())
+        print(f"{status} ETag: {headers.get('etag')}")
+        print(json.dumps(payload, indent=2))
+        return 0 if status == 200 else 1
+
+    result = asyncio.run(load_test(args.host, args.port, requests=args.requests,
+                                   concurrency=args.concurrency, revalidate=args.revalidate))
+    print(f"📈 {result['requests']} requests in {result['seconds']:.2f}s → {result['rps']:,.0f} req/s")
+    print(f"   latency p50 {result['p50_ms']:.2f} ms, p95 {result['p95_ms']:.2f} ms, "
+          f"p99 {result['p99_ms']:.2f} ms")
+    print(f"   statuses {result['statuses']}")
+    if args.min_rps is not None and result["rps"] < args.min_rps:
+        print(f"❌ Below {args.min_rps:,.0f} req/s")
+        return 1
+    return 0
+
+
+if __name__ == "__main__":
+    sys.exit(main())
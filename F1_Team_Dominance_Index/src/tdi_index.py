@@ -0,0 +1,125 @@
+"""
+tdi_index.py
+-------------------
+Indexed, read-only view of the final TDI table (final_team_tdi.csv) for
+plotting and querying.
+
+This file:
+- Sorts the table once by (year, TDI desc) so every season is a
+  pre-ranked contiguous slice
+- Sorts a second copy by (name, year) so every team's time series is a
+  contiguous slice
+- Caches derived tables (team mean TDI ranking, name x year pivots)
+
+Build it once and pass it to the visualize_utils plots; they accept either
+a DataFrame or a TDIIndex.
+"""
+
+import os
+
+import numpy as np
+import pandas as pd
+
+
+class TDIIndex:
+    """
+    Year-partitioned, pre-ranked access to a TDI results table.
+    Slices returned by the accessors share memory with the index; copy
+    them before modifying.
+    """
+
+    def __init__(self, df, score="TDI"):
+        self.score = score
+        ranked = df.sort_values(["year", score], ascending=[True, False], kind="stable")
+        self.frame = ranked.reset_index(drop=True)
+
+        years = self.frame["year"].to_numpy()
+        starts = np.flatnonzero(np.r_[True, years[1:] != years[:-1]]) if len(years) else np.array([], int)
+        ends = np.r_[starts[1:], len(years)]
+        self._years = {int(years[s]): (int(s), int(e)) for s, e in zip(starts, ends)}
+
+        by_team = self.frame.sort_values(["name", "year"], kind="stable").reset_index(drop=True)
+        names = by_team["name"].to_numpy()
+        t_starts = np.flatnonzero(np.r_[True, names[1:] != names[:-1]]) if len(names) else np.array([], int)
+        t_ends = np.r_[t_starts[1:], len(names)]
+        self._by_team = by_team
+        self._teams = {names[s]: (int(s), int(e)) for s, e in zip(t_starts, t_ends)}
+
+        self._cache = {}
+
+    # ------------------------ build ------------------------
+
+    @classmethod
+    def from_csv(cls, path, score="TDI"):
+        if not os.path.exists(path):
+            raise FileNotFoundError(f"File not found: {path}")
+        return cls(pd.read_csv(path), score=score)
+
+    @classmethod
+    def of(cls, data):
+        """Returns `data` if it already is a TDIIndex, else indexes the DataFrame."""
+        return data if isinstance(data, cls) else cls(data)
+
+    # ----------------------- seasons -----------------------
+
+    @property
+    def years(self):
+        return list(self._years)
+
+    def year(self, year):
+        """All teams of a season, ranked by score (highest first)."""
+        start, stop = self._years.get(int(year), (0, 0))
+        return self.frame.iloc[start:stop]
+
+    def top(self, year, n=10):
+        """Top-n teams of a season."""
+        start, stop = self._years.get(int(year), (0, 0))
+        return self.frame.iloc[start:min(stop, start + n)]
+
+    def window(self, first_year, last_year):
+        """All rows with first_year <= year <= last_year (a contiguous slice)."""
+        years = self.frame["year"].to_numpy()
+        start = np.searchsorted(years, first_year, side="left")
+        stop = np.searchsorted(years, last_year, side="right")
+        return self.frame.iloc[start:stop]
+
+    # ------------------------ teams ------------------------
+
+    @property
+    def team_names(self):
+        return list(self._teams)
+
+    def team(self, name):
+        """One team's seasons in year order."""
+        start, stop = self._teams.get(name, (0, 0))
+        return self._by_team.iloc[start:stop]
+
+    def teams(self, names):
+        """Several teams' seasons, grouped by team and in year order."""
+        parts = [self.team(name) for name in names if name in self._teams]
+        return pd.concat(parts) if parts else self._by_team.iloc[0:0]
+
+    # ----------------------- derived -----------------------
+
+    def mean_score(self):
+        """Mean score per team, highest first (cached)."""
+        if "mean" not in self._cache:
+            self._cache["mean"] = (
+                self._by_team.groupby("name", sort=False)[self.score]
+                .mean()
+                .sort_values(ascending=False)
+            )
+        return self._cache["mean"]
+
+    def pivot(self, values=None):
+        """name x year pivot of `values` (default: the score column), cached."""
+        values = values or self.score
+        key = ("pivot", values)
+        if key not in self._cache:
+            self._cache[key] = self.frame.pivot_table(
+                values=values, index="name", columns="year", aggfunc="mean"
+            )
+        return self._cache[key]
+
+    def __repr__(self):
+        return f"TDIIndex(rows={len(self.frame)}, years={len(self._years)}, teams={len(self._teams)})"
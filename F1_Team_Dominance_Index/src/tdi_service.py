@@ -0,0 +1,300 @@
+"""
+tdi_service.py
+-------------------
+Local HTTP/JSON query service for the published TDI results.
+
+This file:
+- Loads the results store (results_store, output/tdi.db) once into
+  in-memory lookup tables: seasons by year, teams by name / id, the
+  all-time top seasons and the decade / dominance summaries
+- Serves GET requests on an asyncio stream server (HTTP/1.1 keep-alive,
+  stdlib only, no framework)
+- Caches encoded responses in an LRU keyed by dataset version and path
+- Sends an ETag tied to the dataset version and answers If-None-Match
+  with 304
+- Polls the database and, when the pipeline publishes a new run, builds
+  the new tables off the event loop and swaps them in with a single
+  assignment; in-flight requests keep the snapshot they started with
+
+Endpoints:
+    GET /health
+    GET /top/<year>?n=10           top teams of a season
+    GET /team/<name or id>?start=&end=
+    GET /seasons/top?n=10          most dominant seasons of all time
+    GET /decades
+    GET /dominance
+    GET /teams/average?min_seasons=1
+
+Usage:
+    python src/tdi_service.py [--host 127.0.0.1] [--port 8765] [--db output/tdi.db]
+    python src/tdi_client.py --port 8765 --requests 20000   (load test)
+"""
+
+import argparse
+import asyncio
+import json
+import logging
+import os
+import sys
+from collections import OrderedDict
+from urllib.parse import parse_qs, unquote, urlsplit
+
+import results_store
+
+DEFAULT_HOST = "127.0.0.1"
+DEFAULT_PORT = 8765
+CACHE_SIZE = 2048
+POLL_INTERVAL = 1.0
+
+_REASONS = {200: "OK", 304: "Not Modified", 400: "Bad Request", 404: "Not Found",
+            405: "Method Not Allowed", 503: "Service Unavailable"}
+
+# -----------------------------------------------------------
+# 1. Snapshot of the published results
+# -----------------------------------------------------------
+
+class Snapshot:
+    """Read-only lookup tables for one dataset version."""
+
+    def __init__(self, db_path):
+        with results_store.ResultsStore(db_path, readonly=True) as store:
+            self.version = store.dataset_version()
+            seasons = store.query("SELECT year, constructorId, name, TDI, TDI_normalized, TDI_rank "
+                                  "FROM team_seasons ORDER BY year, TDI_rank, TDI DESC")
+            self.top_seasons = store.top_seasons(n=len(seasons))
+            self.decades = store.decades()
+            self.dominance = store.dominance()
+            self.averages = store.average_by_team()
+
+        # Rows arrive in year order, so every team list is sorted by year
+        self.by_year, self.by_id, self.by_name = {}, {}, {}
+        for row in seasons:
+            public = {k: row[k] for k in ("year", "name", "TDI", "TDI_normalized", "TDI_rank")}
+            self.by_year.setdefault(row["year"], []).append(public)
+            self.by_id.setdefault(row["constructorId"], []).append(public)
+            if row["name"]:
+                self.by_name.setdefault(row["name"].lower(), []).append(public)
+
+    def __repr__(self):
+        return f"Snapshot(version={self.version}, years={len(self.by_year)}, teams={len(self.by_id)})"
+
+
+def _int_param(params, name, default, lo=None):
+    values = params.get(name)
+    if not values:
+        return default
+    value = int(values[0])
+    if lo is not None and value < lo:
+        raise ValueError(f"{name} must be >= {lo}")
+    return value
+
+
+def answer(snapshot, path, params):
+    """(status, payload) for one GET request against a snapshot."""
+    parts = [unquote(p) for p in path.strip("/").split("/") if p]
+    try:
+        if parts == ["health"]:
+            return 200, {"status": "ok", "version": snapshot.version}
+        if len(parts) == 2 and parts[0] == "top":
+            year = int(parts[1])
+            if year not in snapshot.by_year:
+                return 404, {"error": f"No results for {year}"}
+            return 200, snapshot.by_year[year][:_int_param(params, "n", 10, lo=1)]
+        if len(parts) == 2 and parts[0] == "team":
+            rows = snapshot.by_id.get(parts[1]) or snapshot.by_name.get(parts[1].lower())
+            if rows is None:
+                return 404, {"error": f"Unknown team '{parts[1]}'"}
+            start = _int_param(params, "start", None)
+            end = _int_param(params, "end", None)
+            return 200, [r for r in rows if (start is None or r["year"] >= start)
+                         and (end is None or r["year"] <= end)]
+        if parts == ["seasons", "top"]:
+            return 200, snapshot.top_seasons[:_int_param(params, "n", 10, lo=1)]
+        if parts == ["decades"]:
+            return 200, snapshot.decades
+        if parts == ["dominance"]:
+            return 200, snapshot.dominance
+        if parts == ["teams", "average"]:
+            min_seasons = _int_param(params, "min_seasons", 1)
+            return 200, [r for r in snapshot.averages if r["seasons"] >= min_seasons]
+    except ValueError as e:
+        return 400, {"error": f"Bad request: {e}"}
+    return 404, {"error": f"No such endpoint: {path}"}
+
+
+# -----------------------------------------------------------
+# 2. Service: response cache, reloads, HTTP handling
+# -----------------------------------------------------------
+
+class TDIService:
+    """Serves one results database; reloads when a new version is published."""
+
+    def __init__(self, db_path=results_store.RESULTS_DB, cache_size=CACHE_SIZE,
+                 poll_interval=POLL_INTERVAL):
+        self.db_path = db_path
+        self.cache_size = cache_size
+        self.poll_interval = poll_interval
+        self.snapshot = Snapshot(db_path)
+        self._signature = self._file_signature()
+        self._cache = OrderedDict()                       # (version, target) -> (status, body)
+        self.stats = {"requests": 0, "cache_hits": 0, "not_modified": 0, "reloads": 0}
+
+    # ----------------------- data -----------------------
+
+    def _file_signature(self):
+        # The WAL file changes on every commit, the main file on checkpoints
+        sig = []
+        for path in (self.db_path, self.db_path + "-wal"):
+            try:
+                stat = os.stat(path)
+                sig.append((stat.st_size, stat.st_mtime_ns))
+            except OSError:
+                sig.append(None)
+        return tuple(sig)
+
+    async def reload_if_changed(self):
+        """Swaps in a new snapshot when the database holds a new dataset version."""
+        signature = self._file_signature()
+        if signature == self._signature:
+            return False
+        self._signature = signature
+        try:
+            snapshot = await asyncio.to_thread(Snapshot, self.db_path)
+        except (OSError, RuntimeError, results_store.sqlite3.Error) as e:
+            logging.warning(f"⚠️ Reload skipped, database not readable: {e}")
+            return False
+        if snapshot.version == self.snapshot.version:
+            return False
+        self.snapshot = snapshot                           # atomic swap
+        self._cache.clear()
+        self.stats["reloads"] += 1
+        logging.info(f"🔄 Reloaded results (version {snapshot.version})")
+        return True
+
+    async def _watch(self):
+        while True:
+            await asyncio.sleep(self.poll_interval)
+            await self.reload_if_changed()
+
+    def respond(self, target):
+        """(status, body bytes, etag) for a request target, from the LRU cache when possible."""
+        snapshot = self.snapshot
+        key = (snapshot.version, target)
+        cached = self._cache.get(key)
+        if cached is not None:
+            self._cache.move_to_end(key)
+            self.stats["cache_hits"] += 1
+            return cached
+
+        url = urlsplit(target)
+        status, payload = answer(snapshot, url.path, parse_qs(url.query))
+        body = json.dumps(payload, separators=(",", ":")).encode()
+        entry = (status, body, f'"{snapshot.version}"')
+        self._cache[key] = entry
+        if len(self._cache) > self.cache_size:
+            self._cache.popitem(last=False)
+        return entry
+
+    # ----------------------- HTTP -----------------------
+
+    @staticmethod
+    def _response(status, body, etag, keep_alive):
+        head = [f"HTTP/1.1 {status} {_REASONS.get(status, 'OK')}",
+                "Content-Type: application/json",
+                f"Content-Length: {len(body)}",
+                f"Connection: {'keep-alive' if keep_alive else 'close'}"]
+        if etag and status in (200, 304):
+            head.append(f"ETag: {etag}")
+            head.append("Cache-Control: no-cache")
+        return ("\r\n".join(head) + "\r\n\r\n").encode() + body
+
+    async def handle(self, reader, writer):
+        try:
+            while True:
+                try:
+                    raw = await reader.readuntil(b"\r\n\r\n")
+                except (asyncio.IncompleteReadError, asyncio.LimitOverrunError, ConnectionError):
+                    break
+                lines = raw.decode("latin-1").split("\r\n")
+                try:
+                    method, target, version = lines[0].split(" ", 2)
+                except ValueError:
+                    writer.write(self._response(400, b'{"error":"Malformed request line"}', None, False))
+                    break
+                headers = {}
+                for line in lines[1:]:
+                    name, sep, value = line.partition(":")
+                    if sep:
+                        headers[name.strip().lower()] = value.strip()
+                try:
+                    length = int(headers.get("content-length", 0) or 0)
+                    if length < 0:
+                        raise ValueError(length)
+                except ValueError:
+                    writer.write(self._response(400, b'{"error":"Malformed Content-Length"}', None, False))
+                    break
+                if length:
+                    try:
+                        await reader.readexactly(length)
+                    except asyncio.IncompleteReadError:
+                        break
+
+                connection = headers.get("connection", "").lower()
+                keep_alive = connection != "close" if version == "HTTP/1.1" else connection == "keep-alive"
+                self.stats["requests"] += 1
+
+                if method != "GET":
+                    status, body, etag = 405, b'{"error":"Only GET is supported"}', None
+                else:
+                    status, body, etag = self.respond(target)
+                    if status == 200 and headers.get("if-none-match") == etag:
+                        status, body = 304, b""
+                        self.stats["not_modified"] += 1
+                writer.write(self._response(status, body, etag, keep_alive))
+                await writer.drain()
+                if not keep_alive:
+                    break
+        except ConnectionError:
+            pass
+        finally:
+            writer.close()
+
+    async def serve(self, host=DEFAULT_HOST, port=DEFAULT_PORT, ready=None):
+        """Runs the server (and the reload watcher) until cancelled."""
+        server = await asyncio.start_server(self.handle, host, port, backlog=1024)
+        watcher = asyncio.create_task(self._watch())
+        address = server.sockets[0].getsockname()
+        logging.info(f"🚦 Serving TDI results {self.snapshot.version} on http://{address[0]}:{address[1]}")
+        if ready is not None:
+            ready.set_result(address)
+        try:
+            async with server:
+                await server.serve_forever()
+        finally:
+            watcher.cancel()
+
+
+# -----------------------------------------------------------
+# 3. Script mode
+# -----------------------------------------------------------
+
+def main(argv=None):
+    parser = argparse.ArgumentParser(description="Serve the published TDI results over HTTP/JSON.")
+    parser.add_argument("--host", default=DEFAULT_HOST)
+    parser.add_argument("--port", type=int, default=DEFAULT_PORT)
+    parser.add_argument("--db", default=results_store.RESULTS_DB, help="results database")
+    parser.add_argument("--cache-size", type=int, default=CACHE_SIZE)
+    parser.add_argument("--poll", type=float, default=POLL_INTERVAL, help="reload check interval (s)")
+    args = parser.parse_args(argv)
+
+    logging.basicConfig(level=logging.INFO, format="%(levelname)s - %(message)s")
+    service = TDIService(args.db, cache_size=args.cache_size, poll_interval=args.poll)
+    try:
+        asyncio.run(service.serve(args.host, args.port))
+    except KeyboardInterrupt:
+        pass
+    return 0
+
+
+if __name__ == "__main__":
+    sys.exit(main())
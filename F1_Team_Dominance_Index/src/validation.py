@@ -0,0 +1,343 @@
+"""
+validation.py
+-------------------
+Chunked, streaming validation and profiling of f1db tables and processed
+team-season datasets.
+
+This file:
+- Reads a CSV (or slices an in-memory DataFrame) chunk by chunk
+- Counts nulls per column
+- Finds duplicate rows and duplicate keys with 64-bit row hashes kept in
+  a compact seen-set (sorted uint64 runs, 8 bytes per distinct row)
+- Checks declared schemas: missing columns, values that do not parse as
+  the declared type, nulls in non-nullable columns, integer overflow
+- Checks value ranges (e.g. positionNumber >= 1, points >= 0)
+- Returns a structured report (dict) instead of printing
+
+Apart from the seen-set, memory is bounded by the chunk size.
+
+Usage:
+    python src/validation.py [--tables race_results races] [--raw-dir DIR] [--chunksize 100000]
+"""
+
+import argparse
+import os
+import sys
+
+import numpy as np
+import pandas as pd
+
+from dataset_registry import DATASETS, PROCESSED_DIR
+from raw_loader import RAW_DIR, SCHEMAS
+
+DEFAULT_CHUNKSIZE = 100_000
+MAX_EXAMPLES = 5
+
+# -----------------------------------------------------------
+# 1. Rules
+# -----------------------------------------------------------
+# keys:   columns that identify a row (duplicate keys are reported)
+# ranges: column -> (min, max), inclusive, None = unbounded
+
+RULES = {
+    "race_results": {
+        "keys": ["raceId", "positionDisplayOrder"],
+        "ranges": {
+            "year": (1950, None),
+            "round": (1, None),
+            "positionDisplayOrder": (1, None),
+            "positionNumber": (1, None),
+            "laps": (0, None),
+            "points": (0, None),
+            "qualificationPositionNumber": (1, None),
+            "gridPositionNumber": (1, None),
+            "pitStops": (0, None),
+            "timeMillis": (0, None),
+        },
+    },
+    "races": {
+        "keys": ["id"],
+        "ranges": {
+            "year": (1950, None),
+            "round": (1, None),
+            "laps": (0, None),
+            "courseLength": (0, None),
+            "distance": (0, None),
+        },
+    },
+    "constructors": {
+        "keys": ["id"],
+        "ranges": {
+            "totalChampionshipWins": (0, None),
+            "totalRaceEntries": (0, None),
+            "totalRaceWins": (0, None),
+            "totalPodiums": (0, None),
+            "totalPoints": (0, None),
+        },
+    },
+    "constructor_standings": {
+        "keys": ["raceId", "positionDisplayOrder"],
+        "ranges": {"positionNumber": (1, None), "points": (0, None)},
+    },
+    "qualifying": {
+        "keys": ["raceId", "positionDisplayOrder"],
+        "ranges": {"positionNumber": (1, None), "timeMillis": (0, None)},
+    },
+}
+
+_TEAM_SEASON_RULES = {
+    "keys": ["year", "constructorId"],
+    "ranges": {"races": (0, None), "wins": (0, None), "podiums": (0, None), "avg_finish": (1, None)},
+}
+for _name in DATASETS:
+    RULES.setdefault(_name, _TEAM_SEASON_RULES)
+
+# -----------------------------------------------------------
+# 2. Compact seen-set of row hashes
+# -----------------------------------------------------------
+
+class SeenHashes:
+    """
+    Set of uint64 hashes stored as a few sorted, disjoint runs. New runs
+    are merged with the previous one while they are at least half its
+    size, so there are O(log n) runs and each hash is re-sorted
+    O(log n) times.
+    """
+
+    def __init__(self):
+        self.runs = []
+
+    def add(self, hashes):
+        """Adds `hashes`; returns a mask of those already seen (in an earlier batch or earlier in this one)."""
+        hashes = np.asarray(hashes, dtype=np.uint64)
+        uniq, first = np.unique(hashes, return_index=True)
+        dup = np.ones(len(hashes), dtype=bool)
+        dup[first] = False
+
+        seen = np.zeros(len(uniq), dtype=bool)
+        for run in self.runs:
+            pos = np.minimum(np.searchsorted(run, uniq), len(run) - 1)
+            seen |= run[pos] == uniq
+        dup[first[seen]] = True
+
+        self.runs.append(uniq[~seen])
+        while len(self.runs) > 1 and 2 * len(self.runs[-1]) >= len(self.runs[-2]):
+            newer, older = self.runs.pop(), self.runs.pop()
+            self.runs.append(np.sort(np.concatenate([older, newer])))
+        return dup
+
+    def __len__(self):
+        return sum(len(run) for run in self.runs)
+
+    @property
+    def nbytes(self):
+        return sum(run.nbytes for run in self.runs)
+
+
+# -----------------------------------------------------------
+# 3. Streaming validator
+# -----------------------------------------------------------
+
+def _is_nullable(dtype):
+    # pandas extension types (Int16, boolean, string, category) hold nulls;
+    # numpy ints and bool do not
+    return not (dtype.startswith(("int", "uint")) or dtype == "bool")
+
+
+def _as_numeric(series):
+    """(float values, mask of non-null values that failed to parse)."""
+    if pd.api.types.is_numeric_dtype(series) and not pd.api.types.is_bool_dtype(series):
+        values = series.to_numpy(dtype=np.float64, na_value=np.nan)
+        return values, np.zeros(len(values), dtype=bool)
+    try:
+        # Fast path: the whole chunk parses
+        values = series.astype("float64").to_numpy()
+        return values, np.zeros(len(values), dtype=bool)
+    except (TypeError, ValueError):
+        values = pd.to_numeric(series, errors="coerce").to_numpy(dtype=np.float64, na_value=np.nan)
+        return values, series.notna().to_numpy() & np.isnan(values)
+
+
+class StreamValidator:
+    """
+    Folds chunks of one table into running counters. Feed chunks with
+    update() in row order, then call report().
+    """
+
+    def __init__(self, name, dtypes=None, rules=None):
+        self.name = name
+        self.dtypes = dtypes or {}
+        self.rules = rules if rules is not None else RULES.get(name, {"keys": [], "ranges": {}})
+        self.rows = 0
+        self.chunks = 0
+        self.columns = None
+        self.nulls = {}
+        self.row_hashes = SeenHashes()
+        self.key_hashes = SeenHashes()
+        self.duplicate_rows = 0
+        self.duplicate_keys = 0
+        self._errors = {}                                  # (column, check) -> [count, examples]
+
+    def _record(self, column, check, mask, offset):
+        count = int(mask.sum())
+        if not count:
+            return
+        entry = self._errors.setdefault((column, check), [0, []])
+        entry[0] += count
+        if len(entry[1]) < MAX_EXAMPLES:
+            rows = np.flatnonzero(mask)[:MAX_EXAMPLES - len(entry[1])] + offset
+            entry[1].extend(int(r) for r in rows)
+
+    def update(self, chunk):
+        offset, n = self.rows, len(chunk)
+        if self.columns is None:
+            self.columns = list(chunk.columns)
+            self.nulls = dict.fromkeys(self.columns, 0)
+            for column in self.dtypes:
+                if column not in chunk.columns:
+                    self._errors[(column, "missing_column")] = [1, []]
+
+        for column, count in chunk.isna().sum().items():
+            self.nulls[column] = self.nulls.get(column, 0) + int(count)
+
+        # Duplicates (full row, as drop_duplicates, and declared key)
+        dup = self.row_hashes.add(pd.util.hash_pandas_object(chunk, index=False).to_numpy())
+        self.duplicate_rows += int(dup.sum())
+        self._record(None, "duplicate_row", dup, offset)
+        keys = [k for k in self.rules.get("keys", []) if k in chunk.columns]
+        if keys:
+            dup = self.key_hashes.add(pd.util.hash_pandas_object(chunk[keys], index=False).to_numpy())
+            self.duplicate_keys += int(dup.sum())
+            self._record(tuple(keys), "duplicate_key", dup, offset)
+
+        # Declared types
+        numeric = {}
+        for column, dtype in self.dtypes.items():
+            if column not in chunk.columns:
+                continue
+            series = chunk[column]
+            if not _is_nullable(dtype):
+                self._record(column, "null", series.isna().to_numpy(), offset)
+
+            kind = dtype.lower()
+            if kind.startswith(("int", "uint", "float")):
+                values, bad = _as_numeric(series)
+                numeric[column] = values
+                self._record(column, "type", bad, offset)
+                if kind.startswith(("int", "uint")):
+                    finite = ~np.isnan(values)
+                    self._record(column, "type", finite & (values % 1 != 0), offset)
+                    info = np.iinfo(kind)
+                    self._record(column, "overflow", finite & ((values < info.min) | (values > info.max)), offset)
+            elif kind in ("bool", "boolean") and not pd.api.types.is_bool_dtype(series):
+                text = series.astype("string").str.lower()
+                self._record(column, "type", (series.notna() & ~text.isin(["true", "false"])).to_numpy(), offset)
+
+        # Ranges
+        for column, (lo, hi) in self.rules.get("ranges", {}).items():
+            if column not in chunk.columns:
+                continue
+            values = numeric.get(column)
+            if values is None:
+                values, _ = _as_numeric(chunk[column])
+            with np.errstate(invalid="ignore"):
+                if lo is not None:
+                    self._record(column, "min", values < lo, offset)
+                if hi is not None:
+                    self._record(column, "max", values > hi, offset)
+
+        self.rows += n
+        self.chunks += 1
+
+    def report(self):
+        """
+        {"table", "rows", "chunks", "columns", "nulls", "duplicate_rows",
+         "duplicate_keys", "errors": [{"column", "check", "count",
+         "example_rows"}], "ok"} -- example rows are 0-based data rows.
+        """
+        errors = [
+            {"column": list(col) if isinstance(col, tuple) else col, "check": check,
+             "count": count, "example_rows": examples}
+            for (col, check), (count, examples) in self._errors.items()
+        ]
+        limits = {r: f"{lo if lo is not None else ''}..{hi if hi is not None else ''}"
+                  for r, (lo, hi) in self.rules.get("ranges", {}).items()}
+        for e in errors:
+            if e["check"] in ("min", "max"):
+                e["expected"] = limits[e["column"]]
+        return {
+            "table": self.name,
+            "rows": self.rows,
+            "chunks": self.chunks,
+            "columns": self.columns or [],
+            "nulls": {c: n for c, n in self.nulls.items() if n},
+            "duplicate_rows": self.duplicate_rows,
+            "duplicate_keys": self.duplicate_keys,
+            "errors": errors,
+            "ok": not errors,
+        }
+
+
+# -----------------------------------------------------------
+# 4. Public API
+# -----------------------------------------------------------
+
+def _table_spec(name, raw_dir, processed_dir):
+    if name in SCHEMAS:
+        return os.path.join(raw_dir, SCHEMAS[name]["file"]), SCHEMAS[name]["dtypes"]
+    if name in DATASETS:
+        return os.path.join(processed_dir, DATASETS[name]["file"]), DATASETS[name]["dtypes"]
+    raise KeyError(f"Unknown table '{name}'. Known tables: {sorted(SCHEMAS) + sorted(DATASETS)}")
+
+
+def validate_csv(path, name, dtypes=None, rules=None, chunksize=DEFAULT_CHUNKSIZE):
+    """Streams a CSV through a StreamValidator and returns its report."""
+    if not os.path.exists(path):
+        raise FileNotFoundError(f"File not found: {path}")
+    validator = StreamValidator(name, dtypes, rules)
+    # Raw text, so unparsable values are counted instead of aborting the read
+    for chunk in pd.read_csv(path, dtype=str, keep_default_na=False, na_values=[""], chunksize=chunksize):
+        validator.update(chunk)
+    report = validator.report()
+    report["path"] = os.path.abspath(path)
+    return report
+
+
+def validate_table(name, raw_dir=RAW_DIR, processed_dir=PROCESSED_DIR, chunksize=DEFAULT_CHUNKSIZE):
+    """Validates a raw f1db table (raw_loader.SCHEMAS) or a processed dataset by name."""
+    path, dtypes = _table_spec(name, raw_dir, processed_dir)
+    return validate_csv(path, name, dtypes, chunksize=chunksize)
+
+
+def validate_frame(df, name, dtypes=None, rules=None, chunksize=DEFAULT_CHUNKSIZE):
+    """Runs the same checks over an in-memory DataFrame, slice by slice."""
+    validator = StreamValidator(name, dtypes, rules)
+    for start in range(0, len(df), chunksize):
+        validator.update(df.iloc[start:start + chunksize])
+    return validator.report()
+
+
+def format_report(report):
+    """Human-readable multi-line summary of a report."""
+    status = "✅" if report["ok"] else "❌"
+    lines = [f"{status} {report['table']}: {report['rows']:,} rows in {report['chunks']} chunk(s), "
+             f"{report['duplicate_rows']} duplicate rows, {report['duplicate_keys']} duplicate keys"]
+    for e in report["errors"]:
+        extra = f" (expected {e['expected']})" if "expected" in e else ""
+        lines.append(f"   {e['check']:<14} {str(e['column']):<28} {e['count']:>8}{extra}"
+                     f"  rows {e['example_rows']}")
+    return "\n".join(lines)
+
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser(description="Streaming validation of f1db tables.")
+    parser.add_argument("--tables", nargs="+", default=list(SCHEMAS))
+    parser.add_argument("--raw-dir", default=RAW_DIR)
+    parser.add_argument("--processed-dir", default=PROCESSED_DIR)
+    parser.add_argument("--chunksize", type=int, default=DEFAULT_CHUNKSIZE)
+    args = parser.parse_args()
+
+    reports = [validate_table(t, args.raw_dir, args.processed_dir, args.chunksize) for t in args.tables]
+    for report in reports:
+        print(format_report(report))
+    sys.exit(0 if all(r["ok"] for r in reports) else 1)
@@ -2,16 +2,52 @@
 visualize_utils.py
 -------------------
 Visualization utilities for Final Team Dominance Index dataset.
+
+Every plot accepts either the final TDI DataFrame or a TDIIndex built from
+it. Build the index once (load_index) when drawing many plots, so seasons,
+team series and pivots are looked up instead of re-scanned per plot.
 """
 
 import os
-import pandas as pd
-import matplotlib.pyplot as plt
-import seaborn as sns
 
-sns.set(style="whitegrid")
+from tdi_index import TDIIndex
+
+plt = None
+sns = None
+
+
+# ---------------------------------------------------------
+# Load the plotting stack on first use (keeps imports cheap)
+# ---------------------------------------------------------
+def _plotting():
+    global plt, sns
+    if plt is None:
+        import matplotlib.pyplot as _plt
+        import seaborn as _sns
+
+        _sns.set(style="whitegrid")
+        plt, sns = _plt, _sns
+    return plt, sns
 
 
+# ---------------------------------------------------------
+# Show the current figure, or save it when a path is given
+# (a list of paths saves one file per format, e.g. .png + .svg)
+# ---------------------------------------------------------
+def _finish(save_path=None):
+    plt, _ = _plotting()
+    plt.tight_layout()
+    if save_path is None:
+        plt.show()
+        return None
+
+    paths = [save_path] if isinstance(save_path, str) else list(save_path)
+    for path in paths:
+        os.makedirs(os.path.dirname(path) or ".", exist_ok=True)
+        plt.savefig(path)
+    plt.close()
+    return save_path
+
 # ---------------------------------------------------------
 # Load CSV
 # ---------------------------------------------------------
@@ -19,87 +55,78 @@ def load_csv(path):
     if not os.path.exists(path):
         raise FileNotFoundError(f"File not found: {path}")
 
+    import pandas as pd
+
     df = pd.read_csv(path)
     print(f"Loaded: {path} → {df.shape[0]} rows, {df.shape[1]} columns")
     return df
 
 
+def load_index(path):
+    return TDIIndex(load_csv(path))
+
+
 # ---------------------------------------------------------
 # Plot 1: Top N teams for a given year
 # ---------------------------------------------------------
-def plot_top_teams_by_year(df, year, top_n=10):
-    df_year = df[df["year"] == year].sort_values("TDI", ascending=False).head(top_n)
+def plot_top_teams_by_year(df, year, top_n=10, save_path=None):
+    plt, sns = _plotting()
+    df_year = TDIIndex.of(df).top(year, top_n)
 
     plt.figure(figsize=(10, 6))
     sns.barplot(data=df_year, x="TDI", y="name")
     plt.title(f"Top {top_n} Teams by TDI in {year}")
-    plt.tight_layout()
-    plt.show()
+    return _finish(save_path)
 
 
 # ---------------------------------------------------------
 # Plot 2: Team trends
 # ---------------------------------------------------------
-def plot_team_trends(df, teams):
-    df_teams = df[df["name"].isin(teams)]
+def plot_team_trends(df, teams, save_path=None):
+    plt, sns = _plotting()
+    df_teams = TDIIndex.of(df).teams(teams)
 
     plt.figure(figsize=(12, 6))
     sns.lineplot(data=df_teams, x="year", y="TDI", hue="name", marker="o")
     plt.title("TDI Trends Over Years")
-    plt.tight_layout()
-    plt.show()
+    return _finish(save_path)
 
 
 # ---------------------------------------------------------
 # Plot 3: TDI vs TDI_normalized
 # ---------------------------------------------------------
-def plot_tdi_vs_normalized(df):
+def plot_tdi_vs_normalized(df, save_path=None):
+    plt, sns = _plotting()
     plt.figure(figsize=(10, 6))
-    sns.scatterplot(data=df, x="TDI", y="TDI_normalized", alpha=0.7)
+    sns.scatterplot(data=TDIIndex.of(df).frame, x="TDI", y="TDI_normalized", alpha=0.7)
     plt.title("TDI vs Normalized TDI")
-    plt.tight_layout()
-    plt.show()
+    return _finish(save_path)
 
 
 
 # ---------------------------------------------------------
 # Plot 4: Heatmap of dominance (Top N teams)
 # ---------------------------------------------------------
-def plot_tdi_heatmap(df, top_n=10):
-    top_teams = (
-        df.groupby("name")["TDI"]
-        .mean()
-        .sort_values(ascending=False)
-        .head(top_n)
-        .index
-    )
+def plot_tdi_heatmap(df, top_n=10, save_path=None):
+    plt, sns = _plotting()
+    index = TDIIndex.of(df)
+    top_teams = index.mean_score().head(top_n).index
 
-    df_top = df[df["name"].isin(top_teams)]
-
-    pivot = df_top.pivot_table(
-        values="TDI",
-        index="name",
-        columns="year",
-        aggfunc="mean"
-    )
+    pivot = index.pivot("TDI").loc[sorted(top_teams)].dropna(axis=1, how="all")
 
     plt.figure(figsize=(16, 6))
     sns.heatmap(pivot, cmap="viridis")
     plt.title(f"Top {top_n} Team Dominance Heatmap (TDI)")
-    plt.tight_layout()
-    plt.show()
+    return _finish(save_path)
 
 
 
 # ---------------------------------------------------------
 # Plot 5: Dominance share pie chart for a given season
 # ---------------------------------------------------------
-def plot_dominance_pie(df, year, top_n=5):
-    df_year = (
-        df[df["year"] == year]
-        .sort_values("TDI", ascending=False)
-        .head(top_n)
-    )
+def plot_dominance_pie(df, year, top_n=5, save_path=None):
+    plt, sns = _plotting()
+    df_year = TDIIndex.of(df).top(year, top_n)
 
     plt.figure(figsize=(8, 8))
     plt.pie(
@@ -109,23 +136,22 @@ def plot_dominance_pie(df, year, top_n=5):
         startangle=140
     )
     plt.title(f"Dominance Share ({year}) – Top {top_n} Teams")
-    plt.tight_layout()
-    plt.show()
+    return _finish(save_path)
 
 # ---------------------------------------------------------
 # Plot 6: Dominance trends for LAST 10 YEARS only (WITH LEGEND)
 # ---------------------------------------------------------
-def plot_last_10_years_dominance(df):
-    last_year = df["year"].max()
+def plot_last_10_years_dominance(df, save_path=None):
+    plt, sns = _plotting()
+    index = TDIIndex.of(df)
+    last_year = index.years[-1]
     start_year = last_year - 9 
 
-    df_last10 = df[df["year"].between(start_year, last_year)]
+    df_last10 = index.window(start_year, last_year)
 
     plt.figure(figsize=(16, 7))
 
-    for team in df_last10["name"].unique():
-        subset = df_last10[df_last10["name"] == team]
-
+    for team, subset in df_last10.groupby("name", sort=False):
         if len(subset) > 0:
             plt.plot(
                 subset["year"],
@@ -148,8 +174,7 @@ def plot_last_10_years_dominance(df):
         fontsize=9
     )
 
-    plt.tight_layout()
-    plt.show()
+    return _finish(save_path)
 
 
 
@@ -162,7 +187,7 @@ if __name__ == "__main__":
     csv_path = os.path.join(base_dir, "../output/results/final_team_tdi.csv")
 
     try:
-        df = load_csv(csv_path)
+        df = load_index(csv_path)
 
         # Plot 1
         plot_top_teams_by_year(df, year=2022)
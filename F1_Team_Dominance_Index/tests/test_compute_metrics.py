@@ -0,0 +1,23 @@
+import numpy as np
+import pandas as pd
+
+from compute_metrics import build_all_metrics, build_all_metrics_fused
+
+SUMMARY = pd.DataFrame({
+    "year": [2001, 2000, 2000, 2000, 2001],
+    "constructorId": ["alpha", "alpha", "beta", "gamma", "beta"],
+    "name": ["Alpha", "Alpha", "Beta", "Gamma", "Beta"],
+    "total_races": [3, 2, 2, 2, 3],
+    "wins": [2, 1, 1, 0, 1],
+    "podiums": [3, 2, 2, 1, 2],
+    "one_two_finishes": [1, 1, 0, 0, 0],
+    "points": [40.0, 26.0, np.nan, 6.0, 20.0],
+})
+
+
+def test_fused_matches_reference_with_missing_points():
+    # A missing points value affects only its own row, not the whole season
+    expected = build_all_metrics(SUMMARY.copy())
+    fused = build_all_metrics_fused(SUMMARY.copy())
+    pd.testing.assert_frame_equal(fused, expected[fused.columns], check_dtype=False)
+    assert fused.loc[1, "points_share"] == 26 / 32
@@ -0,0 +1,21 @@
+import pandas as pd
+import pytest
+
+from data_preprocessing import load_processed_data
+from dataset_registry import registry_for
+
+
+def test_load_processed_data_reads_on_lookup(tmp_path):
+    for name in ("team_year_summary", "extra"):
+        pd.DataFrame({"year": [2000], "constructorId": ["alpha"], "name": ["Alpha"],
+                      "races": [1], "wins": [1], "podiums": [1]}).to_csv(tmp_path / f"{name}.csv", index=False)
+    registry = registry_for(str(tmp_path))
+
+    datasets = load_processed_data(str(tmp_path))
+    assert sorted(datasets) == ["extra", "team_year_summary"]
+    assert registry.loaded == []
+
+    assert datasets["extra"]["wins"].tolist() == [1]
+    assert registry.loaded == ["extra"]
+    with pytest.raises(KeyError):
+        datasets["missing"]
@@ -0,0 +1,15 @@
+from f1tdi import HEAVY_MODULES, IMPORT_BUDGET_MS, import_profile
+
+QUERY = ["query", "top", "2022"]
+
+
+def test_query_does_not_import_heavy_modules():
+    _, _, modules = import_profile(QUERY)
+    heavy = sorted(m for m in modules if m.split(".")[0] in HEAVY_MODULES)
+    assert heavy == []
+
+
+def test_query_import_time_within_budget():
+    # Best of three runs, so one cold filesystem cache does not fail the build
+    totals = [import_profile(QUERY)[1] for _ in range(3)]
+    assert min(totals) / 1000 <= IMPORT_BUDGET_MS
@@ -0,0 +1,40 @@
+import pandas as pd
+
+from incremental import drop_known_results, season_results
+
+STORED = pd.DataFrame({
+    "raceId": [1, 1, 2, 2],
+    "year": [2000, 2000, 2001, 2001],
+    "driverId": ["ann", "bob", "ann", "bob"],
+    "positionDisplayOrder": [1, 2, 1, 2],
+    "points": [10.0, 6.0, 10.0, 6.0],
+})
+NEW = pd.DataFrame({
+    "raceId": [3, 3],
+    "year": [2001, 2001],
+    "driverId": ["bob", "ann"],
+    "positionDisplayOrder": [1, 2],
+    "points": [10.0, 6.0],
+})
+
+
+def test_new_rows_appended_to_raw_first_are_counted_once():
+    # The same rows, whether or not they were appended to the raw CSV
+    # before update() ran
+    appended = pd.concat([STORED, NEW], ignore_index=True)
+    before = season_results(STORED, NEW, [2001])
+    after = season_results(appended, NEW, [2001])
+
+    pd.testing.assert_frame_equal(after, before)
+    assert len(after) == 4
+    assert after["points"].sum() == 32.0
+
+
+def test_drop_known_results_matches_either_key():
+    repeats = pd.DataFrame({
+        "raceId": [2, 2, 3],
+        "driverId": ["ann", "carl", "carl"],
+        "positionDisplayOrder": [5, 2, 1],
+    })
+    # (2, ann) repeats a driver, (2, 2) a finishing order; only race 3 is new
+    assert drop_known_results(repeats, STORED)["raceId"].tolist() == [3]
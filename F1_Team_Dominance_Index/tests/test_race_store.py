@@ -0,0 +1,33 @@
+import numpy as np
+import pandas as pd
+import pytest
+
+from race_store import RaceResultsStore
+
+# Race ids not in chronological order, as in the synthetic scale-up data
+# where every copy's races get ids after all of the real ones
+RESULTS = pd.DataFrame({
+    "raceId": [1, 1, 2, 101, 101, 102, 3],
+    "year": [1950, 1950, 1951, 1950, 1950, 1951, 1952],
+    "positionDisplayOrder": [1, 2, 1, 1, 2, 1, 1],
+    "constructorId": ["alfa", "ferrari", "alfa", "alfa-s1", "ferrari-s1", "alfa-s1", "alfa"],
+    "points": [8.0, 6.0, 8.0, 8.0, 6.0, 8.0, 8.0],
+})
+
+
+def test_seasons_with_interleaved_race_ids():
+    store = RaceResultsStore.from_frame(RESULTS)
+    assert store.years() == [1950, 1951, 1952]
+
+    season = store.season(1950)
+    assert len(season) == 4
+    assert season["raceId"].tolist() == [1, 1, 101, 101]
+    assert len(store.season(1951)) == 2
+
+
+def test_rows_out_of_year_order_are_rejected():
+    store = RaceResultsStore.from_frame(RESULTS)
+    ints = dict(store.ints, year=np.array([1950, 1951, 1950, 1950, 1950, 1951, 1952], dtype=np.int16))
+    with pytest.raises(ValueError):
+        RaceResultsStore(store.ids, ints, store.flags, store.points, store.sparse,
+                         store.n_rows, store.lookups)
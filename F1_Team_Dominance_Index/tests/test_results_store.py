@@ -0,0 +1,25 @@
+import pandas as pd
+
+from results_store import ResultsStore
+
+TEAM_METRICS = pd.DataFrame({
+    "year": [2000, 2000], "constructorId": ["alpha", "beta"], "name": ["Alpha", "Beta"],
+    "TDI": [0.8, 0.4], "TDI_normalized": [100.0, 50.0], "TDI_rank": [1, 2],
+})
+ENTITY_TDI = {"driver": pd.DataFrame({
+    "year": [2000, 2000], "driverId": ["ann", "bob"], "TDI": [0.7, 0.3],
+    "TDI_normalized": [100.0, 42.9], "TDI_rank": [1, 2],
+})}
+
+
+def test_tables_passed_as_none_keep_their_rows(tmp_path):
+    with ResultsStore(str(tmp_path / "tdi.db")) as store:
+        full = store.publish(TEAM_METRICS, ENTITY_TDI)
+        partial = store.publish(TEAM_METRICS)
+
+        assert [r["entity_id"] for r in store.entity("driver")] == ["ann", "bob"]
+        # Same stored content, same version
+        assert partial == full
+
+        changed = {"driver": ENTITY_TDI["driver"].assign(TDI=[0.3, 0.7])}
+        assert store.publish(TEAM_METRICS, changed) != full
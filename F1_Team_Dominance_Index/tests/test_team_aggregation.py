@@ -0,0 +1,59 @@
+import os
+
+import numpy as np
+import pandas as pd
+import pytest
+
+from raw_loader import RAW_DIR
+from team_aggregation import SUMMARY_COLUMNS, build_team_year_summary
+
+RACES = pd.DataFrame({"id": [1, 2, 3], "year": [2000, 2000, 2001]})
+CONSTRUCTORS = pd.DataFrame({"id": ["alpha", "beta"], "name": ["Alpha", "Beta"]})
+
+# One row per car. "gamma" is missing from CONSTRUCTORS and race 9 from
+# RACES, so those rows are dropped.
+RESULTS = pd.DataFrame(
+    [
+        # raceId, constructorId, positionDisplayOrder, positionNumber, points, polePosition
+        (1, "alpha", 1, 1, 10.0, True),
+        (1, "alpha", 2, 2, 6.0, False),
+        (1, "beta", 3, 3, 4.0, False),
+        (1, "beta", 4, None, np.nan, False),
+        (2, "beta", 1, 1, 10.0, False),
+        (2, "alpha", 2, 2, 6.0, True),
+        (2, "alpha", 3, 3, 4.0, False),
+        (3, "alpha", 1, 1, 10.0, True),
+        (3, "gamma", 2, 2, 6.0, False),
+        (9, "beta", 1, 1, 10.0, False),
+    ],
+    columns=["raceId", "constructorId", "positionDisplayOrder", "positionNumber", "points", "polePosition"],
+).astype({"positionNumber": "Int16"})
+
+EXPECTED = pd.DataFrame(
+    [
+        # year, constructorId, name, races, entries, wins, podiums, one_two, poles, avg_finish, points
+        (2000, "alpha", "Alpha", 2, 4, 1, 4, 1, 2, 2.0, 26.0),
+        (2000, "beta", "Beta", 2, 3, 1, 2, 0, 0, 8 / 3, 14.0),
+        (2001, "alpha", "Alpha", 1, 1, 1, 1, 0, 1, 1.0, 10.0),
+    ],
+    columns=SUMMARY_COLUMNS,
+)
+
+
+def test_summary_matches_fixed_expected_table():
+    summary = build_team_year_summary(RESULTS, RACES, CONSTRUCTORS)
+    pd.testing.assert_frame_equal(summary.reset_index(drop=True), EXPECTED,
+                                  check_dtype=False)
+
+
+def test_each_result_row_counted_once_in_multi_engine_seasons():
+    # The cleaning notebook merged the constructor standings, which hold one
+    # row per engine, and double-counted these seasons (1960 Cooper: 12 wins).
+    if not os.path.exists(os.path.join(RAW_DIR, "f1db-races-race-results.csv")):
+        pytest.skip("raw f1db data not available")
+    from raw_loader import load_table
+
+    summary = build_team_year_summary(load_table("race_results"), load_table("races"),
+                                      load_table("constructors"))
+    cooper = summary[(summary["year"] == 1960) & (summary["constructorId"] == "cooper")].iloc[0]
+    assert cooper["wins"] == 6